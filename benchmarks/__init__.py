@@ -0,0 +1,10 @@
+"""Benchmarks of the importer, run with pytest-benchmark.
+
+Run them with `pytest benchmarks`. To keep track of regressions between versions,
+save each run and compare it with the previous ones :
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Runs are saved under `.benchmarks/`, one file per machine, interpreter and commit.
+"""
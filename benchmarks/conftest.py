@@ -0,0 +1,69 @@
+"""Shared fixtures of the benchmarks: a corpus built from the recorded questions page,
+and fake Stack Exchange servers serving it."""
+
+import copy
+import json
+import pathlib
+
+import pytest
+
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.fake_server import FakeStackExchangeServer
+from stack_overflow_importer.scheduler import RequestScheduler
+
+RECORDED_PAGE = (
+    pathlib.Path(__file__).parent.parent / "tests" / "data" / "questions_page.json"
+)
+
+CORPUS_SIZE = 2_000
+"""Number of questions served by the fake servers, ie 20 full pages."""
+
+CORPUS_START = 1_600_000_000
+
+CORPUS_STEP = 60
+"""Seconds between the creation dates of two consecutive questions."""
+
+LATENCY = 0.005
+"""Latency of the `slow_server`, so that concurrency has something to hide."""
+
+
+def make_corpus(count: int = CORPUS_SIZE) -> list[dict]:
+    """Builds `count` questions, by cycling over the items of the recorded page and
+    giving them new IDs, and creation dates `CORPUS_STEP` apart."""
+    templates = json.loads(RECORDED_PAGE.read_bytes())["items"]
+    corpus = []
+    for index in range(count):
+        item = copy.deepcopy(templates[index % len(templates)])
+        item["question_id"] = index + 1
+        item["creation_date"] = CORPUS_START + index * CORPUS_STEP
+        item["last_activity_date"] = item["creation_date"] + 30
+        corpus.append(item)
+    return corpus
+
+
+@pytest.fixture(scope="session")
+def corpus() -> list[dict]:
+    """The questions served by the fake servers."""
+    return make_corpus()
+
+
+@pytest.fixture(scope="session")
+def fast_server(corpus):
+    """A fake server answering as fast as it can."""
+    with FakeStackExchangeServer(corpus, quota_max=10**9) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def slow_server(corpus):
+    """A fake server adding `LATENCY` to every response."""
+    with FakeStackExchangeServer(corpus, quota_max=10**9, latency=LATENCY) as server:
+        yield server
+
+
+def make_client(server: FakeStackExchangeServer) -> ApiClient:
+    """Builds a pooled client for `server`, whose scheduler doesn't throttle."""
+    return ApiClient(
+        base_site=server.base_site,
+        scheduler=RequestScheduler(rate=10**6, burst=10**6),
+    )
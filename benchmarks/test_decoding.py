@@ -0,0 +1,36 @@
+"""Benchmarks of the JSON decoders on a recorded 100-item questions page.
+
+Run with `pytest benchmarks`.
+"""
+
+import json
+import pathlib
+
+import pytest
+
+from stack_overflow_importer.decoding import DECODERS
+
+PAGE = (
+    pathlib.Path(__file__).parent.parent / "tests" / "data" / "questions_page.json"
+).read_bytes()
+
+
+def decode_text(data: bytes):
+    """The previous path : decode the bytes to text, then parse the text, as
+    `requests.Response.json()` does."""
+    return json.loads(data.decode("utf-8"))
+
+
+@pytest.mark.benchmark(group="decode")
+@pytest.mark.parametrize("name", sorted(DECODERS))
+def test_decode_page(benchmark, name):
+    """Decodes a page straight from bytes with each available decoder."""
+    result = benchmark(DECODERS[name], PAGE)
+    assert len(result["items"]) == 100
+
+
+@pytest.mark.benchmark(group="decode")
+def test_decode_page_via_text(benchmark):
+    """Baseline: decodes a page through an intermediate str."""
+    result = benchmark(decode_text, PAGE)
+    assert len(result["items"]) == 100
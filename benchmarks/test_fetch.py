@@ -0,0 +1,82 @@
+"""Benchmarks of the request pipeline, against a local fake Stack Exchange server.
+
+`test_fetch_page*` measure the cost of a single page round trip on an idle local
+server: building the parameters, scheduling, HTTP, gzip and decoding. `test_crawl_*`
+fetch the whole corpus from a server adding some latency to each response, once
+page after page, once with the concurrent crawler.
+"""
+
+import pytest
+
+from stack_overflow_importer.crawler import crawl_questions
+from stack_overflow_importer.questions import get_questions, iter_questions
+
+from benchmarks.conftest import (
+    CORPUS_SIZE,
+    CORPUS_START,
+    CORPUS_STEP,
+    make_client,
+)
+
+CORPUS_END = CORPUS_START + CORPUS_SIZE * CORPUS_STEP
+
+
+@pytest.mark.benchmark(group="fetch-page")
+def test_fetch_page(benchmark, fast_server):
+    """Fetches a 100-item page with a pooled client."""
+    with make_client(fast_server) as client:
+        response = benchmark(get_questions, pagesize=100, client=client)
+    assert len(response["items"]) == 100
+
+
+@pytest.mark.benchmark(group="fetch-page")
+def test_fetch_page_records(benchmark, fast_server):
+    """Fetches a 100-item page with a pooled client, and converts the items into
+    `Question` records."""
+    with make_client(fast_server) as client:
+
+        def fetch():
+            return list(
+                iter_questions(
+                    client=client,
+                    max=CORPUS_START + 99 * CORPUS_STEP,
+                    sort="creation",
+                    records=True,
+                )
+            )
+
+        records = benchmark(fetch)
+    assert len(records) == 100
+
+
+@pytest.mark.benchmark(group="crawl")
+def test_crawl_sequential(benchmark, slow_server):
+    """Fetches the whole corpus page after page."""
+    with make_client(slow_server) as client:
+
+        def crawl():
+            return list(iter_questions(client=client, sort="creation"))
+
+        items = benchmark.pedantic(crawl, rounds=3)
+    assert len(items) == CORPUS_SIZE
+
+
+@pytest.mark.benchmark(group="crawl")
+@pytest.mark.parametrize("max_workers", [4, 8])
+def test_crawl_concurrent(benchmark, slow_server, max_workers):
+    """Fetches the whole corpus with the sharded crawler."""
+    with make_client(slow_server) as client:
+
+        def crawl():
+            return list(
+                crawl_questions(
+                    CORPUS_START,
+                    CORPUS_END,
+                    client=client,
+                    max_workers=max_workers,
+                    shards=max_workers * 2,
+                )
+            )
+
+        items = benchmark.pedantic(crawl, rounds=3)
+    assert len(items) == CORPUS_SIZE
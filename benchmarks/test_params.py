@@ -0,0 +1,62 @@
+"""Benchmarks of the validation and conversion of the `questions` parameters."""
+
+import datetime
+
+import pytest
+
+from stack_overflow_importer.questions import (
+    build_questions_params,
+    extract_int,
+    extract_timestamp,
+)
+
+
+@pytest.mark.benchmark(group="params")
+def test_build_questions_params(benchmark):
+    """Builds the parameters of a fully specified `questions` call."""
+    params = benchmark(
+        build_questions_params,
+        filter="!nKzQUR30W7",
+        page=3,
+        pagesize=100,
+        fromdate="2022-01-01",
+        todate=datetime.date(2022, 6, 1),
+        order="asc",
+        min=1_600_000_000,
+        max=1_700_000_000,
+        sort="creation",
+        tagged="python;pandas",
+    )
+    assert params["pagesize"] == "100"
+
+
+@pytest.mark.benchmark(group="params")
+def test_build_questions_params_defaults(benchmark):
+    """Builds the parameters of a `questions` call with the defaults only."""
+    params = benchmark(build_questions_params)
+    assert params["page"] == "1"
+
+
+@pytest.mark.benchmark(group="timestamp")
+@pytest.mark.parametrize(
+    "value",
+    [
+        1_654_127_961,
+        "1654127961",
+        "2022-06-01",
+        "2022-06-01T23:59:21+02:00",
+        datetime.date(2022, 6, 1),
+        datetime.datetime(2022, 6, 1, 23, 59, 21, tzinfo=datetime.timezone.utc),
+    ],
+    ids=["int", "str-int", "iso-date", "iso-datetime", "date", "datetime"],
+)
+def test_extract_timestamp(benchmark, value):
+    """Converts each supported kind of input into a timestamp."""
+    assert benchmark(extract_timestamp, "fromdate", value) > 0
+
+
+@pytest.mark.benchmark(group="int")
+@pytest.mark.parametrize("value", [42, "42", 42.0], ids=["int", "str", "float"])
+def test_extract_int(benchmark, value):
+    """Validates a bounded int given as each supported type."""
+    assert benchmark(extract_int, "pagesize", value, 100, 1) == 42
@@ -0,0 +1,73 @@
+"""Benchmarks of the writes to the question store, as its tag index grows.
+
+Run with `pytest benchmarks`.
+"""
+
+import itertools
+import time
+
+import pytest
+
+from stack_overflow_importer.store import QuestionStore
+
+TAGS = ("javascript", "python", "java", "c#", "php", "android", "html", "css")
+"""A few tags, shared by many questions, as the most popular ones of SO are."""
+
+BATCH_SIZE = 500
+
+LARGE_STORE_SIZE = 200_000
+
+MAX_SLOWDOWN = 3
+"""How much slower upserting a batch into the large store may be than into an empty
+one. Upserts only mark the tags they change, so it doesn't depend on the size of
+their posting lists."""
+
+
+def make_batch(start: int) -> list[dict]:
+    """Builds `BATCH_SIZE` questions with IDs from `start`, each with two of
+    `TAGS`."""
+    return [
+        {
+            "question_id": question_id,
+            "tags": [TAGS[question_id % len(TAGS)], TAGS[question_id * 3 % len(TAGS)]],
+            "creation_date": question_id,
+            "last_activity_date": question_id,
+        }
+        for question_id in range(start, start + BATCH_SIZE)
+    ]
+
+
+def time_batches(store: QuestionStore, ids: itertools.count, rounds: int) -> float:
+    """Returns the mean time to upsert a new batch into `store`."""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        store.upsert_questions(make_batch(next(ids)))
+    return (time.perf_counter() - started) / rounds
+
+
+@pytest.fixture(scope="module")
+def large_store(tmp_path_factory):
+    """A store holding `LARGE_STORE_SIZE` questions, whose tag index was read."""
+    path = str(tmp_path_factory.mktemp("store") / "large.db")
+    with QuestionStore(path) as store:
+        for start in range(0, LARGE_STORE_SIZE, BATCH_SIZE):
+            store.upsert_questions(make_batch(start))
+        store.get_tag_counts(TAGS)
+        yield store
+
+
+@pytest.mark.benchmark(group="store")
+def test_upsert_into_large_store(benchmark, large_store, tmp_path):
+    """Upserts new batches of popular tags into a large store, reading the tag index
+    between batches, and compares with an empty store."""
+    ids = itertools.count(LARGE_STORE_SIZE, BATCH_SIZE)
+
+    def upsert_and_read():
+        large_store.upsert_questions(make_batch(next(ids)))
+        large_store.get_tag_counts(TAGS[:1])
+
+    benchmark.pedantic(upsert_and_read, rounds=20)
+    with QuestionStore(str(tmp_path / "empty.db")) as empty_store:
+        baseline = time_batches(empty_store, itertools.count(0, BATCH_SIZE), 20)
+    large = time_batches(large_store, ids, 20)
+    assert large < MAX_SLOWDOWN * baseline
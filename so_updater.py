@@ -1,22 +1,23 @@
 """Script to auto update the question bank from Stack Exchange."""
+from __future__ import annotations
+
 from argparse import ArgumentParser
 import sys
-from typing import Any
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
 import argparse
 import json
 import logging
-import colorama
-import coloredlogs
 
-from stack_overflow_importer.auth import (
-    get_access_token_from_url,
-    get_authorization_url,
-    retrieve_client_id,
-    retrieve_key,
-    retrieve_token,
-)
-from stack_overflow_importer.filters import QUESTION_TEST_FILTER_ID
-from stack_overflow_importer.questions import get_questions
+from stack_overflow_importer.store import DEFAULT_DB_PATH, DEFAULT_SITE, site_db_path
+
+# The CLI is run often, by schedulers, for short commands such as `check`. Each
+# command imports the modules it needs when it runs, so that none of them pays for
+# importing requests, the OAuth stack or pyarrow unless it uses them.
+# pylint: disable=import-outside-toplevel
+if TYPE_CHECKING:  # pragma: no cover
+    from stack_overflow_importer.base import ApiClient
+    from stack_overflow_importer.metrics import MetricsHook
+    from stack_overflow_importer.progress import ProgressReporter
 
 
 def init_logging() -> logging.Logger:
@@ -40,6 +41,8 @@ def init_logging() -> logging.Logger:
     logger.addHandler(file_handler)
     logger.addHandler(console_handler)
 
+    import coloredlogs
+
     coloredlogs.install(
         level="INFO",
         logger=logger,
@@ -49,7 +52,7 @@ def init_logging() -> logging.Logger:
     return logger
 
 
-so_logger = init_logging()
+so_logger = logging.getLogger("so_importer")
 
 
 def build_args_parser() -> ArgumentParser:
@@ -62,6 +65,27 @@ def build_args_parser() -> ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Utility to import Stack overflow questions.",
     )
+    parser.add_argument(
+        "--metrics",
+        help="Print a summary of the API calls, latencies and quota at the end.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-progress",
+        help=(
+            "Don't report the progress of the imports. By default, it is refreshed in"
+            " place on a terminal, and logged every 30 seconds otherwise."
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--trace",
+        help=(
+            "Record each API call as an OpenTelemetry span. Requires the 'tracing'"
+            " extra, and an OpenTelemetry SDK configured to export the spans."
+        ),
+        action="store_true",
+    )
     subparsers = parser.add_subparsers(
         dest="action",
         help="desired action for this program.",
@@ -82,7 +106,11 @@ def build_args_parser() -> ArgumentParser:
     )
     parser_questions.add_argument(
         "--filter",
-        help="The hash of a filter, as provided by filters/create API method.",
+        help=(
+            "The hash of a filter, as provided by filters/create API method. If not"
+            " supplied, a filter including all the question fields is created once"
+            " and cached."
+        ),
     )
     parser_questions.add_argument(
         "--page",
@@ -136,6 +164,176 @@ def build_args_parser() -> ArgumentParser:
             " tags."
         ),
     )
+    parser_questions.add_argument(
+        "--site",
+        help=(
+            "The API name of the Stack Exchange site to query. Default is"
+            " stackoverflow."
+        ),
+        default=DEFAULT_SITE,
+    )
+    parser_questions.add_argument(
+        "--all",
+        help="Follow the pages of results until the last one, from --page onwards.",
+        action="store_true",
+    )
+    parser_questions.add_argument(
+        "--db",
+        help=(
+            "Path of a SQLite database to upsert the questions into, instead of"
+            " printing them. Sites other than stackoverflow are written to their own"
+            " file, named after the site : ./so_importer.db becomes"
+            " ./so_importer.superuser.db."
+        ),
+    )
+    parser_questions.add_argument(
+        "--resume",
+        help=(
+            "With --db, continue the same query from its last checkpoint instead of"
+            " starting over."
+        ),
+        action="store_true",
+    )
+    parser_questions.add_argument(
+        "--format",
+        help=(
+            "Output format: 'json' prints each page, 'ndjson' writes one compact"
+            " question per line as the pages arrive, 'parquet' writes a columnar"
+            " file to --output."
+        ),
+        choices=("json", "ndjson", "parquet"),
+        default="json",
+    )
+    parser_questions.add_argument(
+        "--output",
+        help="Path of the file to write the questions to, instead of stdout.",
+    )
+    parser_questions.add_argument(
+        "--cache",
+        help=(
+            "Path of a SQLite response cache. Repeated queries are served from it"
+            " instead of calling the API."
+        ),
+    )
+    parser_questions.add_argument(
+        "--cache-ttl",
+        help="How long, in seconds, cached responses stay fresh. Default is 3600.",
+        type=float,
+        default=3600,
+    )
+    parser_questions.add_argument(
+        "--offline",
+        help="Only serve responses from --cache, without calling the API.",
+        action="store_true",
+    )
+
+    parser_sync = subparsers.add_parser(
+        "sync",
+        help=(
+            "fetches only the questions active since the last sync of the same tags,"
+            " and upserts them in the result database."
+        ),
+    )
+    parser_sync.add_argument(
+        "--db",
+        help=(
+            "Path of the SQLite database to sync. Sites other than stackoverflow are"
+            " synced to their own file, named after the site : ./so_importer.db"
+            " becomes ./so_importer.superuser.db."
+        ),
+        default=DEFAULT_DB_PATH,
+    )
+    parser_sync.add_argument(
+        "--filter",
+        help=(
+            "The hash of a filter, as provided by filters/create API method. It must"
+            " include question.last_activity_date. If not supplied, a filter"
+            " including all the question fields is created once and cached."
+        ),
+    )
+    parser_sync.add_argument(
+        "--tagged",
+        help=(
+            "Semi-colon delimited list of tags. Will sync questions which match all"
+            " tags."
+        ),
+    )
+    parser_sync.add_argument(
+        "--site",
+        help=(
+            "The API name of the Stack Exchange site to sync. Default is"
+            " stackoverflow."
+        ),
+        default=DEFAULT_SITE,
+    )
+    parser_sync.add_argument(
+        "--since",
+        help=(
+            "Where to start from if these tags were never synced. If not supplied,"
+            " the first sync retrieves all questions."
+        ),
+    )
+
+    parser_crawl = subparsers.add_parser(
+        "crawl",
+        help=(
+            "crawls the questions created in a date range on one or more sites in"
+            " parallel, into one database per site."
+        ),
+    )
+    parser_crawl.add_argument(
+        "--sites",
+        help="Semi-colon delimited list of the API names of the sites to crawl.",
+        default=DEFAULT_SITE,
+    )
+    parser_crawl.add_argument(
+        "--fromdate",
+        help="Crawl the questions created from this date.",
+        required=True,
+    )
+    parser_crawl.add_argument(
+        "--todate",
+        help="Crawl the questions created until this date. Default is now.",
+    )
+    parser_crawl.add_argument(
+        "--filter",
+        help=(
+            "The hash of a filter, as provided by filters/create API method. If not"
+            " supplied, a filter including all the question fields is created once"
+            " and cached."
+        ),
+    )
+    parser_crawl.add_argument(
+        "--tagged",
+        help=(
+            "Semi-colon delimited list of tags. Will crawl questions which match all"
+            " tags."
+        ),
+    )
+    parser_crawl.add_argument(
+        "--db",
+        help=(
+            "Path of the SQLite database. Sites other than stackoverflow are written"
+            " to their own file, named after the site : ./so_importer.db becomes"
+            " ./so_importer.superuser.db."
+        ),
+        default=DEFAULT_DB_PATH,
+    )
+    parser_crawl.add_argument(
+        "--workers",
+        help="The number of requests in flight per site. Default is 2.",
+        type=int,
+        default=2,
+    )
+    parser_crawl.add_argument(
+        "--answers",
+        help=(
+            "Also imports the answers of the crawled questions, and their comments."
+            " Questions whose answer count didn't change since the last crawl are"
+            " skipped."
+        ),
+        action="store_true",
+    )
     return parser
 
 
@@ -156,15 +354,234 @@ def extract(obj: object, attribute: str, default: Any = None) -> str | None:
         return str(default)
 
 
+def build_client(
+    cmdline: argparse.Namespace, hooks: Iterable[MetricsHook] = ()
+) -> ApiClient:
+    """Builds the API client for this run, with a response cache if `--cache` was
+    provided, and the metrics `hooks`."""
+    from stack_overflow_importer.base import ApiClient
+    from stack_overflow_importer.cache import ResponseCache
+
+    cache_path = extract(cmdline, "cache", None)
+    if extract(cmdline, "offline", False) and not cache_path:
+        raise ValueError("The --offline option requires a --cache.")
+    cache = None
+    if cache_path:
+        cache = ResponseCache(
+            cache_path,
+            default_ttl=float(extract(cmdline, "cache_ttl", 3600)),
+            offline=bool(extract(cmdline, "offline", False)),
+        )
+    return ApiClient(cache=cache, hooks=hooks)
+
+
+def build_hooks(cmdline: argparse.Namespace) -> list[MetricsHook]:
+    """Builds the metrics hooks requested by `--metrics` and `--trace`, and the
+    `ProgressReporter` of the actions calling the API, unless `--no-progress` was
+    provided."""
+    hooks: list[MetricsHook] = []
+    if extract(cmdline, "metrics", False):
+        from stack_overflow_importer.metrics import MetricsRecorder
+
+        hooks.append(MetricsRecorder())
+    if extract(cmdline, "trace", False):
+        from stack_overflow_importer.metrics import OpenTelemetryHook
+
+        hooks.append(OpenTelemetryHook())
+    if cmdline.action in ("questions", "sync", "crawl") and not extract(
+        cmdline, "no_progress", False
+    ):
+        from stack_overflow_importer.progress import ProgressReporter
+
+        # A crawl reports the seconds of its window covered, not a date
+        hooks.append(ProgressReporter(date_cursor=cmdline.action != "crawl"))
+    return hooks
+
+
+def find_hook(hooks: Iterable[MetricsHook], kind: type) -> Any:
+    """Returns the first hook of type `kind`, or None."""
+    return next((hook for hook in hooks if isinstance(hook, kind)), None)
+
+
+def site_store_path(cmdline: argparse.Namespace) -> str:
+    """Returns the path of the partition of `--db` holding the questions of
+    `--site`, see `store.site_db_path()`."""
+    from stack_overflow_importer.questions import extract_site
+
+    site = extract_site(extract(cmdline, "site", DEFAULT_SITE))
+    return site_db_path(extract(cmdline, "db", DEFAULT_DB_PATH), site)
+
+
+def resolve_question_filter(
+    cmdline: argparse.Namespace,
+    key: str | None,
+    token: str | None,
+    client: ApiClient | None = None,
+) -> str:
+    """Returns the filter requested on the command line or, by default, the ID of the
+    filter including the `INCLUDE_QUESTION` fields, from the filter cache."""
+    from stack_overflow_importer.filters import (
+        INCLUDE_DEFAULT,
+        INCLUDE_QUESTION,
+        QUESTION_TEST_FILTER_ID,
+        FilterRegistry,
+    )
+
+    filter_id = extract(cmdline, "filter", None)
+    if filter_id:
+        return filter_id
+    filter_id = FilterRegistry().get_or_create(
+        key, token, "default", INCLUDE_DEFAULT + INCLUDE_QUESTION, client=client
+    )
+    if filter_id:
+        return filter_id
+    so_logger.warning("Falling back to the test filter %s.", QUESTION_TEST_FILTER_ID)
+    return QUESTION_TEST_FILTER_ID
+
+
+def question_query_args(
+    cmdline: argparse.Namespace,
+    key: str | None,
+    token: str | None,
+    client: ApiClient | None = None,
+) -> dict:
+    """Collects the `questions` parameters requested on the command line, other than
+    the page and the page size."""
+    return {
+        "filter": resolve_question_filter(cmdline, key, token, client),
+        "fromdate": extract(cmdline, "fromdate", None),
+        "todate": extract(cmdline, "todate", None),
+        "order": extract(cmdline, "order", None),
+        "min": extract(cmdline, "min", None),
+        "max": extract(cmdline, "max", None),
+        "sort": extract(cmdline, "sort", None),
+        "tagged": extract(cmdline, "tagged", None),
+        "site": extract(cmdline, "site", DEFAULT_SITE),
+    }
+
+
+def fetch_question_pages(
+    cmdline: argparse.Namespace,
+    key: str | None,
+    token: str | None,
+    client: ApiClient | None = None,
+) -> Iterator[dict]:
+    """Fetches the pages of questions requested on the command line.
+
+    Returns
+    -------
+        an iterator over the JSON responses : only the requested page, or all the pages
+        from it if `--all` was provided.
+    """
+    from stack_overflow_importer.questions import get_questions, iter_question_pages
+
+    query = question_query_args(cmdline, key, token, client)
+    if extract(cmdline, "all", False):
+        return iter_question_pages(
+            key,
+            token,
+            page=extract(cmdline, "page", 1),
+            pagesize=extract(cmdline, "pagesize", 100),
+            client=client,
+            **query,
+        )
+    response = get_questions(
+        key,
+        token,
+        page=extract(cmdline, "page", 1),
+        pagesize=extract(cmdline, "pagesize", 30),
+        client=client,
+        **query,
+    )
+    return iter([response] if response else [])
+
+
+def import_questions(
+    cmdline: argparse.Namespace,
+    key: str | None,
+    token: str | None,
+    client: ApiClient | None = None,
+    progress: ProgressReporter | None = None,
+) -> int:
+    """Imports the questions requested on the command line into the partition of
+    `--db` of their site, as a checkpointed job that `--resume` can continue,
+    reporting to `progress`.
+
+    Returns
+    -------
+        the number of questions imported by the job, including by previous runs.
+    """
+    from stack_overflow_importer.jobs import run_import_job
+    from stack_overflow_importer.questions import MAX_PAGESIZE, QuestionQuery
+    from stack_overflow_importer.store import QuestionStore
+
+    all_pages = bool(extract(cmdline, "all", False))
+    query = QuestionQuery.parse(
+        page=extract(cmdline, "page", 1),
+        pagesize=extract(cmdline, "pagesize", MAX_PAGESIZE),
+        **question_query_args(cmdline, key, token, client),
+    )
+    with QuestionStore(site_store_path(cmdline)) as store:
+        checkpoint = run_import_job(
+            store,
+            query,
+            key,
+            token,
+            client,
+            resume=bool(extract(cmdline, "resume", False)),
+            max_pages=None if all_pages else 1,
+            progress=progress,
+        )
+    return checkpoint.items if checkpoint is not None else 0
+
+
+def write_output(cmdline: argparse.Namespace, pages: Iterable[dict]):
+    """Writes the pages of questions to `--output` or stdout, in `--format`."""
+    output_path = extract(cmdline, "output", None)
+    if extract(cmdline, "format", "json") == "parquet":
+        if not output_path:
+            raise ValueError("The parquet format requires an --output file.")
+        from stack_overflow_importer.export import write_parquet
+
+        count = write_parquet(pages, output_path)
+        so_logger.info("Wrote %s questions to %s.", count, output_path)
+        return
+    stream = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    try:
+        if extract(cmdline, "format", "json") == "ndjson":
+            from stack_overflow_importer.export import write_ndjson
+
+            count = write_ndjson(pages, stream)
+            so_logger.info("Wrote %s questions.", count)
+        else:
+            for response in pages:
+                print(json.dumps(response, indent=2), file=stream)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
 def main():
     """Main logic."""
-    colorama.init(autoreset=True)
-
     cmdline = build_args_parser().parse_args(None)
     if not cmdline or not cmdline.action:
         raise Exception("Critical issue in parsing the command line")
 
+    import colorama
+
+    from stack_overflow_importer.auth import (
+        retrieve_client_id,
+        retrieve_key,
+        retrieve_token,
+    )
+    from stack_overflow_importer.scheduler import QuotaExhaustedError
+
+    colorama.init(autoreset=True)
+    init_logging()
+
+    hooks: list[MetricsHook] = []
     try:
+        hooks = build_hooks(cmdline)
         match cmdline.action:
             case "check":
                 client_id = retrieve_client_id()
@@ -177,31 +594,107 @@ def main():
                     )
 
             case "auth":
+                from stack_overflow_importer.auth import (
+                    get_access_token_from_url,
+                    get_authorization_url,
+                )
+
                 client_id = retrieve_client_id()
                 get_authorization_url(client_id)
                 get_access_token_from_url()
 
             case "questions":
+                from stack_overflow_importer.progress import ProgressReporter
+
                 key = retrieve_key()
                 token = retrieve_token()
-                response = get_questions(
-                    key,
-                    token,
-                    extract(cmdline, "filter", QUESTION_TEST_FILTER_ID),
-                    extract(cmdline, "page", 1),
-                    extract(cmdline, "pagesize", 30),
-                    extract(cmdline, "fromdate", None),
-                    extract(cmdline, "todate", None),
-                    extract(cmdline, "order", None),
-                    extract(cmdline, "min", None),
-                    extract(cmdline, "max", None),
-                    extract(cmdline, "sort", None),
-                    extract(cmdline, "tagged", None),
-                )
-                print(json.dumps(response, indent=2))
+                db_path = extract(cmdline, "db", None)
+                if extract(cmdline, "resume", False) and not db_path:
+                    raise ValueError("The --resume option requires a --db.")
+                with build_client(cmdline, hooks) as client:
+                    if db_path:
+                        count = import_questions(
+                            cmdline,
+                            key,
+                            token,
+                            client,
+                            find_hook(hooks, ProgressReporter),
+                        )
+                        so_logger.info(
+                            "Upserted %s questions into %s.",
+                            count,
+                            site_store_path(cmdline),
+                        )
+                    else:
+                        write_output(
+                            cmdline, fetch_question_pages(cmdline, key, token, client)
+                        )
+
+            case "sync":
+                from stack_overflow_importer.base import ApiClient
+                from stack_overflow_importer.progress import ProgressReporter
+                from stack_overflow_importer.questions import extract_site
+                from stack_overflow_importer.store import QuestionStore
+                from stack_overflow_importer.sync import sync_questions
+
+                key = retrieve_key()
+                token = retrieve_token()
+                with (
+                    ApiClient(hooks=hooks) as client,
+                    QuestionStore(site_store_path(cmdline)) as store,
+                ):
+                    sync_questions(
+                        store,
+                        key,
+                        token,
+                        resolve_question_filter(cmdline, key, token, client),
+                        extract(cmdline, "tagged", None),
+                        extract(cmdline, "since", None),
+                        client,
+                        extract_site(extract(cmdline, "site", DEFAULT_SITE)),
+                        find_hook(hooks, ProgressReporter),
+                    )
+
+            case "crawl":
+                from stack_overflow_importer.base import ApiClient
+                from stack_overflow_importer.multisite import import_sites
+                from stack_overflow_importer.progress import ProgressReporter
+
+                key = retrieve_key()
+                token = retrieve_token()
+                with ApiClient(pool_maxsize=100, hooks=hooks) as client:
+                    counts = import_sites(
+                        cmdline.sites,
+                        cmdline.fromdate,
+                        extract(cmdline, "todate", None),
+                        key,
+                        token,
+                        resolve_question_filter(cmdline, key, token, client),
+                        extract(cmdline, "tagged", None),
+                        client,
+                        cmdline.db,
+                        cmdline.workers,
+                        answers=cmdline.answers,
+                        progress=find_hook(hooks, ProgressReporter),
+                    )
+                for site, count in counts.items():
+                    so_logger.info("Crawled %s questions from %s.", count, site)
+    except QuotaExhaustedError as exc:
+        so_logger.error("Stopped before exhausting the API quota: %s", exc)
     # pylint: disable=broad-except
     except Exception:
         so_logger.critical("Fatal error", exc_info=True)
+    finally:
+        if hooks:
+            from stack_overflow_importer.metrics import MetricsRecorder
+            from stack_overflow_importer.progress import ProgressReporter
+
+            progress = find_hook(hooks, ProgressReporter)
+            if progress is not None:
+                progress.close()
+            recorder = find_hook(hooks, MetricsRecorder)
+            if recorder is not None:
+                so_logger.info("API calls summary:\n%s", recorder.summary())
 
 
 if __name__ == "__main__":
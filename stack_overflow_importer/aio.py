@@ -0,0 +1,306 @@
+"""asyncio counterparts of the API layer, built on aiohttp.
+
+The functions mirror `base.query_method()` and `questions.get_questions()`: they take
+the same parameters, build the same query strings and return the same JSON
+responses, but many calls can be in flight on a single thread. Calls go through the
+same `RequestScheduler`, so sync and async code share the rate limits and quota, and
+are retried by the same `RetryPolicy`, with the same error semantics : error pages
+which aren't JSON become `http_error` responses, and transient failures are retried.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+import asyncio
+import itertools
+import logging
+import time
+
+import aiohttp
+
+from stack_overflow_importer.base import BASE_SITE, VERSION
+from stack_overflow_importer.decoding import Decoder, decode_json
+from stack_overflow_importer.metrics import (
+    CallMetrics,
+    MetricsHook,
+    emit,
+    response_metrics,
+)
+from stack_overflow_importer.questions import (
+    DEFAULT_SITE,
+    Order,
+    QuestionSortMethod,
+    Timestampable,
+    build_questions_params,
+)
+from stack_overflow_importer.retry import (
+    RetryPolicy,
+    decode_response,
+    is_retryable,
+)
+from stack_overflow_importer.scheduler import (
+    DEFAULT_SCHEDULER,
+    RequestScheduler,
+    normalize_method,
+)
+
+
+so_logger = logging.getLogger("so_importer")
+
+ASYNC_RETRYABLE_EXCEPTIONS = (aiohttp.ClientError, asyncio.TimeoutError)
+"""Network failures worth retrying, the counterpart of
+`retry.RETRYABLE_EXCEPTIONS`."""
+
+
+@dataclass(frozen=True)
+class AsyncResponse:
+    """A response read by `AsyncApiClient`, with the attributes of
+    `requests.Response` that `retry.decode_response()` uses, and its timings.
+
+    Attributes
+    ----------
+        ttfb: the time from sending the request to receiving the response headers.
+
+        bytes_received: the size of the body received, compressed if the server
+        reported its length.
+    """
+
+    status_code: int
+    reason: str
+    headers: Mapping[str, str]
+    content: bytes
+    ttfb: float | None = None
+    bytes_received: int = 0
+
+
+class AsyncApiClient:
+    """A reusable asynchronous Stack Exchange API client, backed by a pooled
+    `aiohttp.ClientSession`.
+
+    The session is opened on first use, inside the running event loop. Use the client
+    as an async context manager, or call `close()` when done.
+
+    Parameters
+    ----------
+        limit: the maximum number of simultaneous connections.
+
+        keep_alive: whether to keep the connections open between calls.
+
+        gzip: whether to negotiate gzip compressed responses.
+
+        timeout: the timeout in seconds for each request.
+
+        base_site: the root URL of the API, without the version.
+
+        scheduler: the `RequestScheduler` enforcing rate limits, backoffs and quota
+        for the calls made with this client. Defaults to the process-wide scheduler.
+
+        decoder: Optional, the function decoding the raw response bodies. Defaults to
+        the fastest decoder available, see `decoding.get_decoder()`.
+
+        retry: Optional, the `RetryPolicy` of the calls made with this client. If
+        None is provided, the client has its own default policy, and so its own retry
+        budget.
+
+        hooks: Optional, functions receiving the `metrics.CallMetrics` of each call
+        made with this client, such as a `metrics.MetricsRecorder`. The connect and
+        TLS times aren't measured.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        keep_alive: bool = True,
+        gzip: bool = True,
+        timeout: float | None = 30,
+        base_site: str = BASE_SITE,
+        scheduler: RequestScheduler | None = None,
+        decoder: Decoder | None = None,
+        retry: RetryPolicy | None = None,
+        hooks: Iterable[MetricsHook] = (),
+    ):
+        self.limit = limit
+        self.keep_alive = keep_alive
+        self.gzip = gzip
+        self.timeout = timeout
+        self.base_site = base_site
+        self.scheduler = scheduler if scheduler is not None else DEFAULT_SCHEDULER
+        self.decoder = decoder if decoder is not None else decode_json
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.hooks = list(hooks)
+        self.session: aiohttp.ClientSession | None = None
+
+    def url(self, method: str) -> str:
+        """Builds the full URL of an API method."""
+        return f"{self.base_site}/{VERSION}/{method}"
+
+    def _open(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit, force_close=not self.keep_alive
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    "Accept-Encoding": "gzip, deflate" if self.gzip else "identity"
+                },
+            )
+        return self.session
+
+    async def request(self, method: str, params: dict) -> AsyncResponse:
+        """Sends a GET request to an API method, and returns the response, whatever
+        its status."""
+        query = {name: str(value) for name, value in params.items()}
+        start = time.perf_counter()
+        async with self._open().get(self.url(method), params=query) as response:
+            ttfb = time.perf_counter() - start
+            content = await response.read()
+            return AsyncResponse(
+                response.status,
+                response.reason or "",
+                response.headers,
+                content,
+                ttfb,
+                response.content_length or len(content),
+            )
+
+    async def get(self, method: str, params: dict) -> bytes:
+        """Sends a GET request to an API method, and returns the raw response body."""
+        return (await self.request(method, params)).content
+
+    async def close(self):
+        """Closes all the pooled connections."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> "AsyncApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+async def async_query_method(
+    method: str,
+    key: str | None,
+    access_token: str | None,
+    params: dict,
+    client: AsyncApiClient | None = None,
+) -> dict | None:
+    """Queries a Stack Exchange API endpoint and provides the JSON response.
+
+    Async version of `base.query_method()`, with the same parameters, and the same
+    retries of the transient failures.
+
+    Parameters
+    ----------
+        client: Optional, an `AsyncApiClient` whose pooled session will be used for
+        the call. If None is provided, a new session is opened for this call.
+
+    Raises
+    ------
+        QuotaExhaustedError: if the call would consume the reserved daily quota.
+    """
+    if not method:
+        print("Please provide an method")
+        return None
+
+    if key:
+        params["key"] = key
+
+    if access_token:
+        params["access_token"] = access_token
+
+    if not params:
+        print("Please provide a parameters dict")
+        return None
+
+    if client is None:
+        async with AsyncApiClient() as own_client:
+            return await async_query_method(method, None, None, params, own_client)
+
+    for attempt in itertools.count(1):
+        queue_wait = await client.scheduler.acquire_async(method)
+        result = None
+        failure = None
+        response = None
+        decode_time = 0.0
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, params)
+            decode_start = time.perf_counter()
+            result = decode_response(response, client.decoder)
+            decode_time = time.perf_counter() - decode_start
+        except ASYNC_RETRYABLE_EXCEPTIONS as exc:
+            failure = exc
+        finally:
+            client.scheduler.record(method, result)
+
+        if failure is None and not is_retryable(response.status_code, result):
+            delay = None
+        else:
+            delay = client.retry.next_delay(attempt, result)
+        if client.hooks:
+            body = response_metrics(result)
+            if failure is not None:
+                body["error"] = type(failure).__name__
+            emit(
+                client.hooks,
+                CallMetrics(
+                    normalize_method(method),
+                    started,
+                    attempt,
+                    status=response.status_code if response is not None else None,
+                    queue_wait=queue_wait,
+                    ttfb=response.ttfb if response is not None else None,
+                    total=time.perf_counter() - start,
+                    bytes_received=(
+                        response.bytes_received if response is not None else 0
+                    ),
+                    decode=decode_time,
+                    retry_in=delay,
+                    **body,
+                ),
+            )
+        if delay is None:
+            if failure is not None:
+                raise failure
+            break
+        so_logger.warning(
+            "Attempt %s of '%s' failed (%s), retrying in %.1f s.",
+            attempt,
+            method,
+            failure if failure is not None else result.get("error_name"),
+            delay,
+        )
+        await (client.retry.async_sleep or asyncio.sleep)(delay)
+    return result
+
+
+async def async_get_questions(
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,  # pylint: disable=redefined-builtin
+    page: str | int | None = None,
+    pagesize: str | int | None = None,
+    fromdate: Timestampable | None = None,
+    todate: Timestampable | None = None,
+    order: str | Order | None = None,
+    # pylint: disable=redefined-builtin
+    min: str | int | None = None,
+    max: str | int | None = None,
+    sort: str | QuestionSortMethod | None = None,
+    tagged: str | None = None,
+    client: AsyncApiClient | None = None,
+    site: str = DEFAULT_SITE,
+) -> dict | None:
+    """Queries Stack Overflow API to retrieve questions.
+
+    Async version of `questions.get_questions()`, with the same parameters.
+    """
+    params = build_questions_params(
+        filter, page, pagesize, fromdate, todate, order, min, max, sort, tagged, site
+    )
+
+    return await async_query_method("questions", key, access_token, params, client)
@@ -0,0 +1,148 @@
+"""Bulk import of the answers, and of their comments, of imported questions.
+
+The answers of up to 100 questions are fetched with a single
+`questions/{ids}/answers` call, and the comments of up to 100 answers with a single
+`answers/{ids}/comments` call. Both stages run their calls on a few workers, and are
+chained : comments are requested as soon as a hundred answers are stored, while the
+remaining answers are still being fetched.
+
+The store records the `answer_count` of each question when its answers are stored.
+Questions whose `answer_count` didn't change since are skipped, so importing the
+answers of a crawl again only fetches the questions which got new answers, or lost
+some.
+"""
+
+from typing import Iterable, Iterator
+import collections
+import logging
+
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.models import Question
+from stack_overflow_importer.questions import DEFAULT_SITE, iter_ids_batches
+from stack_overflow_importer.store import QuestionStore
+
+so_logger = logging.getLogger("so_importer")
+
+
+def outdated_answer_counts(
+    store: QuestionStore, questions: Iterable[dict | Question]
+) -> dict[int, int | None]:
+    """Finds the questions whose answers must be fetched, because their
+    `answer_count` changed since their answers were stored, or is unknown.
+
+    Returns
+    -------
+        the `answer_count` of the outdated questions, keyed on their ID.
+    """
+    counts: dict[int, int | None] = {}
+    for item in questions:
+        if isinstance(item, Question):
+            counts[item.question_id] = item.answer_count
+        else:
+            counts[item["question_id"]] = item.get("answer_count")
+    stored = store.get_answer_counts(counts)
+    return {
+        question_id: count
+        for question_id, count in counts.items()
+        if count is None or stored.get(question_id) != count
+    }
+
+
+def import_answers(
+    store: QuestionStore,
+    questions: Iterable[dict | Question],
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,  # pylint: disable=redefined-builtin
+    client: ApiClient | None = None,
+    site: str = DEFAULT_SITE,
+    max_workers: int = 4,
+    comments: bool = True,
+) -> tuple[int, int]:
+    """Fetches the answers of questions, and the comments of these answers, and
+    writes them to `store`.
+
+    Parameters
+    ----------
+        store: the store to write the answers and comments to.
+
+        questions: the question items or `Question` records, typically from a crawl.
+        Their `answer_count` is compared with the one stored with their answers, to
+        skip the questions without new answers.
+
+        key, access_token, site: as in `get_questions()`.
+
+        filter: Optional, the filter of both the answers and the comments calls, eg
+        to include `answer.body` and `comment.body`.
+
+        client: Optional, the `ApiClient` shared by the workers. If None is provided,
+        a client with a pool sized for the workers is created, and closed at the end.
+
+        max_workers: the maximum number of calls in flight in each stage.
+
+        comments: if False, only the answers are fetched.
+
+    Returns
+    -------
+        the number of answers, and the number of comments, written.
+    """
+    outdated = outdated_answer_counts(store, questions)
+    if any(count is None for count in outdated.values()):
+        so_logger.warning(
+            "Some questions have no 'answer_count': make sure the filter includes"
+            " it, or their answers will be fetched on every run."
+        )
+    known = {
+        question_id: count
+        for question_id, count in outdated.items()
+        if count is not None
+    }
+    # Questions which lost all their answers don't need a call
+    unanswered = [question_id for question_id, count in known.items() if count == 0]
+    store.replace_answers(unanswered, [], known)
+    to_fetch = [question_id for question_id, count in outdated.items() if count != 0]
+    so_logger.info(
+        "Fetching the answers of %s questions with new answers.", len(to_fetch)
+    )
+
+    totals = collections.Counter()
+    own_client = client is None
+    if own_client:
+        client = ApiClient(pool_maxsize=2 * max_workers)
+    try:
+
+        def answer_ids() -> Iterator[int]:
+            for batch, items in iter_ids_batches(
+                "questions/{ids}/answers",
+                to_fetch,
+                key,
+                access_token,
+                filter,
+                client,
+                site,
+                max_workers,
+            ):
+                totals["answers"] += store.replace_answers(batch, items, known)
+                yield from (item["answer_id"] for item in items)
+
+        if comments:
+            for batch, items in iter_ids_batches(
+                "answers/{ids}/comments",
+                answer_ids(),
+                key,
+                access_token,
+                filter,
+                client,
+                site,
+                max_workers,
+            ):
+                totals["comments"] += store.replace_comments(batch, items)
+        else:
+            collections.deque(answer_ids(), maxlen=0)
+    finally:
+        if own_client:
+            client.close()
+    so_logger.info(
+        "Imported %s answers and %s comments.", totals["answers"], totals["comments"]
+    )
+    return totals["answers"], totals["comments"]
@@ -3,7 +3,6 @@
 import logging
 import os
 from colorama import Back, Fore, Style
-from requests_oauthlib import OAuth2Session
 
 
 so_logger = logging.getLogger("so_importer")
@@ -100,6 +99,10 @@ def get_authorization_url(client_id: str | None) -> tuple[str, str]:
     redirect_uri = "https://stackexchange.com/oauth/login_success"
     scope = "no_expiry"
 
+    # Imported here, as the OAuth stack is slow to import, and only needed once
+    # pylint: disable-next=import-outside-toplevel
+    from requests_oauthlib import OAuth2Session
+
     oauth = OAuth2Session(client_id, redirect_uri=redirect_uri, scope=scope)
     authorization_url, state = oauth.authorization_url(
         "https://stackexchange.com/oauth/dialog"
@@ -1,14 +1,142 @@
 """Common methods to handle Stack Exchange API"""
 
+from typing import Iterable
+import itertools
+import logging
+import time
+
 import requests
 
+from stack_overflow_importer.cache import CacheMissError, ResponseCache
+from stack_overflow_importer.decoding import Decoder, decode_json
+from stack_overflow_importer.metrics import (
+    CallMetrics,
+    MetricsHook,
+    TimedHTTPAdapter,
+    emit,
+    pop_connection_timings,
+    received_bytes,
+    response_metrics,
+)
+from stack_overflow_importer.retry import (
+    DEFAULT_RETRY_POLICY,
+    RETRYABLE_EXCEPTIONS,
+    RetryPolicy,
+    decode_response,
+    is_retryable,
+)
+from stack_overflow_importer.scheduler import (
+    DEFAULT_SCHEDULER,
+    RequestScheduler,
+    normalize_method,
+)
+
+
+so_logger = logging.getLogger("so_importer")
 
 BASE_SITE = "https://api.stackexchange.com"
 VERSION = "2.3"
 
 
+class ApiClient:
+    """A reusable Stack Exchange API client, backed by a pooled `requests.Session`.
+
+    Reusing the same client across calls keeps the TCP/TLS connections to the API
+    alive, so only the first request pays for the handshake. The client can be used
+    as a context manager, which closes the pooled connections on exit.
+
+    Parameters
+    ----------
+        pool_connections: the number of connection pools to cache (one per host).
+
+        pool_maxsize: the maximum number of connections to keep in each pool. Should
+        be at least the number of threads sharing this client.
+
+        keep_alive: whether to ask the server to keep the connections open.
+
+        gzip: whether to negotiate gzip compressed responses.
+
+        timeout: the timeout in seconds for each request.
+
+        base_site: the root URL of the API, without the version.
+
+        scheduler: the `RequestScheduler` enforcing rate limits, backoffs and quota
+        for the calls made with this client. Defaults to the process-wide scheduler.
+
+        cache: Optional, a `ResponseCache` to serve repeated calls from.
+
+        decoder: Optional, the function decoding the raw response bodies. Defaults to
+        the fastest decoder available, see `decoding.get_decoder()`.
+
+        retry: Optional, the `RetryPolicy` of the calls made with this client. If
+        None is provided, the client has its own default policy, and so its own retry
+        budget.
+
+        hooks: Optional, functions receiving the `metrics.CallMetrics` of each call
+        made with this client, such as a `metrics.MetricsRecorder`.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        keep_alive: bool = True,
+        gzip: bool = True,
+        timeout: float | None = 30,
+        base_site: str = BASE_SITE,
+        scheduler: RequestScheduler | None = None,
+        cache: ResponseCache | None = None,
+        decoder: Decoder | None = None,
+        retry: RetryPolicy | None = None,
+        hooks: Iterable[MetricsHook] = (),
+    ):
+        self.base_site = base_site
+        self.scheduler = scheduler if scheduler is not None else DEFAULT_SCHEDULER
+        self.cache = cache
+        self.decoder = decoder if decoder is not None else decode_json
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.hooks = list(hooks)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = (
+            "gzip, deflate" if gzip else "identity"
+        )
+        self.session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+
+    def url(self, method: str) -> str:
+        """Builds the full URL of an API method."""
+        return f"{self.base_site}/{VERSION}/{method}"
+
+    def get(
+        self, method: str, params: dict, headers: dict | None = None
+    ) -> requests.Response:
+        """Sends a GET request to an API method using the pooled session."""
+        return self.session.get(
+            self.url(method), params=params, headers=headers, timeout=self.timeout
+        )
+
+    def close(self):
+        """Closes all the pooled connections."""
+        self.session.close()
+
+    def __enter__(self) -> "ApiClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 def query_method(
-    method: str, key: str | None, access_token: str | None, params: dict
+    method: str,
+    key: str | None,
+    access_token: str | None,
+    params: dict,
+    client: ApiClient | None = None,
 ) -> dict | None:
     """Queries a Stack Exchange API endpoint and provides the JSON response.
 
@@ -25,6 +153,17 @@ def query_method(
 
         params: a dict of parameters to pass to the API method. This method doesn't add
         any parameters, so the dict is expected to be complete (filters, etc...)
+
+        client: Optional, an `ApiClient` whose pooled session will be used for the
+        call. If None is provided, a new connection is opened for this call. If the
+        client has a cache, fresh cached responses are returned without calling the
+        API, and stale ones are revalidated.
+
+    Raises
+    ------
+        QuotaExhaustedError: if the call would consume the reserved daily quota.
+
+        CacheMissError: if the client cache is offline and the call isn't cached.
     """
     if not method:
         print("Please provide an method")
@@ -40,5 +179,126 @@ def query_method(
         print("Please provide a parameters dict")
         return None
 
-    response = requests.get(f"{BASE_SITE}/{VERSION}/{method}", params=params)
-    return response.json()
+    cache = client.cache if client is not None else None
+    decode = client.decoder if client is not None else decode_json
+    hooks = client.hooks if client is not None else ()
+    entry = None
+    if cache is not None:
+        entry = cache.get(method, params)
+        if entry is not None and (entry.fresh or cache.offline):
+            started = time.time()
+            start = time.perf_counter()
+            result = decode(entry.body)
+            elapsed = time.perf_counter() - start
+            emit(
+                hooks,
+                CallMetrics(
+                    normalize_method(method),
+                    started,
+                    cached=True,
+                    total=elapsed,
+                    decode=elapsed,
+                    **response_metrics(result),
+                ),
+            )
+            return result
+        if cache.offline:
+            raise CacheMissError(f"The '{method}' call isn't cached: {params}")
+
+    scheduler = client.scheduler if client is not None else DEFAULT_SCHEDULER
+    retry = client.retry if client is not None else DEFAULT_RETRY_POLICY
+    for attempt in itertools.count(1):
+        queue_wait = scheduler.acquire(method)
+        result = None
+        failure = None
+        response = None
+        revalidated = False
+        decode_time = 0.0
+        pop_connection_timings()
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            if client is not None:
+                response = client.get(
+                    method, params, entry.conditional_headers() if entry else None
+                )
+            else:
+                response = requests.get(
+                    f"{BASE_SITE}/{VERSION}/{method}", params=params
+                )
+            revalidated = entry is not None and response.status_code == 304
+            decode_start = time.perf_counter()
+            if revalidated:
+                cache.refresh(method, params)
+            else:
+                result = decode_response(response, decode)
+            decode_time = time.perf_counter() - decode_start
+        except RETRYABLE_EXCEPTIONS as exc:
+            failure = exc
+        finally:
+            scheduler.record(method, result)
+
+        if revalidated:
+            decode_start = time.perf_counter()
+            result = decode(entry.body)
+            decode_time = time.perf_counter() - decode_start
+        if revalidated or (
+            failure is None and not is_retryable(response.status_code, result)
+        ):
+            delay = None
+        else:
+            delay = retry.next_delay(attempt, result)
+        if hooks:
+            connect, tls = pop_connection_timings()
+            body = response_metrics(result)
+            if failure is not None:
+                body["error"] = type(failure).__name__
+            emit(
+                hooks,
+                CallMetrics(
+                    normalize_method(method),
+                    started,
+                    attempt,
+                    status=response.status_code if response is not None else None,
+                    cached=revalidated,
+                    queue_wait=queue_wait,
+                    connect=connect,
+                    tls=tls,
+                    ttfb=(
+                        response.elapsed.total_seconds()
+                        if response is not None
+                        else None
+                    ),
+                    total=time.perf_counter() - start,
+                    bytes_received=(
+                        received_bytes(response) if response is not None else 0
+                    ),
+                    decode=decode_time,
+                    retry_in=delay,
+                    **body,
+                ),
+            )
+        if revalidated:
+            return result
+        if delay is None:
+            if failure is not None:
+                raise failure
+            break
+        so_logger.warning(
+            "Attempt %s of '%s' failed (%s), retrying in %.1f s.",
+            attempt,
+            method,
+            failure if failure is not None else result.get("error_name"),
+            delay,
+        )
+        retry.sleep(delay)
+
+    if cache is not None and response.ok and "error_id" not in result:
+        cache.put(
+            method,
+            params,
+            response.content,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+    return result
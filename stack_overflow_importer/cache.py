@@ -0,0 +1,205 @@
+"""On-disk cache of Stack Exchange API responses.
+
+Responses are stored in a SQLite database, keyed on the method and its normalized
+parameters. The credentials (`key` and `access_token`) are left out of the key, so
+that the same query made with different credentials hits the same entry, and so
+that no credentials end up on disk.
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlencode
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+from stack_overflow_importer.scheduler import normalize_method
+
+
+so_logger = logging.getLogger("so_importer")
+
+DEFAULT_CACHE_PATH = "./so_importer_cache.db"
+
+CREDENTIAL_PARAMS = frozenset(("key", "access_token"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    cache_key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when a response isn't in the cache."""
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """A cached response body, and what is needed to revalidate it."""
+
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    fresh: bool
+
+    def conditional_headers(self) -> dict:
+        """Builds the headers asking the server to only send the response if it
+        changed since it was cached."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def cache_key(method: str, params: dict) -> str:
+    """Builds the cache key of a call: a hash of the method and of its parameters,
+    sorted, without the credentials."""
+    query = urlencode(
+        sorted(
+            (name, str(value))
+            for name, value in params.items()
+            if name not in CREDENTIAL_PARAMS and value is not None
+        )
+    )
+    return hashlib.sha256(f"{method.strip('/')}?{query}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """A thread-safe, size-capped cache of API responses.
+
+    Parameters
+    ----------
+        path: the path of the SQLite database file. Created if it doesn't exist.
+
+        default_ttl: how long, in seconds, a response stays fresh.
+
+        ttls: Optional, per-method TTLs overriding `default_ttl`, keyed on the method
+        name, with ID lists replaced by `{ids}` (eg `questions/{ids}/answers`). A TTL
+        of 0 disables caching for the method.
+
+        max_entries: the maximum number of responses kept. The least recently used
+        ones are evicted first.
+
+        offline: if True, every cached response is served whatever its age, and
+        `CacheMissError` is raised instead of calling the API on a miss.
+
+        clock: the wall clock, in seconds.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        default_ttl: float = 3600,
+        ttls: dict[str, float] | None = None,
+        max_entries: int = 10_000,
+        offline: bool = False,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self.offline = offline
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+
+    def ttl(self, method: str) -> float:
+        """Returns how long responses of `method` stay fresh, in seconds."""
+        return self.ttls.get(normalize_method(method), self.default_ttl)
+
+    def get(self, method: str, params: dict) -> CacheEntry | None:
+        """Looks a call up in the cache.
+
+        Returns
+        -------
+            the cached entry, fresh or stale, or None if the call was never cached.
+        """
+        key = cache_key(method, params)
+        now = self._clock()
+        with self._lock, self.connection:
+            row = self.connection.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses"
+                " WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE cache_key = ?", (now, key)
+            )
+        body, etag, last_modified, fetched_at = row
+        fresh = now - fetched_at < self.ttl(method)
+        return CacheEntry(bytes(body), etag, last_modified, fetched_at, fresh)
+
+    def put(
+        self,
+        method: str,
+        params: dict,
+        body: bytes,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ):
+        """Stores the response body of a call, evicting the least recently used
+        entries beyond `max_entries`."""
+        if self.ttl(method) <= 0:
+            return
+        now = self._clock()
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, method, body, etag,"
+                " last_modified, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key(method, params),
+                    normalize_method(method),
+                    body,
+                    etag,
+                    last_modified,
+                    now,
+                    now,
+                ),
+            )
+            self.connection.execute(
+                "DELETE FROM responses WHERE cache_key IN (SELECT cache_key FROM"
+                " responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def refresh(self, method: str, params: dict):
+        """Marks a cached response as fresh again, after the server confirmed it
+        didn't change."""
+        now = self._clock()
+        with self._lock, self.connection:
+            self.connection.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ?"
+                " WHERE cache_key = ?",
+                (now, now, cache_key(method, params)),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return row[0]
+
+    def clear(self):
+        """Removes every cached response."""
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM responses")
+
+    def close(self):
+        """Closes the database."""
+        self.connection.close()
@@ -0,0 +1,244 @@
+"""Concurrent crawl of the questions created over a large time window.
+
+The window is split into date range shards, which are fetched in parallel on a
+bounded thread pool. A shard that turns out to hold many pages is split again, so
+that busy periods are spread across workers too. All the workers share the same
+`ApiClient`, and therefore the same scheduler, so the crawl stays within the API
+rate limits whatever the number of workers. As the shards complete, the seconds of
+the window they covered are reported to an optional `ProgressReporter`.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterator
+import datetime
+import logging
+
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.progress import ProgressReporter
+from stack_overflow_importer.questions import (
+    DEFAULT_SITE,
+    MAX_PAGESIZE,
+    Order,
+    QuestionSortMethod,
+    Timestampable,
+    extract_int,
+    extract_timestamp,
+    get_questions,
+)
+
+
+so_logger = logging.getLogger("so_importer")
+
+
+@dataclass(frozen=True)
+class Shard:
+    """A range of creation dates, as inclusive Unix epoch timestamps."""
+
+    fromdate: int
+    todate: int
+
+    @property
+    def span(self) -> int:
+        """The number of seconds covered by the shard."""
+        return self.todate - self.fromdate
+
+    def split(self, parts: int = 2) -> list["Shard"]:
+        """Splits the shard into at most `parts` contiguous, non overlapping shards."""
+        parts = max(1, min(parts, self.span + 1))
+        step = (self.span + 1) / parts
+        bounds = [self.fromdate + round(step * i) for i in range(parts)]
+        bounds.append(self.todate + 1)
+        return [
+            Shard(start, end - 1)
+            for start, end in zip(bounds, bounds[1:])
+            if end - 1 >= start
+        ]
+
+
+@dataclass
+class ShardResult:
+    """The outcome of fetching a shard: its items, and the shards left to fetch."""
+
+    shard: Shard
+    items: list[dict]
+    pages: int
+    remainder: list[Shard]
+
+    @property
+    def covered(self) -> int:
+        """The number of seconds of the shard fetched, leaving out the remainder."""
+        return max(
+            0, self.shard.span + 1 - sum(rest.span + 1 for rest in self.remainder)
+        )
+
+
+def fetch_shard(
+    shard: Shard,
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,  # pylint: disable=redefined-builtin
+    tagged: str | None = None,
+    client: ApiClient | None = None,
+    max_pages: int = 5,
+    min_span: int = 60,
+    site: str = DEFAULT_SITE,
+) -> ShardResult:
+    """Fetches the questions of a shard, page by page, in creation order.
+
+    If the shard still has more results after `max_pages` pages, the rest of the
+    shard (from the creation date of the last question fetched) is returned as new
+    shards to fetch, instead of being paged through by this worker. The questions of
+    that second are left to the rest, which fetches them all, so that shards never
+    yield the same question twice. Shards shorter than `min_span` seconds are never
+    split.
+    """
+    items: list[dict] = []
+    page = 1
+    while True:
+        response = get_questions(
+            key,
+            access_token,
+            filter,
+            page,
+            MAX_PAGESIZE,
+            shard.fromdate,
+            shard.todate,
+            Order.ASC,
+            sort=QuestionSortMethod.CREATION,
+            tagged=tagged,
+            client=client,
+            site=site,
+        )
+        if not response or "error_id" in response:
+            message = response.get("error_message") if response else None
+            raise RuntimeError(
+                f"Failed to fetch page {page} of shard {shard}: {message}"
+            )
+        page_items = response.get("items", [])
+        items.extend(page_items)
+        if not response.get("has_more") or not page_items:
+            return ShardResult(shard, items, page, [])
+
+        if page >= max_pages:
+            last = page_items[-1].get("creation_date", shard.fromdate)
+            rest = Shard(max(shard.fromdate, int(last)), shard.todate)
+            if rest.span >= min_span and rest != shard:
+                items = [
+                    item
+                    for item in items
+                    if item.get("creation_date", shard.fromdate) < rest.fromdate
+                ]
+                return ShardResult(shard, items, page, rest.split(2))
+        page += 1
+
+
+def crawl_questions(
+    fromdate: Timestampable,
+    todate: Timestampable | None = None,
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,  # pylint: disable=redefined-builtin
+    tagged: str | None = None,
+    client: ApiClient | None = None,
+    max_workers: int = 4,
+    shards: int | None = None,
+    max_pages: int = 5,
+    min_span: int = 60,
+    site: str = DEFAULT_SITE,
+    progress: ProgressReporter | None = None,
+) -> Iterator[dict]:
+    """Crawls all the questions created between `fromdate` and `todate`, in parallel.
+
+    Parameters
+    ----------
+        fromdate: the start of the window. Accepts any `Timestampable`.
+
+        todate: Optional, the end of the window. Defaults to now.
+
+        key, access_token, filter, tagged: as in `get_questions()`.
+
+        client: Optional, the `ApiClient` shared by all the workers. If None is
+        provided, a client with a pool sized for `max_workers` is created, and closed
+        at the end of the crawl.
+
+        max_workers: the maximum number of shards fetched at the same time.
+
+        shards: the number of shards the window is initially split into. Defaults to
+        `max_workers`.
+
+        max_pages: the number of pages a worker fetches from a shard before splitting
+        the rest of it.
+
+        min_span: the shortest shard, in seconds, that can still be split.
+
+        site: Optional, the API name of the Stack Exchange site to crawl. The default
+        is `stackoverflow`.
+
+        progress: Optional, a `ProgressReporter` whose target is extended by the
+        seconds of the window, and which is advanced by the seconds covered by each
+        completed shard.
+
+    Yields
+    ------
+        the question items, without duplicates. Items are yielded shard by shard, as
+        the shards complete, so they are not globally sorted.
+    """
+    start = extract_timestamp("fromdate", fromdate)
+    end = (
+        extract_timestamp("todate", todate)
+        if todate is not None
+        else int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+    )
+    if end < start:
+        raise ValueError(
+            f"The 'todate' provided ({end}) is before the 'fromdate' ({start})."
+        )
+    max_workers = extract_int("max_workers", max_workers, lower=1)
+    initial = Shard(start, end).split(shards or max_workers)
+    if progress is not None:
+        progress.extend_target(end - start + 1)
+
+    own_client = client is None
+    if own_client:
+        client = ApiClient(pool_maxsize=max_workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            def submit(shard: Shard) -> Future:
+                return executor.submit(
+                    fetch_shard,
+                    shard,
+                    key,
+                    access_token,
+                    filter,
+                    tagged,
+                    client,
+                    max_pages,
+                    min_span,
+                    site,
+                )
+
+            pending = {submit(shard) for shard in initial}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        if result.remainder:
+                            so_logger.debug(
+                                "Shard %s split into %s after %s pages.",
+                                result.shard,
+                                result.remainder,
+                                result.pages,
+                            )
+                        pending |= {submit(shard) for shard in result.remainder}
+                        if progress is not None:
+                            progress.advance_by(result.covered)
+                        yield from result.items
+            finally:
+                for future in pending:
+                    future.cancel()
+    finally:
+        if own_client:
+            client.close()
@@ -0,0 +1,47 @@
+"""Decoding of the API JSON responses.
+
+Responses are decoded straight from the raw bytes received, without decoding them
+to text first. The fastest decoder available is used by default: orjson if it is
+installed, the standard library otherwise.
+"""
+
+from typing import Any, Callable
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the installed extras
+    orjson = None
+
+
+Decoder = Callable[[bytes], Any]
+"""Type alias describing a function decoding a JSON document from raw bytes."""
+
+DECODERS: dict[str, Decoder] = {"json": json.loads}
+"""Available decoders, by name. `json.loads` accepts bytes and detects their
+encoding itself."""
+if orjson is not None:
+    DECODERS["orjson"] = orjson.loads
+
+
+def get_decoder(name: str | None = None) -> Decoder:
+    """Returns the decoder named `name`, or the fastest available one if None is
+    provided.
+
+    Raises
+    ------
+        ValueError: if the decoder isn't available.
+    """
+    if name is None:
+        return DECODERS.get("orjson", json.loads)
+    try:
+        return DECODERS[name]
+    except KeyError as exc:
+        raise ValueError(
+            f"The decoder '{name}' is not available. Available decoders:"
+            f" {', '.join(DECODERS)}."
+        ) from exc
+
+
+decode_json = get_decoder()
+"""The default decoder."""
@@ -0,0 +1,160 @@
+"""Exports of question pages to files, in formats other tools can stream."""
+
+from typing import IO, Iterable
+import json
+import logging
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - depends on the installed extras
+    pyarrow = None
+
+
+so_logger = logging.getLogger("so_importer")
+
+
+def write_ndjson(pages: Iterable[dict], stream: IO[str], flush_every: int = 1) -> int:
+    """Writes the items of each page as newline delimited JSON : one compact JSON
+    document per line, as the pages arrive.
+
+    Parameters
+    ----------
+        pages: the JSON responses of the API, such as produced by
+        `iter_question_pages()`.
+
+        stream: the text stream to write to.
+
+        flush_every: flush the stream every `flush_every` pages, so that consumers
+        can read the items while the import is still running.
+
+    Returns
+    -------
+        the number of items written.
+    """
+    count = 0
+    for page_number, page in enumerate(pages, start=1):
+        items = page.get("items", [])
+        stream.writelines(
+            json.dumps(item, separators=(",", ":"), ensure_ascii=False) + "\n"
+            for item in items
+        )
+        count += len(items)
+        if page_number % flush_every == 0:
+            stream.flush()
+    stream.flush()
+    so_logger.debug("Wrote %s items as NDJSON.", count)
+    return count
+
+
+QUESTION_SCHEMA_FIELDS = (
+    ("question_id", "int64"),
+    ("title", "string"),
+    ("link", "string"),
+    ("tags", "list<string>"),
+    ("is_answered", "bool"),
+    ("view_count", "int64"),
+    ("favorite_count", "int64"),
+    ("up_vote_count", "int64"),
+    ("accepted_answer_id", "int64"),
+    ("answer_count", "int64"),
+    ("score", "int64"),
+    ("creation_date", "timestamp"),
+    ("last_activity_date", "timestamp"),
+)
+"""Columns of the question exports, matching the `INCLUDE_QUESTION` fields, with
+their type."""
+
+
+def question_schema() -> "pyarrow.Schema":
+    """Builds the Arrow schema of the question exports. Tags are a list column, and
+    dates are UTC timestamps rather than Unix epochs."""
+    if pyarrow is None:
+        raise ImportError(
+            "The Parquet export requires pyarrow. Install the 'parquet' extra."
+        )
+    types = {
+        "int64": pyarrow.int64(),
+        "string": pyarrow.string(),
+        "list<string>": pyarrow.list_(pyarrow.string()),
+        "bool": pyarrow.bool_(),
+        "timestamp": pyarrow.timestamp("s", tz="UTC"),
+    }
+    return pyarrow.schema(
+        [(name, types[type_name]) for name, type_name in QUESTION_SCHEMA_FIELDS]
+    )
+
+
+class ParquetQuestionWriter:
+    """Writes question items to a Parquet file, as they arrive.
+
+    Items are buffered until `row_group_size` of them are available, then written
+    as one row group. API pages are small, so writing a row group per page would
+    defeat the predicate pushdown of Parquet readers. The writer can be used as a
+    context manager, which writes the last row group and closes the file on exit.
+
+    Parameters
+    ----------
+        path: the path of the Parquet file to write.
+
+        row_group_size: the number of rows per row group.
+
+        compression: the Parquet compression codec.
+    """
+
+    def __init__(
+        self, path: str, row_group_size: int = 50_000, compression: str = "zstd"
+    ):
+        self.schema = question_schema()
+        self.row_group_size = row_group_size
+        self.count = 0
+        self._buffer: list[dict] = []
+        self._writer = pyarrow.parquet.ParquetWriter(
+            path, self.schema, compression=compression
+        )
+
+    def write_items(self, items: Iterable[dict]):
+        """Adds question items, writing full row groups as soon as possible."""
+        self._buffer.extend(items)
+        while len(self._buffer) >= self.row_group_size:
+            self._write_row_group(self._buffer[: self.row_group_size])
+            del self._buffer[: self.row_group_size]
+
+    def _write_row_group(self, items: list[dict]):
+        columns = {
+            name: [item.get(name) for item in items] for name in self.schema.names
+        }
+        self._writer.write_table(
+            pyarrow.Table.from_pydict(columns, schema=self.schema),
+            row_group_size=len(items),
+        )
+        self.count += len(items)
+
+    def close(self):
+        """Writes the buffered items, and closes the file."""
+        if self._buffer:
+            self._write_row_group(self._buffer)
+            self._buffer = []
+        self._writer.close()
+
+    def __enter__(self) -> "ParquetQuestionWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_parquet(
+    pages: Iterable[dict], path: str, row_group_size: int = 50_000
+) -> int:
+    """Writes the items of each page to a Parquet file, as the pages arrive.
+
+    Returns
+    -------
+        the number of items written.
+    """
+    with ParquetQuestionWriter(path, row_group_size) as writer:
+        for page in pages:
+            writer.write_items(page.get("items", []))
+    so_logger.debug("Wrote %s items to %s.", writer.count, path)
+    return writer.count
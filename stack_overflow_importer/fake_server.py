@@ -0,0 +1,301 @@
+"""A local stand-in for the Stack Exchange API, replaying recorded responses.
+
+The server answers `/2.3/questions`, `/2.3/questions/{ids}`,
+`/2.3/questions/{ids}/answers`, `/2.3/answers/{ids}/comments` and
+`/2.3/filters/create` from a corpus of question, answer and comment items, typically
+loaded from recorded responses. It models the parts of the API the importer depends
+on : paging with `has_more`, date bounds, the daily quota counters, `backoff`, and
+throttle violations. Latency can be added to each response, so that the throughput
+of the crawler and the behaviour of the scheduler can be measured without a network
+and without spending quota.
+
+Example
+-------
+    with FakeStackExchangeServer.from_recordings(["page.json"]) as server:
+        with ApiClient(base_site=server.base_site) as client:
+            items = list(iter_questions(client=client))
+"""
+
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable
+from urllib.parse import parse_qs, urlsplit
+import collections
+import gzip
+import hashlib
+import json
+import pathlib
+import threading
+import time
+
+from stack_overflow_importer.scheduler import normalize_method
+
+NO_BOUND = 2**63
+
+SORT_FIELDS = {
+    "activity": "last_activity_date",
+    "creation": "creation_date",
+    "votes": "score",
+}
+"""Item field each `sort` method orders on. Others fall back to the activity."""
+
+
+class FakeStackExchangeServer:
+    """A threaded HTTP server faking the Stack Exchange API.
+
+    Parameters
+    ----------
+        questions: the question items served by the `questions` methods.
+
+        answers: the answer items served by `questions/{ids}/answers`.
+
+        comments: the comment items served by `answers/{ids}/comments`.
+
+        filters: Optional, recorded `filters/create` responses, keyed on the
+        `include` parameter. Other filters get a made up ID.
+
+        latency: the number of seconds to wait before sending each response.
+
+        quota_max: the daily quota. Once spent, every call fails with a throttle
+        violation.
+
+        max_rate: Optional, the maximum number of requests per second. Going over
+        fails with a throttle violation.
+
+        backoff: Optional, a `backoff` in seconds added to every `backoff_every`
+        responses of a method. Calling the method again before the backoff expired
+        fails with a throttle violation.
+
+        backoff_every: how often to send a `backoff`.
+
+        throttle_status: the HTTP status of throttle violations. The API reports them
+        as `error_id` 502, `throttle_violation`.
+
+        host: the address to listen on.
+
+        port: the port to listen on. 0 picks a free port.
+    """
+
+    def __init__(
+        self,
+        questions: Iterable[dict] = (),
+        answers: Iterable[dict] = (),
+        comments: Iterable[dict] = (),
+        filters: dict[str, dict] | None = None,
+        latency: float = 0.0,
+        quota_max: int = 10_000,
+        max_rate: float | None = None,
+        backoff: int | None = None,
+        backoff_every: int = 10,
+        throttle_status: int = HTTPStatus.BAD_GATEWAY,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.questions = sorted(questions, key=lambda item: item["question_id"])
+        self._by_id = {item["question_id"]: item for item in self.questions}
+        self.answers = sorted(answers, key=lambda item: item["answer_id"])
+        self.comments = sorted(comments, key=lambda item: item["comment_id"])
+        self.filters = dict(filters or {})
+        self.latency = latency
+        self.quota_max = quota_max
+        self.quota_remaining = quota_max
+        self.max_rate = max_rate
+        self.backoff = backoff
+        self.backoff_every = backoff_every
+        self.throttle_status = throttle_status
+        self.requests: collections.Counter = collections.Counter()
+        self.sites: collections.Counter = collections.Counter()
+        self.throttled = 0
+        self._backoff_until: dict[str, float] = {}
+        self._recent: collections.deque = collections.deque()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_recordings(
+        cls, paths: Iterable[str | pathlib.Path], **kwargs
+    ) -> "FakeStackExchangeServer":
+        """Builds a server serving the question items of recorded `questions`
+        responses, one JSON file per page."""
+        questions: dict[int, dict] = {}
+        for path in paths:
+            page = json.loads(pathlib.Path(path).read_bytes())
+            for item in page.get("items", []):
+                questions[item["question_id"]] = item
+        return cls(questions.values(), **kwargs)
+
+    @property
+    def base_site(self) -> str:
+        """The root URL of the fake API, to pass to `ApiClient(base_site=...)`."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self) -> int:
+        """The total number of requests received."""
+        return sum(self.requests.values())
+
+    def start(self) -> "FakeStackExchangeServer":
+        """Starts serving in a background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving, and closes the socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeStackExchangeServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _throttle(self, method: str) -> str | None:
+        """Accounts for a request, and returns why it is throttled, if it is."""
+        now = time.monotonic()
+        with self._lock:
+            self.requests[method] += 1
+            if self.quota_remaining <= 0:
+                return "The daily quota is exhausted."
+            self.quota_remaining -= 1
+            if self.max_rate is not None:
+                while self._recent and now - self._recent[0] >= 1:
+                    self._recent.popleft()
+                self._recent.append(now)
+                if len(self._recent) > self.max_rate:
+                    return "too many requests from this IP, more requests available"
+            if self._backoff_until.get(method, 0) > now:
+                return f"Violation of backoff parameter on '{method}'."
+            return None
+
+    def _envelope(self, method: str, body: dict) -> dict:
+        """Adds the common wrapper fields to a response."""
+        with self._lock:
+            body["quota_max"] = self.quota_max
+            body["quota_remaining"] = self.quota_remaining
+            if self.backoff and self.requests[method] % self.backoff_every == 0:
+                body["backoff"] = self.backoff
+                self._backoff_until[method] = time.monotonic() + self.backoff
+        return body
+
+    def handle(self, path: str, query: dict[str, str]) -> tuple[int, dict]:
+        """Answers a request.
+
+        Returns
+        -------
+            the HTTP status, and the JSON body.
+        """
+        parts = path.strip("/").split("/")
+        if len(parts) < 2 or parts[0] != "2.3":
+            return HTTPStatus.NOT_FOUND, _error(404, "no_method", "No such method.")
+        method = normalize_method("/".join(parts[1:]))
+        with self._lock:
+            self.sites[query.get("site")] += 1
+        reason = self._throttle(method)
+        if reason is not None:
+            with self._lock:
+                self.throttled += 1
+            return self.throttle_status, _error(502, "throttle_violation", reason)
+
+        if method == "questions":
+            return HTTPStatus.OK, self._envelope(method, self._questions(query))
+        if method == "questions/{ids}":
+            ids = [int(i) for i in parts[2].split(";") if i.isdigit()]
+            items = [self._by_id[i] for i in ids if i in self._by_id]
+            return HTTPStatus.OK, self._envelope(method, _page(items, query))
+        if method == "questions/{ids}/answers":
+            ids = {int(i) for i in parts[2].split(";") if i.isdigit()}
+            items = [item for item in self.answers if item["question_id"] in ids]
+            return HTTPStatus.OK, self._envelope(method, _page(items, query))
+        if method == "answers/{ids}/comments":
+            ids = {int(i) for i in parts[2].split(";") if i.isdigit()}
+            items = [item for item in self.comments if item["post_id"] in ids]
+            return HTTPStatus.OK, self._envelope(method, _page(items, query))
+        if method == "filters/create":
+            body = self.filters.get(query.get("include", ""))
+            if body is None:
+                spec = repr(sorted(query.items())).encode("utf-8")
+                fake_id = f"!fake{hashlib.sha256(spec).hexdigest()[:12]}"
+                body = {"items": [{"filter": fake_id, "filter_type": "safe"}]}
+            return HTTPStatus.OK, self._envelope(method, dict(body))
+        return HTTPStatus.NOT_FOUND, _error(404, "no_method", "No such method.")
+
+    def _questions(self, query: dict[str, str]) -> dict:
+        """Answers a `questions` call. As in the API, `fromdate` and `todate` bound
+        the creation date, while `min` and `max` bound the field sorted on."""
+        field = SORT_FIELDS.get(query.get("sort", "activity"), "last_activity_date")
+        fromdate = int(query.get("fromdate", 0))
+        todate = int(query.get("todate", NO_BOUND))
+        low = int(query.get("min", 0))
+        high = int(query.get("max", NO_BOUND))
+        matching = [
+            item
+            for item in self.questions
+            if fromdate <= item.get("creation_date", 0) <= todate
+            and low <= item.get(field, 0) <= high
+        ]
+        matching.sort(
+            key=lambda item: (item.get(field, 0), item["question_id"]),
+            reverse=query.get("order", "desc") == "desc",
+        )
+        return _page(matching, query)
+
+
+def _page(items: list[dict], query: dict[str, str]) -> dict:
+    """Slices a page of items, as requested by `page` and `pagesize`."""
+    page = int(query.get("page", 1))
+    pagesize = int(query.get("pagesize", 30))
+    start = (page - 1) * pagesize
+    return {
+        "items": items[start : start + pagesize],
+        "has_more": start + pagesize < len(items),
+        "page": page,
+        "page_size": pagesize,
+    }
+
+
+def _error(error_id: int, name: str, message: str) -> dict:
+    """Builds an API error response."""
+    return {"error_id": error_id, "error_name": name, "error_message": message}
+
+
+def _make_handler(server: FakeStackExchangeServer) -> type:
+    """Builds the request handler class bound to `server`."""
+
+    class Handler(BaseHTTPRequestHandler):
+        """Serves the requests of a `FakeStackExchangeServer`."""
+
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        # pylint: disable=invalid-name
+        def do_GET(self):
+            """Answers a GET request."""
+            url = urlsplit(self.path)
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            status, body = server.handle(url.path, query)
+            if server.latency:
+                time.sleep(server.latency)
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                payload = gzip.compress(payload, compresslevel=1)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            """Silences the default logging to stderr."""
+
+    return Handler
@@ -1,6 +1,15 @@
 """Module handling Stack Exchange API filters."""
 
-from stack_overflow_importer.base import query_method
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from stack_overflow_importer.base import ApiClient, query_method
+
+
+so_logger = logging.getLogger("so_importer")
 
 """
 Default fields that should be used for all filters
@@ -25,13 +34,14 @@ INCLUDE_QUESTION = (
     "question.tags;"
     "question.is_answered;"
     "question.view_count;"
-    "question.favourite_count;"
-    "question.upvote_count;"
+    "question.favorite_count;"
+    "question.up_vote_count;"
     "question.accepted_answer_id;"
     "question.answer_count;"
     "question.score;"
     "question.creation_date;"
-    "question.id;"
+    "question.last_activity_date;"
+    "question.question_id;"
     "question.link;"
     "question.title;"
     # 'question.body;'
@@ -57,6 +67,26 @@ INCLUDE_QUESTION_TEST = (
 """Filter string that can be used for testing questions.
 Generated with 2.3 API on June 2022."""
 QUESTION_TEST_FILTER_ID = "!)GrKmj4SO9s6)An"
+"""Path of the on-disk cache of filter IDs used by `FilterRegistry`."""
+DEFAULT_FILTER_CACHE_PATH = "./so_importer_filters.json"
+"""
+Question fields of the `default` filter of the API, used when no filter is provided
+"""
+DEFAULT_FILTER_QUESTION_FIELDS = frozenset(
+    {
+        "tags",
+        "is_answered",
+        "view_count",
+        "accepted_answer_id",
+        "answer_count",
+        "score",
+        "last_activity_date",
+        "creation_date",
+        "question_id",
+        "link",
+        "title",
+    }
+)
 
 
 def create_filter(
@@ -66,6 +96,7 @@ def create_filter(
     include: str | None = None,
     exclude: str | None = None,
     unsafe: bool = False,
+    client: ApiClient | None = None,
 ) -> str | None:
     """Creates a custom filter for Stack Exchange API
 
@@ -89,6 +120,8 @@ def create_filter(
 
     unsafe: whether the filter can be unsafe or not (see Stack Exchange doc on Filters)
 
+    client: Optional, an `ApiClient` to reuse pooled connections.
+
     Returns
     ----------
         a json string as returned by `filters/create` method
@@ -101,7 +134,7 @@ def create_filter(
     if exclude:
         params["exclude"] = exclude
     params["unsafe"] = unsafe
-    return query_method("filters/create", key, access_token, params)
+    return query_method("filters/create", key, access_token, params, client)
 
 
 def get_filter_id(filter_jason) -> str | None:
@@ -118,3 +151,151 @@ def get_filter_id(filter_jason) -> str | None:
     if not filter_jason:
         return None
     return filter_jason.get("items")[0].get("filter")
+
+
+def _normalize_fields(fields: str | None) -> list[str]:
+    """Splits a semicolon separated list of fields into a sorted list, without
+    duplicates or empty fields."""
+    if not fields:
+        return []
+    return sorted({field.strip() for field in fields.split(";")} - {""})
+
+
+def included_fields(include: str | None, kind: str = "question") -> frozenset[str]:
+    """Returns the fields of the `kind` items, such as `question`, that a semicolon
+    separated list of fields includes.
+
+    For example, `included_fields(INCLUDE_QUESTION)` gives `title`, `tags`...
+    """
+    prefix = f"{kind}."
+    return frozenset(
+        field[len(prefix) :]
+        for field in _normalize_fields(include)
+        if field.startswith(prefix)
+    )
+
+
+def question_filter_fields(
+    filter_id: str | None, registry: "FilterRegistry | None" = None
+) -> frozenset[str] | None:
+    """Returns the question fields a filter includes, for the `default` filter of the
+    API and the question filter created by `so_updater`.
+
+    Parameters
+    ----------
+        filter_id: the ID of the filter, or None for the `default` filter.
+
+        registry: Optional, the `FilterRegistry` the question filter was cached in.
+
+    Returns
+    -------
+        the names of the fields, or None if they are unknown, such as those of a
+        filter provided with `--filter`.
+    """
+    if filter_id is None:
+        return DEFAULT_FILTER_QUESTION_FIELDS
+    registry = registry if registry is not None else FilterRegistry()
+    if filter_id == registry.get("default", INCLUDE_DEFAULT + INCLUDE_QUESTION):
+        return DEFAULT_FILTER_QUESTION_FIELDS | included_fields(INCLUDE_QUESTION)
+    return None
+
+
+def filter_spec_hash(
+    base: str,
+    include: str | None = None,
+    exclude: str | None = None,
+    unsafe: bool = False,
+) -> str:
+    """Hashes a filter specification, as passed to `create_filter()`.
+
+    The order of the included and excluded fields doesn't matter, so equivalent
+    specifications share the same hash.
+    """
+    spec = json.dumps(
+        [base, _normalize_fields(include), _normalize_fields(exclude), bool(unsafe)]
+    )
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+
+class FilterRegistry:
+    """On-disk cache of the filter IDs returned by `filters/create`.
+
+    Filters are immutable on the API side: the same specification always produces
+    the same filter, so its ID can be reused by every run and every worker instead
+    of spending a call and a quota unit recreating it.
+
+    Parameters
+    ----------
+        path: the path of the JSON file holding the cache. Created on first write.
+    """
+
+    def __init__(self, path: str = DEFAULT_FILTER_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            so_logger.warning("Ignoring the unreadable filter cache %s.", self.path)
+            return {}
+
+    def _save(self, cache: dict):
+        # Write then rename, so that concurrent readers never see a partial file.
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(cache, cache_file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def get(
+        self,
+        base: str,
+        include: str | None = None,
+        exclude: str | None = None,
+        unsafe: bool = False,
+    ) -> str | None:
+        """Returns the cached ID of a filter, or None if it was never created."""
+        return self._load().get(filter_spec_hash(base, include, exclude, unsafe))
+
+    def get_or_create(
+        self,
+        key: str | None,
+        access_token: str | None,
+        base: str,
+        include: str | None = None,
+        exclude: str | None = None,
+        unsafe: bool = False,
+        client: ApiClient | None = None,
+    ) -> str | None:
+        """Returns the ID of a filter, creating it with `create_filter()` only if it
+        isn't in the cache yet.
+
+        Returns
+        -------
+            the filter ID, or None if the filter couldn't be created.
+        """
+        spec_hash = filter_spec_hash(base, include, exclude, unsafe)
+        with self._lock:
+            filter_id = self._load().get(spec_hash)
+            if filter_id:
+                return filter_id
+
+            response = create_filter(
+                key, access_token, base, include, exclude, unsafe, client
+            )
+            if not response or not response.get("items"):
+                so_logger.error(
+                    "Couldn't create the filter : %s",
+                    response.get("error_message") if response else None,
+                )
+                return None
+            filter_id = get_filter_id(response)
+            # Reload, in case another process added filters in the meantime.
+            cache = self._load()
+            cache[spec_hash] = filter_id
+            self._save(cache)
+            so_logger.info("Created and cached the filter %s.", filter_id)
+            return filter_id
@@ -0,0 +1,216 @@
+"""Checkpointed, resumable imports of questions into the store.
+
+An import job pages through a `questions` query and upserts each page into a
+`QuestionStore`. Each page is committed with a checkpoint of the job, in the same
+transaction: the checkpoint holds the last page written, the cursor reached, and the
+quota used so far. If the job is interrupted, running it again with `resume=True`
+continues where it stopped.
+
+Pages shift while a long job runs, as questions get new activity, votes, or are
+created. Jobs sorted by activity, creation or votes therefore resume from their
+cursor, by bounding the query with it, rather than from their next page. Only the
+questions sharing the cursor value are fetched again, and they aren't counted twice.
+Jobs sorted by hot, week or month, which can't be bounded, resume from their page.
+
+Jobs are identified by their query, without the page: resuming requires running the
+same query again.
+"""
+
+from dataclasses import replace
+import hashlib
+import json
+import logging
+import time
+
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.filters import question_filter_fields
+from stack_overflow_importer.progress import ProgressReporter
+from stack_overflow_importer.questions import (
+    DATE_BOUND_SORT,
+    INT_BOUND_SORT,
+    Order,
+    QuestionQuery,
+    QuestionSortMethod,
+    iter_query_pages,
+)
+from stack_overflow_importer.store import ImportCheckpoint, QuestionStore
+
+so_logger = logging.getLogger("so_importer")
+
+CURSOR_FIELDS = {
+    "activity": "last_activity_date",
+    "creation": "creation_date",
+    "votes": "score",
+}
+"""Item field recorded as the cursor of a job, for each sort method."""
+
+
+def job_query(query: QuestionQuery) -> str:
+    """Serializes the parameters identifying a job: the query, without the page."""
+    params = query.to_params()
+    params.pop("page", None)
+    return json.dumps(params, sort_keys=True)
+
+
+def import_job_id(query: QuestionQuery) -> str:
+    """Builds the ID of the import job running `query`."""
+    return hashlib.sha256(job_query(query).encode("utf-8")).hexdigest()[:16]
+
+
+def resume_query(query: QuestionQuery, checkpoint: ImportCheckpoint) -> QuestionQuery:
+    """Builds the query continuing a job after its checkpoint : the first page of
+    the query bounded by the cursor, when its sort can be bounded, else its next
+    page. The bound is inclusive, so questions sharing the cursor value are fetched
+    again rather than skipped."""
+    sort = query.sort or QuestionSortMethod.ACTIVITY.value
+    if checkpoint.cursor is None or sort not in DATE_BOUND_SORT | INT_BOUND_SORT:
+        return query.with_page(checkpoint.page + 1)
+    if (query.order or Order.DESC.value) == Order.ASC.value:
+        return replace(query, min=checkpoint.cursor, page=1)
+    return replace(query, max=checkpoint.cursor, page=1)
+
+
+def skip_committed(
+    store: QuestionStore, items: list[dict], cursor_field: str, boundary: int
+) -> list[dict]:
+    """Leaves out the items fetched again by a job resumed from its cursor : the
+    stored questions whose cursor is the bound of the resumed query."""
+    at_boundary = [
+        item["question_id"] for item in items if item.get(cursor_field) == boundary
+    ]
+    if not at_boundary:
+        return items
+    stored = {item["question_id"] for item in store.get_questions(at_boundary)}
+    return [item for item in items if item["question_id"] not in stored]
+
+
+def cursor_target(query: QuestionQuery) -> int | None:
+    """Estimates the cursor value a job will stop at : its `min` or `max` bound, in
+    the direction of its order. Creation dates are also bound by `fromdate` and
+    `todate`, and ascending dates by the current time.
+
+    Returns
+    -------
+        the target, or None if the job is unbounded.
+    """
+    if query.order == Order.ASC.value:
+        target = query.max
+        if target is None and query.sort == "creation":
+            target = query.todate
+        if target is None and query.sort in DATE_BOUND_SORT:
+            target = int(time.time())
+        return target
+    target = query.min
+    if target is None and query.sort == "creation":
+        target = query.fromdate
+    return target
+
+
+def run_import_job(
+    store: QuestionStore,
+    query: QuestionQuery,
+    key: str | None = None,
+    access_token: str | None = None,
+    client: ApiClient | None = None,
+    resume: bool = False,
+    max_pages: int | None = None,
+    progress: ProgressReporter | None = None,
+) -> ImportCheckpoint | None:
+    """Imports the questions of `query` into `store`, page by page, checkpointing
+    after every page.
+
+    Parameters
+    ----------
+        store: the store to write the questions and the checkpoints to.
+
+        query: the query to import, starting from its page.
+
+        key, access_token: as in `get_questions()`.
+
+        client: Optional, an `ApiClient` to reuse pooled connections.
+
+        resume: if True, and the job was checkpointed before, continues after its last
+        committed page instead of starting from the page of `query`, see
+        `resume_query()`. A completed job is not run again.
+
+        max_pages: Optional, the maximum number of pages to fetch in this run. A
+        later run with `resume=True` continues from there. If None, the job runs
+        until the last page.
+
+        progress: Optional, a `ProgressReporter` following the cursor of the job,
+        shown as a date unless the job is sorted by votes.
+
+    Returns
+    -------
+        the last checkpoint of the job, or None if no page was committed.
+    """
+    job_id = import_job_id(query)
+    serialized = job_query(query)
+    page = query.page or 1
+    checkpoint = store.get_checkpoint(job_id) if resume else None
+    if checkpoint is not None and checkpoint.done:
+        so_logger.info(
+            "Import job %s is already complete : %s questions in %s pages.",
+            job_id,
+            checkpoint.items,
+            checkpoint.page,
+        )
+        return checkpoint
+    boundary = None
+    if checkpoint is not None:
+        query = resume_query(query, checkpoint)
+        page = checkpoint.page + 1
+        if query.page == 1:
+            boundary = checkpoint.cursor
+        so_logger.info(
+            "Resuming import job %s from page %s (cursor %s), %s questions already"
+            " imported.",
+            job_id,
+            page,
+            checkpoint.cursor,
+            checkpoint.items,
+        )
+    elif resume:
+        so_logger.info("No checkpoint for import job %s, starting afresh.", job_id)
+
+    cursor_field = CURSOR_FIELDS.get(query.sort or QuestionSortMethod.ACTIVITY.value)
+    fields = question_filter_fields(query.filter)
+    if progress is not None:
+        progress.date_cursor = cursor_field != "score"
+        progress.set_target(cursor_target(query))
+    fetched = 0
+    for response in iter_query_pages(query, key, access_token, client):
+        fetched += 1
+        items = response.get("items", [])
+        if boundary is not None:
+            items = skip_committed(store, items, cursor_field, boundary)
+        cursor = checkpoint.cursor if checkpoint else None
+        if items and cursor_field and items[-1].get(cursor_field) is not None:
+            cursor = items[-1][cursor_field]
+        done = not response.get("has_more")
+        checkpoint = ImportCheckpoint(
+            job_id,
+            serialized,
+            page,
+            cursor,
+            (checkpoint.quota_used if checkpoint else 0) + 1,
+            (checkpoint.items if checkpoint else 0) + len(items),
+            done,
+        )
+        store.upsert_questions(items, checkpoint, fields)
+        so_logger.debug("Import job %s committed page %s.", job_id, page)
+        if progress is not None:
+            progress.advance(cursor)
+        if done or (max_pages is not None and fetched >= max_pages):
+            break
+        page += 1
+
+    stopped_early = max_pages is None or fetched < max_pages
+    if checkpoint is not None and not checkpoint.done and stopped_early:
+        so_logger.warning(
+            "Import job %s stopped after page %s. Run it again with --resume to"
+            " continue.",
+            job_id,
+            checkpoint.page,
+        )
+    return checkpoint
@@ -0,0 +1,422 @@
+"""Instrumentation of the API calls : per call metrics, hooks, and histograms.
+
+Every HTTP attempt made by `base.query_method()`, and every response it serves from
+the cache, is described by a `CallMetrics` record, passed to the hooks of the
+`ApiClient`. The attempts of `aio.async_query_method()` are passed to the hooks of
+the `AsyncApiClient` the same way. A hook is any callable taking the record. Two are
+provided:
+- `MetricsRecorder`, which aggregates the records into in-process histograms, and
+  renders an end of run summary,
+- `OpenTelemetryHook`, which turns each record into an OpenTelemetry span, if the
+  `opentelemetry-api` package is installed.
+
+The time to open a connection is measured by the connection classes of
+`TimedHTTPAdapter`, which `ApiClient` mounts on its session. Name resolution and the
+TCP handshake are measured together, as `connect`, and the TLS handshake apart, as
+`tls`. Both are None for calls made on a reused connection.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Callable, Iterable
+import logging
+import math
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover - depends on the installed extras
+    trace = None
+
+
+so_logger = logging.getLogger("so_importer")
+
+TIME_BUCKETS = tuple(0.001 * 2**i for i in range(17))
+"""Upper bounds of the duration histograms, in seconds : 1 ms to 65 s."""
+
+SIZE_BUCKETS = tuple(256 * 2**i for i in range(17))
+"""Upper bounds of the size histograms, in bytes : 256 B to 16 MiB."""
+
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 30, 50, 100)
+"""Upper bounds of the histograms of items per page."""
+
+
+@dataclass(frozen=True, slots=True)
+class CallMetrics:
+    """The measurements of one API call attempt. Durations are in seconds, and
+    measurements which don't apply to the call are None.
+
+    Attributes
+    ----------
+        method: the API method, with `{ids}` in place of vectorized IDs.
+
+        started: when the attempt started, as a Unix timestamp.
+
+        attempt: the attempt number, 1 for the first call, more for retries.
+
+        status: the HTTP status, None if the call failed before a response.
+
+        cached: whether the response was served, or revalidated, from the cache.
+
+        queue_wait: the time spent waiting for the scheduler, backoffs included.
+
+        connect: the time to resolve the host and open a TCP connection.
+
+        tls: the time of the TLS handshake.
+
+        ttfb: the time from sending the request to receiving the response headers.
+
+        total: the time of the attempt, from sending the request to decoding the
+        body, excluding `queue_wait`.
+
+        bytes_received: the size of the body received, compressed.
+
+        decode: the time spent decoding the body.
+
+        items: the number of items of the response.
+
+        quota_remaining: the remaining daily quota reported by the response.
+
+        backoff: the backoff requested by the response, in seconds.
+
+        error: the `error_name` of an error response, or the name of the exception
+        raised.
+
+        retry_in: the delay before the next attempt, if this one is retried.
+    """
+
+    method: str
+    started: float
+    attempt: int = 1
+    status: int | None = None
+    cached: bool = False
+    queue_wait: float = 0.0
+    connect: float | None = None
+    tls: float | None = None
+    ttfb: float | None = None
+    total: float = 0.0
+    bytes_received: int = 0
+    decode: float = 0.0
+    items: int | None = None
+    quota_remaining: int | None = None
+    backoff: int | None = None
+    error: str | None = None
+    retry_in: float | None = None
+
+
+MetricsHook = Callable[[CallMetrics], None]
+"""Type alias describing a function receiving the metrics of each call."""
+
+
+def emit(hooks: Iterable[MetricsHook], metrics: CallMetrics):
+    """Passes `metrics` to each hook. A failing hook is logged, and doesn't fail the
+    call."""
+    for hook in hooks:
+        try:
+            hook(metrics)
+        # pylint: disable=broad-except
+        except Exception:
+            so_logger.warning("The metrics hook %r failed.", hook, exc_info=True)
+
+
+def response_metrics(result: dict | None) -> dict:
+    """Extracts the metrics reported in the body of a response."""
+    if not isinstance(result, dict):
+        return {}
+    items = result.get("items")
+    return {
+        "items": len(items) if isinstance(items, list) else None,
+        "quota_remaining": result.get("quota_remaining"),
+        "backoff": result.get("backoff"),
+        "error": result.get("error_name"),
+    }
+
+
+def received_bytes(response: requests.Response) -> int:
+    """Returns the number of bytes received for a response body, before
+    decompression when possible."""
+    try:
+        wire = response.raw.tell()
+    except (AttributeError, OSError):
+        wire = 0
+    return wire or len(response.content)
+
+
+# Connection timings, measured in the thread sending the request
+_connection_timings = threading.local()
+
+
+def pop_connection_timings() -> tuple[float | None, float | None]:
+    """Returns, and resets, the connect and TLS times of the connection opened by
+    the last request of the current thread.
+
+    Returns
+    -------
+        the connect and TLS times, None if no connection was opened.
+    """
+    timings = (
+        getattr(_connection_timings, "connect", None),
+        getattr(_connection_timings, "tls", None),
+    )
+    _connection_timings.connect = _connection_timings.tls = None
+    return timings
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """An HTTP connection recording the time it took to open."""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _connection_timings.connect = time.perf_counter() - start
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """An HTTPS connection recording the time it took to open, and to handshake."""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _connection_timings.connect = time.perf_counter() - start
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            elapsed = time.perf_counter() - start
+            _connection_timings.tls = elapsed - (_connection_timings.connect or 0.0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    """A pool of `TimedHTTPConnection`."""
+
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    """A pool of `TimedHTTPSConnection`."""
+
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """A transport adapter whose connections record how long they took to open, see
+    `pop_connection_timings()`."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class Histogram:
+    """A histogram with fixed buckets, keeping the exact count, sum, minimum and
+    maximum. Quantiles are estimated from the buckets.
+
+    Parameters
+    ----------
+        bounds: the sorted upper bounds of the buckets. Values above the last bound
+        go to an overflow bucket.
+    """
+
+    def __init__(self, bounds: Iterable[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float):
+        """Adds a value to the histogram."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        """The mean of the values, 0 if there are none."""
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimates the `q` quantile, as the upper bound of the bucket holding it,
+        capped by the maximum.
+
+        Returns
+        -------
+            the estimate, 0 if there are no values.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        for index, bucket_count in enumerate(self.counts):
+            rank -= bucket_count
+            if rank <= 0:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+
+class MetricsRecorder:
+    """A metrics hook aggregating the calls into histograms and counters. It is
+    thread-safe, so one recorder can be shared by all the clients of a run.
+
+    Example
+    -------
+        recorder = MetricsRecorder()
+        with ApiClient(hooks=[recorder]) as client:
+            ...
+        print(recorder.summary())
+    """
+
+    HISTOGRAMS = {
+        "queue_wait": TIME_BUCKETS,
+        "connect": TIME_BUCKETS,
+        "tls": TIME_BUCKETS,
+        "ttfb": TIME_BUCKETS,
+        "total": TIME_BUCKETS,
+        "decode": TIME_BUCKETS,
+        "bytes_received": SIZE_BUCKETS,
+        "items": COUNT_BUCKETS,
+    }
+    """The histograms kept, named after the `CallMetrics` attributes."""
+
+    def __init__(self):
+        self.histograms = {
+            name: Histogram(bounds) for name, bounds in self.HISTOGRAMS.items()
+        }
+        self.calls = 0
+        self.cached = 0
+        self.errors = 0
+        self.retries = 0
+        self.retry_wait = 0.0
+        self.backoffs = 0
+        self.backoff_total = 0
+        self.quota_remaining: int | None = None
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics: CallMetrics):
+        with self._lock:
+            self.calls += 1
+            self.cached += metrics.cached
+            self.errors += metrics.error is not None
+            if metrics.retry_in is not None:
+                self.retries += 1
+                self.retry_wait += metrics.retry_in
+            if metrics.backoff:
+                self.backoffs += 1
+                self.backoff_total += metrics.backoff
+            if metrics.quota_remaining is not None:
+                self.quota_remaining = (
+                    metrics.quota_remaining
+                    if self.quota_remaining is None
+                    else min(self.quota_remaining, metrics.quota_remaining)
+                )
+            if metrics.cached and metrics.status is None:
+                # Served from the cache, without a call : nothing to time
+                return
+            for name, histogram in self.histograms.items():
+                value = getattr(metrics, name)
+                if value is not None:
+                    histogram.record(value)
+
+    def summary(self) -> str:
+        """Renders the counters and histograms as a text table."""
+        with self._lock:
+            lines = [
+                f"API calls: {self.calls} ({self.cached} from the cache),"
+                f" {self.errors} errors, {self.retries} retries"
+                f" ({self.retry_wait:.1f} s waited)",
+                f"Backoffs: {self.backoffs} ({self.backoff_total} s requested),"
+                f" quota remaining: {self.quota_remaining}",
+                f"{'metric':<16}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}"
+                f"{'max':>10}",
+            ]
+            for name, histogram in self.histograms.items():
+                if not histogram.count:
+                    continue
+                if histogram.bounds is TIME_BUCKETS:
+                    unit, scale = "ms", 1000
+                else:
+                    unit, scale = "", 1
+                values = (
+                    histogram.mean,
+                    histogram.quantile(0.5),
+                    histogram.quantile(0.95),
+                    histogram.max,
+                )
+                lines.append(
+                    f"{name + (f' ({unit})' if unit else ''):<16}"
+                    f"{histogram.count:>8}"
+                    + "".join(f"{value * scale:>10.1f}" for value in values)
+                )
+        return "\n".join(lines)
+
+
+class OpenTelemetryHook:
+    """A metrics hook recording each call as an OpenTelemetry span, child of the
+    span active when the call was made.
+
+    Parameters
+    ----------
+        tracer: Optional, the tracer creating the spans. Defaults to the tracer of
+        this package, from the global tracer provider.
+
+    Raises
+    ------
+        ImportError: if `opentelemetry-api` isn't installed.
+    """
+
+    def __init__(self, tracer=None):
+        if trace is None:
+            raise ImportError(
+                "Tracing requires opentelemetry-api. Install the 'tracing' extra."
+            )
+        self.tracer = tracer if tracer is not None else trace.get_tracer(__package__)
+
+    def __call__(self, metrics: CallMetrics):
+        attributes = {
+            f"stackexchange.{name}": value
+            for name, value in (
+                ("method", metrics.method),
+                ("attempt", metrics.attempt),
+                ("cached", metrics.cached),
+                ("queue_wait", metrics.queue_wait),
+                ("connect", metrics.connect),
+                ("tls", metrics.tls),
+                ("ttfb", metrics.ttfb),
+                ("bytes_received", metrics.bytes_received),
+                ("decode", metrics.decode),
+                ("items", metrics.items),
+                ("quota_remaining", metrics.quota_remaining),
+                ("backoff", metrics.backoff),
+                ("error", metrics.error),
+            )
+            if value is not None
+        }
+        if metrics.status is not None:
+            attributes["http.status_code"] = metrics.status
+        span = self.tracer.start_span(
+            f"GET {metrics.method}",
+            kind=trace.SpanKind.CLIENT,
+            attributes=attributes,
+            start_time=int(metrics.started * 1e9),
+        )
+        if metrics.error is not None:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, metrics.error))
+        span.end(end_time=int((metrics.started + metrics.total) * 1e9))
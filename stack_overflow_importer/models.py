@@ -0,0 +1,67 @@
+"""Compact record types for the items returned by the API.
+
+API responses decode into nested dicts, which cost several hundred bytes each. These
+records use `__slots__` instead of a per-instance dict, and intern the tags, which
+are repeated across millions of questions, so long running processes can hold many
+more items in memory.
+"""
+
+from dataclasses import dataclass, fields
+import sys
+
+
+@dataclass(slots=True)
+class Question:
+    """A question, with the fields listed in `filters.INCLUDE_QUESTION`.
+
+    Fields which the filter didn't include are None.
+    """
+
+    question_id: int
+    title: str | None = None
+    link: str | None = None
+    tags: tuple[str, ...] | None = None
+    is_answered: bool | None = None
+    view_count: int | None = None
+    favorite_count: int | None = None
+    up_vote_count: int | None = None
+    accepted_answer_id: int | None = None
+    answer_count: int | None = None
+    score: int | None = None
+    creation_date: int | None = None
+    last_activity_date: int | None = None
+
+    @classmethod
+    def from_api(cls, item: dict) -> "Question":
+        """Builds a question from an item of an API response. Unknown fields are
+        ignored."""
+        get = item.get
+        tags = get("tags")
+        return cls(
+            item["question_id"],
+            get("title"),
+            get("link"),
+            tuple(map(sys.intern, tags)) if tags is not None else None,
+            get("is_answered"),
+            get("view_count"),
+            get("favorite_count"),
+            get("up_vote_count"),
+            get("accepted_answer_id"),
+            get("answer_count"),
+            get("score"),
+            get("creation_date"),
+            get("last_activity_date"),
+        )
+
+    def to_dict(self) -> dict:
+        """Converts the question back into an API item, without the missing fields."""
+        item = {}
+        for name in QUESTION_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                item[name] = list(value) if name == "tags" else value
+        return item
+
+
+QUESTION_FIELDS = tuple(field.name for field in fields(Question))
+"""Names of the `Question` fields, in declaration order."""
@@ -0,0 +1,190 @@
+"""Concurrent import of the questions of several Stack Exchange sites.
+
+Each site is crawled by its own worker, in parallel with the others, into its own
+partition of the store : one SQLite database per site, see `store.site_db_path()`, so
+that the sites never contend for the same write lock. All the workers share one
+`ApiClient`, and therefore one `RequestScheduler` : the rate limit, backoffs and
+daily quota are enforced across sites, which lets a single process use all the
+allowed rate.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+import logging
+
+from stack_overflow_importer.answers import import_answers
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.crawler import crawl_questions
+from stack_overflow_importer.filters import question_filter_fields
+from stack_overflow_importer.progress import ProgressReporter
+from stack_overflow_importer.questions import Timestampable, extract_int, extract_site
+from stack_overflow_importer.store import DEFAULT_DB_PATH, QuestionStore, site_db_path
+
+
+so_logger = logging.getLogger("so_importer")
+
+
+def parse_sites(sites: str | Iterable[str]) -> list[str]:
+    """Extracts a list of distinct site names, in order, from a semi-colon or comma
+    separated str, or from an iterable of names."""
+    if isinstance(sites, str):
+        sites = sites.replace(",", ";").split(";")
+    names = [extract_site(site) for site in sites if site and site.strip()]
+    if not names:
+        raise ValueError("You must provide at least one site.")
+    return list(dict.fromkeys(names))
+
+
+def crawl_site(
+    site: str,
+    db_path: str,
+    fromdate: Timestampable,
+    todate: Timestampable | None = None,
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,  # pylint: disable=redefined-builtin
+    tagged: str | None = None,
+    client: ApiClient | None = None,
+    max_workers: int = 2,
+    batch_size: int = 500,
+    answers: bool = False,
+    progress: ProgressReporter | None = None,
+) -> int:
+    """Crawls the questions of one site into the store at `db_path`, upserting them
+    in batches of `batch_size`. If `answers` is True, the answers and comments of
+    the crawled questions are then imported, see `answers.import_answers()`, with
+    the default filter of the API. The crawl is reported to `progress`, see
+    `crawler.crawl_questions()`.
+
+    Returns
+    -------
+        the number of questions written.
+    """
+    total = 0
+    batch: list[dict] = []
+    crawled: list[dict] = []
+    fields = question_filter_fields(filter)
+    with QuestionStore(db_path) as store:
+        for item in crawl_questions(
+            fromdate,
+            todate,
+            key,
+            access_token,
+            filter,
+            tagged,
+            client,
+            max_workers=max_workers,
+            site=site,
+            progress=progress,
+        ):
+            batch.append(item)
+            if answers:
+                crawled.append(
+                    {
+                        "question_id": item["question_id"],
+                        "answer_count": item.get("answer_count"),
+                    }
+                )
+            if len(batch) >= batch_size:
+                total += store.upsert_questions(batch, fields=fields)
+                batch = []
+        total += store.upsert_questions(batch, fields=fields)
+        if answers:
+            import_answers(
+                store,
+                crawled,
+                key,
+                access_token,
+                client=client,
+                site=site,
+                max_workers=max_workers,
+            )
+    so_logger.info("Imported %s questions from %s into %s.", total, site, db_path)
+    return total
+
+
+def import_sites(
+    sites: str | Iterable[str],
+    fromdate: Timestampable,
+    todate: Timestampable | None = None,
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,  # pylint: disable=redefined-builtin
+    tagged: str | None = None,
+    client: ApiClient | None = None,
+    db_path: str = DEFAULT_DB_PATH,
+    workers_per_site: int = 2,
+    batch_size: int = 500,
+    answers: bool = False,
+    progress: ProgressReporter | None = None,
+) -> dict[str, int]:
+    """Crawls the questions created between `fromdate` and `todate` on several sites
+    at once, each into its own partition of the store at `db_path`.
+
+    Parameters
+    ----------
+        sites: the API names of the sites, as a list or as a semi-colon separated str.
+
+        fromdate, todate, key, access_token, filter, tagged: as in
+        `crawler.crawl_questions()`.
+
+        client: Optional, the `ApiClient` shared by all the sites. If None is
+        provided, a client with a pool sized for all the workers is created, and
+        closed at the end of the import.
+
+        db_path: the path of the store. Each site is written to
+        `site_db_path(db_path, site)`.
+
+        workers_per_site: the number of shards of each site fetched at the same time.
+
+        batch_size: the number of questions upserted per transaction.
+
+        answers: if True, also imports the answers and comments of the crawled
+        questions.
+
+        progress: Optional, a `ProgressReporter` shared by the sites : its target is
+        the sum of the windows of the sites, and it is advanced as their shards
+        complete, so that it estimates the time remaining of the whole import.
+
+    Returns
+    -------
+        the number of questions written, per site. A site whose crawl failed is
+        logged, and left out.
+    """
+    names = parse_sites(sites)
+    workers_per_site = extract_int("workers_per_site", workers_per_site, lower=1)
+    own_client = client is None
+    if own_client:
+        client = ApiClient(pool_maxsize=len(names) * workers_per_site)
+    counts: dict[str, int] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            futures = {
+                site: executor.submit(
+                    crawl_site,
+                    site,
+                    site_db_path(db_path, site),
+                    fromdate,
+                    todate,
+                    key,
+                    access_token,
+                    filter,
+                    tagged,
+                    client,
+                    workers_per_site,
+                    batch_size,
+                    answers,
+                    progress,
+                )
+                for site in names
+            }
+            for site, future in futures.items():
+                try:
+                    counts[site] = future.result()
+                # pylint: disable=broad-except
+                except Exception:
+                    so_logger.error("The import of %s failed.", site, exc_info=True)
+    finally:
+        if own_client:
+            client.close()
+    return counts
@@ -0,0 +1,227 @@
+"""Live progress reporting of long imports.
+
+A `ProgressReporter` is a metrics hook, see `metrics.py` : added to the hooks of an
+`ApiClient`, it counts the pages and items fetched, and follows the remaining quota.
+The import pipelines also report the cursor they reached, such as the last activity
+date of a sync, from which the reporter estimates the time remaining. A crawl, whose
+shards complete out of order, reports instead the number of seconds of its window
+covered so far, see `advance_by()`.
+
+On a terminal, the progress is a single line refreshed in place, colored with
+colorama. Otherwise, for example under cron, it is logged periodically instead.
+"""
+
+from datetime import datetime, timezone
+from typing import Callable, TextIO
+import collections
+import logging
+import sys
+import threading
+import time
+
+from colorama import Fore, Style
+from colorama.ansi import clear_line
+
+from stack_overflow_importer.metrics import CallMetrics
+
+so_logger = logging.getLogger("so_importer")
+
+
+def format_duration(seconds: float) -> str:
+    """Formats a duration as `h:mm:ss`."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+
+def format_cursor(cursor: int | None, date_cursor: bool = True) -> str:
+    """Formats a cursor, as a UTC date and time if it is a timestamp."""
+    if cursor is None:
+        return "-"
+    if date_cursor:
+        return datetime.fromtimestamp(cursor, timezone.utc).strftime("%Y-%m-%d %H:%M")
+    return str(cursor)
+
+
+class ProgressReporter:
+    """Reports the progress of an import, on a terminal or in the logs.
+
+    Parameters
+    ----------
+        stream: the stream the progress line is written to, on a terminal.
+        Defaults to `sys.stderr`.
+
+        interactive: whether to refresh a line in place. If None is provided, it is
+        whether `stream` is a terminal.
+
+        refresh_interval: the minimum number of seconds between two refreshes of the
+        progress line.
+
+        log_interval: the number of seconds between two log lines, when not
+        interactive.
+
+        window: the number of seconds the throughput is averaged over.
+
+        date_cursor: whether the cursors are timestamps, or plain numbers such as
+        scores.
+
+        clock: a monotonic clock, in seconds.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        interactive: bool | None = None,
+        refresh_interval: float = 0.5,
+        log_interval: float = 30.0,
+        window: float = 10.0,
+        date_cursor: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.stream = stream if stream is not None else sys.stderr
+        self.interactive = (
+            interactive
+            if interactive is not None
+            else bool(getattr(self.stream, "isatty", lambda: False)())
+        )
+        self.refresh_interval = refresh_interval
+        self.log_interval = log_interval
+        self.window = window
+        self.date_cursor = date_cursor
+        self.pages = 0
+        self.items = 0
+        self.quota_remaining: int | None = None
+        self.cursor: int | None = None
+        self.origin: int | None = None
+        self.target: int | None = None
+        self._clock = clock
+        self._started = clock()
+        self._last_output = -float("inf")
+        self._samples: collections.deque = collections.deque([(self._started, 0)])
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics: CallMetrics):
+        """Counts a call, as a metrics hook."""
+        with self._lock:
+            if metrics.items is not None and metrics.error is None:
+                self.pages += 1
+                self.items += metrics.items
+            if metrics.quota_remaining is not None:
+                self.quota_remaining = metrics.quota_remaining
+            self._refresh()
+
+    def set_target(self, target: int | None):
+        """Sets the cursor value the import will stop at, to estimate the time
+        remaining."""
+        with self._lock:
+            self.target = target
+
+    def extend_target(self, amount: int):
+        """Adds `amount` to the target, for imports made of parts started
+        independently, such as the sites of a crawl. The cursor then starts from 0,
+        see `advance_by()`."""
+        with self._lock:
+            self.target = (self.target or 0) + amount
+            if self.origin is None:
+                self.origin = self.cursor = 0
+
+    def advance_by(self, amount: int):
+        """Moves the cursor forward by `amount`, such as the seconds covered by a
+        completed shard of a crawl."""
+        with self._lock:
+            if self.origin is None:
+                self.origin = self.cursor = 0
+            self.cursor += amount
+            self._refresh()
+
+    def advance(self, cursor: int | None):
+        """Reports the cursor reached by the import."""
+        if cursor is None:
+            return
+        with self._lock:
+            if self.origin is None:
+                self.origin = cursor
+            self.cursor = cursor
+            self._refresh()
+
+    @property
+    def rate(self) -> float:
+        """The number of items fetched per second, over the last `window`
+        seconds."""
+        now = self._clock()
+        while len(self._samples) > 1 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+        since, items = self._samples[0]
+        return (self.items - items) / (now - since) if now > since else 0.0
+
+    @property
+    def done(self) -> float | None:
+        """The fraction of the way the cursor moved from its first value to the
+        target, or None if it is unknown."""
+        if None in (self.cursor, self.origin, self.target):
+            return None
+        if self.target == self.origin:
+            return None
+        return (self.cursor - self.origin) / (self.target - self.origin)
+
+    @property
+    def remaining(self) -> float | None:
+        """The estimated number of seconds remaining, from the progress of the
+        cursor between its first value and the target, or None if it can't be
+        estimated."""
+        done = self.done
+        if done is None or done <= 0:
+            return None
+        elapsed = self._clock() - self._started
+        return elapsed * (1 - min(done, 1.0)) / done
+
+    def status(self) -> str:
+        """Describes the progress, without colors."""
+        remaining = self.remaining
+        eta = format_duration(remaining) if remaining is not None else "?"
+        quota = self.quota_remaining if self.quota_remaining is not None else "?"
+        done = self.done
+        covered = f" ({min(max(done, 0.0), 1.0):.0%})" if done is not None else ""
+        return (
+            f"pages {self.pages} | items {self.items:,} ({self.rate:.1f}/s)"
+            f" | cursor {format_cursor(self.cursor, self.date_cursor)}{covered}"
+            f" | ETA {eta} | quota {quota}"
+        )
+
+    def _refresh(self, force: bool = False):
+        """Writes the progress line, or logs it, if it is due. Must be called with
+        the lock held."""
+        now = self._clock()
+        self._samples.append((now, self.items))
+        interval = self.refresh_interval if self.interactive else self.log_interval
+        if not force and now - self._last_output < interval:
+            return
+        self._last_output = now
+        if not self.interactive:
+            so_logger.info("Progress: %s", self.status())
+            return
+        fields = self.status().split(" | ")
+        self.stream.write(
+            "\r"
+            + clear_line()
+            + f"{Style.DIM}|{Style.RESET_ALL}".join(
+                f" {Fore.CYAN}{name}{Style.RESET_ALL} {Style.BRIGHT}{value}"
+                f"{Style.RESET_ALL} "
+                for name, _, value in (field.partition(" ") for field in fields)
+            )
+        )
+        self.stream.flush()
+
+    def close(self):
+        """Writes the final progress, and ends the progress line."""
+        with self._lock:
+            self._refresh(force=True)
+            if self.interactive:
+                self.stream.write("\n")
+                self.stream.flush()
+
+    def __enter__(self) -> "ProgressReporter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,10 +1,15 @@
 """ Test script to access Stack overflow data """
 
-from typing import Any
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Iterable, Iterator
 import datetime
+import itertools
 import logging
 from strenum import StrEnum
-from stack_overflow_importer.base import query_method
+from stack_overflow_importer.base import ApiClient, query_method
+from stack_overflow_importer.models import Question
+from stack_overflow_importer.store import DEFAULT_SITE
 
 
 so_logger = logging.getLogger("so_importer")
@@ -28,9 +33,13 @@ class QuestionSortMethod(StrEnum):
     MONTH = "month"
 
 
-DATE_BOUND_SORT = ("activity", "creation")
-INT_BOUND_SORT = "vote"
-NO_MINMAX_SORT = ("hot", "week", "month")
+VALID_ORDERS = frozenset(item.value for item in Order)
+VALID_SORTS = frozenset(item.value for item in QuestionSortMethod)
+DATE_BOUND_SORT = frozenset(("activity", "creation"))
+INT_BOUND_SORT = frozenset(("votes",))
+NO_MINMAX_SORT = frozenset(("hot", "week", "month"))
+MAX_PAGESIZE = 100
+MAX_IDS_PER_CALL = 100
 
 
 Timestampable = str | int | float | datetime.datetime | datetime.date
@@ -117,8 +126,7 @@ def extract_order(value: str | Order) -> str:
             " str.",
         ) from exc
 
-    valid_orders = dict((item.value, item) for item in Order)
-    if str_value in valid_orders:
+    if str_value in VALID_ORDERS:
         return str_value
     else:
         raise ValueError(
@@ -150,8 +158,7 @@ def extract_sort(value: str | QuestionSortMethod) -> str:
             f"The 'sort' provided is not valid : '{value}' cannot be converted to a"
             " str.",
         ) from exc
-    valid_sorts = dict((item.value, item) for item in QuestionSortMethod)
-    if str_value in valid_sorts:
+    if str_value in VALID_SORTS:
         return str_value
     else:
         raise ValueError(
@@ -240,6 +247,139 @@ def extract_timestamp(name: str, value: Timestampable) -> int:
     return timestamp
 
 
+def extract_site(value: str) -> str:
+    """Extracts the API name of a Stack Exchange site (eg: `superuser`), as used by
+    the `site` parameter.
+
+    Returns
+    -------
+        Returns a lowercase str if it managed to extract it. Any other case will raise a
+        ValueError exception.
+    """
+    if not value or not str(value).strip():
+        raise ValueError(
+            f"You must provide a value for the 'site' argument. You provided '{value}'."
+        )
+    return str(value).strip().lower()
+
+
+QUERY_PARAMS = (
+    "sort",
+    "filter",
+    "page",
+    "pagesize",
+    "fromdate",
+    "todate",
+    "order",
+    "min",
+    "max",
+    "tagged",
+)
+"""The `QuestionQuery` fields sent as `questions` parameters, in order."""
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionQuery:
+    """A validated, immutable `questions` query.
+
+    Build it with `parse()`, which validates and normalizes all the parameters in a
+    single pass. Queries are hashable, so they can be used as cache or dict keys, and
+    can be reused across pages with `with_page()` without being validated again.
+    """
+
+    site: str = DEFAULT_SITE
+    filter: str | None = None
+    page: int | None = 1
+    pagesize: int | None = 30
+    fromdate: int | None = None
+    todate: int | None = None
+    order: str | None = Order.DESC.value
+    min: int | None = None
+    max: int | None = None
+    sort: str | None = QuestionSortMethod.ACTIVITY.value
+    tagged: str | None = None
+
+    @classmethod
+    def parse(
+        cls,
+        filter: str | None = None,
+        page: str | int | None = 1,
+        pagesize: str | int | None = 30,
+        fromdate: Timestampable | None = None,
+        todate: Timestampable | None = None,
+        order: str | Order | None = Order.DESC,
+        # pylint: disable=redefined-builtin
+        min: str | int | Timestampable | None = None,
+        max: str | int | Timestampable | None = None,
+        sort: str | QuestionSortMethod | None = QuestionSortMethod.ACTIVITY,
+        tagged: str | None = None,
+        site: str = DEFAULT_SITE,
+    ) -> "QuestionQuery":
+        """Validates and normalizes the parameters of a `questions` call.
+
+        The parameters are the same as `build_questions_params()`.
+
+        Returns
+        -------
+            a QuestionQuery. Any invalid parameter raises a ValueError exception.
+        """
+        # Parsing sort first, as the processing of min/max depends on its value
+        sort = extract_sort(sort) if sort is not None else None
+        return cls(
+            site=extract_site(site),
+            filter=filter,
+            page=extract_int("page", page, lower=0) if page is not None else None,
+            pagesize=(
+                extract_int("pagesize", pagesize, lower=0, upper=MAX_PAGESIZE)
+                if pagesize is not None
+                else None
+            ),
+            fromdate=(
+                extract_timestamp("fromdate", fromdate)
+                if fromdate is not None
+                else None
+            ),
+            todate=extract_timestamp("todate", todate) if todate is not None else None,
+            order=extract_order(order) if order is not None else None,
+            min=_extract_bound("min", min, sort),
+            max=_extract_bound("max", max, sort),
+            sort=sort,
+            tagged=tagged,
+        )
+
+    def with_page(self, page: int) -> "QuestionQuery":
+        """Returns the same query, for another page."""
+        return replace(self, page=page)
+
+    def to_params(self) -> dict:
+        """Builds the params dict of the `questions` method."""
+        params = {"site": self.site}
+        for name in QUERY_PARAMS:
+            value = getattr(self, name)
+            if value is not None:
+                params[name] = str(value)
+        return params
+
+
+def _extract_bound(
+    name: str, value: str | int | Timestampable | None, sort: str | None
+) -> int | None:
+    """Extracts a `min` or `max` bound, whose type depends on the sort method."""
+    if value is None or not sort:
+        return None
+    if sort in DATE_BOUND_SORT:
+        return extract_timestamp(name, value)
+    if sort in INT_BOUND_SORT:
+        return extract_int(name, value)
+    so_logger.warning(
+        "The '%s' parameter %s was ignored as the sort parameter is in %s.",
+        name,
+        value,
+        ", ".join(sorted(NO_MINMAX_SORT)),
+    )
+    return None
+
+
 def build_questions_params(
     filter: str | None = None,
     page: str | int | None = 1,
@@ -252,6 +392,7 @@ def build_questions_params(
     max: str | int | Timestampable | None = None,
     sort: str | QuestionSortMethod | None = QuestionSortMethod.ACTIVITY,
     tagged: str | None = None,
+    site: str = DEFAULT_SITE,
 ) -> dict:
     """Build a params dict for the `questions` method.
 
@@ -301,56 +442,16 @@ def build_questions_params(
         tagged: string containing semi-colon separated tag names. Note : only results
         matching ALL the tags in the list will be returned.
 
+        site: the API name of the Stack Exchange site to query, such as `superuser`.
+        The default is `stackoverflow`.
+
     Returns
     -------
         a dict containing all the params
     """
-    params = {"site": "stackoverflow"}
-    if sort is not None:
-        # Putting sort first as the processing of min/max depends on the sort value
-        params["sort"] = str(extract_sort(sort))
-    if filter is not None:
-        params["filter"] = filter
-    if page is not None:
-        params["page"] = str(extract_int("page", page, lower=0))
-    if pagesize is not None:
-        params["pagesize"] = str(extract_int("pagesize", pagesize, lower=0, upper=100))
-    if fromdate is not None:
-        params["fromdate"] = str(extract_timestamp("fromdate", fromdate))
-    if todate is not None:
-        params["todate"] = str(extract_timestamp("todate", todate))
-    if order is not None:
-        params["order"] = str(extract_order(order))
-    if min is not None:
-        if sort:
-            if sort in DATE_BOUND_SORT:
-                params["min"] = str(extract_timestamp("min", min))
-            if sort in INT_BOUND_SORT:
-                params["min"] = str(extract_int("min", min))
-            if sort in NO_MINMAX_SORT:
-                so_logger.warning(
-                    "The 'min' parameter %s was ignored as the sort parameter is"
-                    " in %s.",
-                    min,
-                    NO_MINMAX_SORT,
-                )
-    if max is not None:
-        if sort:
-            if sort in DATE_BOUND_SORT:
-                params["max"] = str(extract_timestamp("max", max))
-            if sort in INT_BOUND_SORT:
-                params["max"] = str(extract_int("max", max))
-            if sort in NO_MINMAX_SORT:
-                so_logger.warning(
-                    "The 'max' parameter %s was ignored as the sort parameter is"
-                    " in %s.",
-                    max,
-                    NO_MINMAX_SORT,
-                )
-    if tagged is not None:
-        params["tagged"] = tagged
-
-    return params
+    return QuestionQuery.parse(
+        filter, page, pagesize, fromdate, todate, order, min, max, sort, tagged, site
+    ).to_params()
 
 
 def get_questions(
@@ -367,6 +468,8 @@ def get_questions(
     max: str | int | None = None,
     sort: str | QuestionSortMethod | None = None,
     tagged: str | None = None,
+    client: ApiClient | None = None,
+    site: str = DEFAULT_SITE,
 ) -> dict | None:
     """Queries Stack Overflow API to retrieve questions.
 
@@ -410,46 +513,343 @@ def get_questions(
         tagged: string containing semi-colon separated tag names. Note : only results
         matching ALL tags in the list will be returned.
 
+        client: Optional, an `ApiClient` to reuse pooled connections across calls.
+
+        site: Optional, the API name of the Stack Exchange site to query. The default
+        is `stackoverflow`.
+
     """
-    params = build_questions_params(
-        filter, page, pagesize, fromdate, todate, order, min, max, sort, tagged
+    query = QuestionQuery.parse(
+        filter, page, pagesize, fromdate, todate, order, min, max, sort, tagged, site
     )
 
-    return query_method("questions", key, access_token, params)
-
-
-# # pylint: disable=redefined-builtin
-# def get_all_questions(key, access_token, filter=None):
-#     """Access all questions."""
-#     response = get_questions(
-#         key,
-#         access_token,
-#         filter=filter,
-#         fromdate=datetime.datetime(
-#             2022, 1, 1, tzinfo=datetime.timezone.utc
-#         ).timestamp(),
-#         pagesize=1,
-#         sort=QuestionSortMethod.CREATION,
-#         order=Order.ASC,
-#     )
-#     if response:
-#         print(f'Has more={response.get("has_more")}')
-
-#     print(dumps(response, indent=2))
-
-#     response = get_questions(
-#         key,
-#         access_token,
-#         filter=filter,
-#         fromdate=datetime.datetime(
-#             2022, 1, 1, tzinfo=datetime.timezone.utc
-#         ).timestamp(),
-#         pagesize=1,
-#         page=2,
-#         sort=QuestionSortMethod.CREATION,
-#         order=Order.ASC,
-#     )
-#     if response:
-#         print(f'Has more={response.get("has_more")}')
-
-#     print(dumps(response, indent=2))
+    return query_questions(query, key, access_token, client)
+
+
+def query_questions(
+    query: QuestionQuery,
+    key: str | None = None,
+    access_token: str | None = None,
+    client: ApiClient | None = None,
+) -> dict | None:
+    """Queries Stack Overflow API to retrieve questions, with an already parsed query.
+
+    Parameters
+    ----------
+        query: the `QuestionQuery` to send.
+
+        key, access_token, client: as in `get_questions()`.
+    """
+    return query_method("questions", key, access_token, query.to_params(), client)
+
+
+# pylint: disable=redefined-builtin
+def iter_question_pages(
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,
+    fromdate: Timestampable | None = None,
+    todate: Timestampable | None = None,
+    order: str | Order | None = None,
+    min: str | int | None = None,
+    max: str | int | None = None,
+    sort: str | QuestionSortMethod | None = None,
+    tagged: str | None = None,
+    client: ApiClient | None = None,
+    page: str | int = 1,
+    pagesize: str | int = MAX_PAGESIZE,
+    site: str = DEFAULT_SITE,
+) -> Iterator[dict]:
+    """Iterates over the pages of questions matching the query.
+
+    Pages are requested one at a time, following the `has_more` flag of each
+    response, so only one page is held in memory at any time. The parameters are the
+    same as `get_questions()`.
+
+    Parameters
+    ----------
+        page: Optional, the page to start from. The default is 1.
+
+        pagesize: Optional, the number of results to retrieve per page. Defaults to
+        the maximum allowed by the API, to minimize the number of calls.
+
+    Yields
+    ------
+        the JSON responses, one per page.
+    """
+    page = extract_int("page", page, lower=1)
+    query = QuestionQuery.parse(
+        filter, page, pagesize, fromdate, todate, order, min, max, sort, tagged, site
+    )
+    return iter_query_pages(query, key, access_token, client)
+
+
+def iter_query_pages(
+    query: QuestionQuery,
+    key: str | None = None,
+    access_token: str | None = None,
+    client: ApiClient | None = None,
+) -> Iterator[dict]:
+    """Iterates over the pages of an already parsed query, from `query.page` onwards.
+
+    Same as `iter_question_pages()`, which parses its parameters and delegates to this
+    function.
+    """
+    page = query.page or 1
+    while True:
+        response = query_questions(query.with_page(page), key, access_token, client)
+        if not response:
+            return
+        if "error_id" in response:
+            so_logger.error(
+                "The questions query stopped on page %s : %s (%s).",
+                page,
+                response.get("error_message"),
+                response.get("error_name"),
+            )
+            return
+        yield response
+        if not response.get("has_more"):
+            return
+        page += 1
+
+
+# pylint: disable=redefined-builtin
+def iter_questions(
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,
+    fromdate: Timestampable | None = None,
+    todate: Timestampable | None = None,
+    order: str | Order | None = None,
+    min: str | int | None = None,
+    max: str | int | None = None,
+    sort: str | QuestionSortMethod | None = None,
+    tagged: str | None = None,
+    client: ApiClient | None = None,
+    page: str | int = 1,
+    pagesize: str | int = MAX_PAGESIZE,
+    records: bool = False,
+    site: str = DEFAULT_SITE,
+) -> Iterator[dict | Question]:
+    """Iterates over all the questions matching the query, across pages.
+
+    Same as `iter_question_pages()`, but yields the question items one at a time.
+
+    Parameters
+    ----------
+        records: Optional, if True the questions are yielded as compact `Question`
+        records instead of dicts.
+
+    Yields
+    ------
+        the question items, as returned by the API, or `Question` records.
+    """
+    for response in iter_question_pages(
+        key,
+        access_token,
+        filter,
+        fromdate,
+        todate,
+        order,
+        min,
+        max,
+        sort,
+        tagged,
+        client,
+        page,
+        pagesize,
+        site,
+    ):
+        if records:
+            yield from map(Question.from_api, response.get("items", []))
+        else:
+            yield from response.get("items", [])
+
+
+def chunk_ids(
+    ids: Iterable[str | int], size: int = MAX_IDS_PER_CALL
+) -> Iterator[list[int]]:
+    """Splits IDs into batches of at most `size` IDs, skipping the duplicates.
+
+    Yields
+    ------
+        the batches, as lists of ints, in the order of `ids`. Any invalid ID will raise
+        a ValueError exception.
+    """
+    size = extract_int("size", size, lower=1, upper=MAX_IDS_PER_CALL)
+    seen: set[int] = set()
+    batch: list[int] = []
+    for value in ids:
+        question_id = extract_int("id", value, lower=1)
+        if question_id in seen:
+            continue
+        seen.add(question_id)
+        batch.append(question_id)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fetch_ids_batch(
+    method: str,
+    ids: list[int],
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,
+    client: ApiClient | None = None,
+    site: str = DEFAULT_SITE,
+) -> list[dict]:
+    """Fetches all the items of a vectorized method, such as `questions/{ids}`, for a
+    batch of at most 100 IDs, following `has_more` across pages.
+
+    Parameters
+    ----------
+        method: the method, with `{ids}` in place of the IDs.
+
+        ids: the IDs to substitute into `method`.
+
+        key, access_token, filter, site: as in `get_questions()`.
+
+        client: Optional, an `ApiClient` to reuse pooled connections.
+
+    Raises
+    ------
+        RuntimeError: if the API returns an error.
+    """
+    params = {"site": extract_site(site), "pagesize": str(MAX_PAGESIZE)}
+    if filter is not None:
+        params["filter"] = filter
+    method = method.replace("{ids}", ";".join(str(item_id) for item_id in ids))
+    items: list[dict] = []
+    for page in itertools.count(1):
+        response = query_method(
+            method, key, access_token, dict(params, page=str(page)), client
+        )
+        if not response or "error_id" in response:
+            message = response.get("error_message") if response else None
+            raise RuntimeError(f"Failed to fetch {method}: {message}")
+        items.extend(response.get("items", []))
+        if not response.get("has_more"):
+            return items
+
+
+def iter_ids_batches(
+    method: str,
+    ids: Iterable[str | int],
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,
+    client: ApiClient | None = None,
+    site: str = DEFAULT_SITE,
+    max_workers: int = 4,
+) -> Iterator[tuple[list[int], list[dict]]]:
+    """Calls a vectorized method, such as `questions/{ids}`, for many IDs, 100 IDs
+    per call, with several calls in flight.
+
+    Parameters
+    ----------
+        method: the method, with `{ids}` in place of the IDs.
+
+        ids: the IDs, in any iterable. It is consumed lazily, so it can be a generator
+        over a large number of IDs. Duplicates are sent once.
+
+        key, access_token, filter, site: as in `get_questions()`.
+
+        client: Optional, the `ApiClient` shared by the workers. If None is provided,
+        a client with a pool sized for `max_workers` is created, and closed at the
+        end.
+
+        max_workers: the maximum number of calls in flight.
+
+    Yields
+    ------
+        each batch of IDs with the items returned for it, as the calls complete, so
+        not in the order of `ids`.
+    """
+    max_workers = extract_int("max_workers", max_workers, lower=1)
+    batches = chunk_ids(ids)
+    own_client = client is None
+    if own_client:
+        client = ApiClient(pool_maxsize=max_workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            def submit(batch: list[int]) -> Future:
+                future = executor.submit(
+                    fetch_ids_batch,
+                    method,
+                    batch,
+                    key,
+                    access_token,
+                    filter,
+                    client,
+                    site,
+                )
+                submitted[future] = batch
+                return future
+
+            submitted: dict[Future, list[int]] = {}
+            # Only a few batches are queued at a time, so that `ids` is read lazily
+            pending = {
+                submit(batch) for batch in itertools.islice(batches, max_workers)
+            }
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        items = future.result()
+                        batch = next(batches, None)
+                        if batch is not None:
+                            pending.add(submit(batch))
+                        yield submitted.pop(future), items
+            finally:
+                for future in pending:
+                    future.cancel()
+    finally:
+        if own_client:
+            client.close()
+
+
+def get_questions_by_ids(
+    ids: Iterable[str | int],
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,
+    client: ApiClient | None = None,
+    site: str = DEFAULT_SITE,
+    max_workers: int = 4,
+    records: bool = False,
+) -> Iterator[dict | Question]:
+    """Fetches questions by ID, 100 IDs per call, with several calls in flight.
+
+    Parameters
+    ----------
+        ids: the IDs of the questions, in any iterable. It is consumed lazily, so it
+        can be a generator over a large number of IDs. Duplicates are fetched once.
+
+        key, access_token, filter, site: as in `get_questions()`.
+
+        client: Optional, the `ApiClient` shared by the workers. If None is provided,
+        a client with a pool sized for `max_workers` is created, and closed at the
+        end.
+
+        max_workers: the maximum number of calls in flight.
+
+        records: Optional, if True the questions are yielded as compact `Question`
+        records instead of dicts.
+
+    Yields
+    ------
+        the question items, batch by batch as the calls complete, so not in the
+        order of `ids`. Deleted questions are skipped.
+    """
+    for _, items in iter_ids_batches(
+        "questions/{ids}", ids, key, access_token, filter, client, site, max_workers
+    ):
+        if records:
+            yield from map(Question.from_api, items)
+        else:
+            yield from items
@@ -0,0 +1,181 @@
+"""Classification of failed API calls, and retries of the transient ones.
+
+Failures are sorted into two kinds:
+- retryable: throttle violations, internal errors and temporary unavailability of
+  the API, 5xx and 429 HTTP statuses, and dropped or timed out connections,
+- fatal: everything else, such as a bad parameter or an invalid key, which would
+  fail the same way if sent again.
+
+Retryable failures are retried with a capped exponential backoff, with full jitter
+so that concurrent workers don't retry in lockstep. A retry budget, shared by all the
+calls of a client, bounds the total number of retries, so that an API outage stops a
+run instead of making it retry forever. Each client has its own policy, and so its
+own budget, unless it is given one : a long-lived process can also `reset()` the
+policy at the start of each run.
+"""
+
+from typing import Awaitable, Callable
+import logging
+import random
+import re
+import threading
+import time
+
+import requests
+
+from stack_overflow_importer.decoding import Decoder
+
+
+so_logger = logging.getLogger("so_importer")
+
+RETRYABLE_ERROR_IDS = frozenset(
+    (
+        500,  # internal_error
+        502,  # throttle_violation
+        503,  # temporarily_unavailable
+    )
+)
+"""Stack Exchange `error_id`s worth retrying, see
+https://api.stackexchange.com/docs/error-handling."""
+
+RETRYABLE_STATUSES = frozenset((429, 500, 502, 503, 504))
+"""HTTP statuses worth retrying, when the body isn't a Stack Exchange error."""
+
+RETRYABLE_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+"""Network failures worth retrying."""
+
+HTTP_ERROR_NAME = "http_error"
+
+_AVAILABLE_IN = re.compile(r"available in (\d+) seconds?")
+
+
+def decode_response(response: requests.Response, decode: Decoder) -> dict:
+    """Decodes a response body, turning anything which isn't JSON, such as an HTML
+    error page from a proxy, into an error response. `response` can also be an
+    `aio.AsyncResponse`.
+
+    Returns
+    -------
+        the JSON response or, if the body isn't JSON, an error response with the HTTP
+        status as `error_id` and `http_error` as `error_name`.
+    """
+    try:
+        return decode(response.content)
+    except ValueError:
+        return {
+            "error_id": response.status_code,
+            "error_name": HTTP_ERROR_NAME,
+            "error_message": (
+                f"HTTP {response.status_code} {response.reason}, with a"
+                f" '{response.headers.get('Content-Type', 'unknown')}' body instead"
+                " of JSON."
+            ),
+        }
+
+
+def is_retryable(status: int, result: dict | None) -> bool:
+    """Tells whether a call which returned `result`, with the HTTP `status`, failed
+    in a way worth retrying."""
+    if isinstance(result, dict) and "error_id" in result:
+        if result.get("error_name") == HTTP_ERROR_NAME:
+            return status in RETRYABLE_STATUSES
+        return result["error_id"] in RETRYABLE_ERROR_IDS
+    return status in RETRYABLE_STATUSES
+
+
+class RetryPolicy:
+    """How many times, and after how long, failed calls are retried.
+
+    The delay before the n-th retry is drawn uniformly between 0 and
+    `min(max_delay, base_delay * 2 ** (n - 1))`. When a throttle violation says when
+    more requests will be available, the retry waits at least that long, or isn't
+    attempted if that is beyond `max_delay`.
+
+    Parameters
+    ----------
+        max_attempts: the maximum number of attempts of a call, retries included. 1
+        disables retries.
+
+        base_delay: the maximum delay before the first retry, in seconds.
+
+        max_delay: the cap on the delay before any retry, in seconds.
+
+        budget: Optional, the total number of retries allowed across all the calls
+        using this policy. None means no limit.
+
+        jitter: returns a random float in [0, 1).
+
+        sleep: the function used to wait before retrying.
+
+        async_sleep: Optional, the coroutine function used to wait before retrying
+        the calls of `aio.async_query_method()`. If None is provided, `asyncio.sleep`
+        is used.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        budget: int | None = 100,
+        jitter: Callable[[], float] = random.random,
+        sleep: Callable[[float], None] = time.sleep,
+        async_sleep: Callable[[float], Awaitable[None]] | None = None,
+    ):
+        if max_attempts < 1:
+            raise ValueError(
+                f"There must be at least 1 attempt, you provided '{max_attempts}'."
+            )
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retries = 0
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        self._jitter = jitter
+        self._lock = threading.Lock()
+        self._spent_logged = False
+
+    def reset(self):
+        """Restores the whole retry budget, for example at the start of a run."""
+        with self._lock:
+            self.retries = 0
+            self._spent_logged = False
+
+    def next_delay(self, attempt: int, result: dict | None = None) -> float | None:
+        """Books a retry after the failed `attempt` (1 for the first call).
+
+        Returns
+        -------
+            the number of seconds to wait before retrying, or None if the call must
+            not be retried.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = self._jitter() * min(
+            self.max_delay, self.base_delay * 2 ** (attempt - 1)
+        )
+        match = _AVAILABLE_IN.search(str((result or {}).get("error_message", "")))
+        if match:
+            if int(match.group(1)) > self.max_delay:
+                return None
+            delay = max(delay, float(match.group(1)))
+        with self._lock:
+            if self.budget is not None and self.retries >= self.budget:
+                if not self._spent_logged:
+                    so_logger.error(
+                        "The retry budget of %s retries is spent.", self.budget
+                    )
+                    self._spent_logged = True
+                return None
+            self.retries += 1
+        return delay
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+"""Retry policy of the calls made without a client."""
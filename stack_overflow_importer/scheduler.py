@@ -0,0 +1,234 @@
+"""Scheduling of Stack Exchange API calls, to stay within the API throttles.
+
+The API documents three kinds of limits (https://api.stackexchange.com/docs/throttle):
+- a hard limit of 30 requests per second from a single IP,
+- a daily quota, reported by every response in `quota_remaining` / `quota_max`,
+- a per-method `backoff`, in seconds, that must be honoured before calling the same
+  method again.
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Callable
+
+
+so_logger = logging.getLogger("so_importer")
+
+MAX_REQUESTS_PER_SECOND = 30
+
+_IDS_SEGMENT = re.compile(r"^[\d;]+$")
+
+
+class QuotaExhaustedError(RuntimeError):
+    """Raised when a call would dip into the reserved part of the daily quota."""
+
+
+def normalize_method(method: str) -> str:
+    """Normalizes a method name so that vectorized calls share the same backoff.
+
+    For example, `questions/1;2;3/answers` becomes `questions/{ids}/answers`.
+    """
+    return "/".join(
+        "{ids}" if _IDS_SEGMENT.match(segment) else segment
+        for segment in method.strip("/").split("/")
+    )
+
+
+class TokenBucket:
+    """A thread-safe token bucket, refilled at `rate` tokens per second.
+
+    Parameters
+    ----------
+        rate: the number of tokens added per second.
+
+        capacity: the maximum number of tokens the bucket can hold, ie the largest
+        burst allowed. The bucket starts full.
+
+        clock: a monotonic clock, in seconds.
+
+        sleep: the function used to wait for tokens.
+    """
+
+    def __init__(
+        self,
+        rate: float = MAX_REQUESTS_PER_SECOND,
+        capacity: float = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError(f"The rate must be positive, you provided '{rate}'.")
+        if capacity < 1:
+            raise ValueError(
+                f"The capacity must be at least 1, you provided '{capacity}'."
+            )
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token, possibly going into debt, and returns how long the caller
+        must wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Blocks until a token is available.
+
+        Returns
+        -------
+            the number of seconds spent waiting.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class RequestScheduler:
+    """Central gate that every API call goes through.
+
+    Before each call, `acquire()` enforces the quota reserve, waits for any backoff
+    requested for the method, and takes a token from the rate limiting bucket. After
+    each call, `record()` reads the `backoff`, `quota_remaining` and `quota_max`
+    fields of the response. The scheduler is thread-safe and meant to be shared by
+    all the workers of a process.
+
+    Parameters
+    ----------
+        rate: the maximum number of requests per second.
+
+        burst: the number of requests that can be sent back to back.
+
+        quota_reserve: the number of daily requests to keep unused. Once the
+        remaining quota reaches this value, `acquire()` raises `QuotaExhaustedError`.
+
+        clock: a monotonic clock, in seconds.
+
+        sleep: the function used to wait, by `acquire()`.
+    """
+
+    def __init__(
+        self,
+        rate: float = MAX_REQUESTS_PER_SECOND,
+        burst: float = 1,
+        quota_reserve: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.bucket = TokenBucket(rate, burst, clock, sleep)
+        self.quota_reserve = quota_reserve
+        self.quota_remaining: int | None = None
+        self.quota_max: int | None = None
+        self.backoff_wait = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._backoff_until: dict[str, float] = {}
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, method: str) -> float:
+        """Books a call to `method`, without waiting.
+
+        Returns
+        -------
+            the number of seconds the caller must wait before sending the call.
+
+        Raises
+        ------
+            QuotaExhaustedError: if the call would consume the reserved quota.
+        """
+        name = normalize_method(method)
+        with self._lock:
+            if (
+                self.quota_remaining is not None
+                and self.quota_remaining - self._in_flight <= self.quota_reserve
+            ):
+                raise QuotaExhaustedError(
+                    f"Only {self.quota_remaining} requests remain in the daily quota"
+                    f" ({self.quota_reserve} reserved), stopping before '{method}'."
+                )
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            backoff = max(0.0, self._backoff_until.get(name, 0.0) - self._clock())
+            if backoff > 0:
+                self.backoff_wait += backoff
+        if backoff > 0:
+            so_logger.info("Backing off %.1f s before calling '%s'.", backoff, name)
+        return backoff + self.bucket.reserve()
+
+    def acquire(self, method: str) -> float:
+        """Blocks until `method` can be called.
+
+        Returns
+        -------
+            the number of seconds spent waiting.
+
+        Raises
+        ------
+            QuotaExhaustedError: if the call would consume the reserved quota.
+        """
+        wait = self.reserve(method)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    async def acquire_async(self, method: str) -> float:
+        """Same as `acquire()`, but waits without blocking the event loop."""
+        # Imported here, so that the synchronous clients don't pay for asyncio
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        wait = self.reserve(method)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def record(self, method: str, response: dict | None = None):
+        """Records the outcome of a call started with `acquire()`.
+
+        Must be called exactly once per `acquire()`, even if the call failed, in
+        which case `response` is None.
+        """
+        name = normalize_method(method)
+        with self._lock:
+            self._in_flight -= 1
+            if not isinstance(response, dict):
+                return
+            if response.get("quota_remaining") is not None:
+                remaining = int(response["quota_remaining"])
+                # Concurrent calls can complete out of order : a response reporting
+                # at most as many more requests than known as there can be calls in
+                # flight was overtaken by a later one. Only a larger jump, the daily
+                # reset, raises the remaining quota.
+                if (
+                    self.quota_remaining is None
+                    or remaining <= self.quota_remaining
+                    or remaining > self.quota_remaining + self._max_in_flight
+                ):
+                    self.quota_remaining = remaining
+            if response.get("quota_max") is not None:
+                self.quota_max = int(response["quota_max"])
+            if response.get("backoff"):
+                until = self._clock() + float(response["backoff"])
+                self._backoff_until[name] = max(
+                    until, self._backoff_until.get(name, 0.0)
+                )
+
+
+DEFAULT_SCHEDULER = RequestScheduler()
+"""Scheduler shared by all the calls which are not given a dedicated one."""
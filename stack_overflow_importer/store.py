@@ -0,0 +1,804 @@
+"""Local persistent storage of the imported questions, in a SQLite database."""
+
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+import collections
+import functools
+import itertools
+import logging
+import pathlib
+import sqlite3
+import sys
+import zlib
+
+from stack_overflow_importer.models import Question
+
+
+so_logger = logging.getLogger("so_importer")
+
+DEFAULT_DB_PATH = "./so_importer.db"
+
+DEFAULT_SITE = "stackoverflow"
+"""The API name of the site queried, and stored, when none is specified."""
+
+QUESTION_COLUMNS = (
+    "question_id",
+    "title",
+    "link",
+    "tags",
+    "is_answered",
+    "view_count",
+    "favorite_count",
+    "up_vote_count",
+    "accepted_answer_id",
+    "answer_count",
+    "score",
+    "creation_date",
+    "last_activity_date",
+)
+"""Columns of the `questions` table, named after the API question fields."""
+
+ANSWER_COLUMNS = (
+    "answer_id",
+    "question_id",
+    "is_accepted",
+    "score",
+    "creation_date",
+    "last_activity_date",
+    "body",
+)
+"""Columns of the `answers` table, named after the API answer fields."""
+
+COMMENT_COLUMNS = ("comment_id", "post_id", "score", "creation_date", "body")
+"""Columns of the `comments` table, named after the API comment fields."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    question_id INTEGER PRIMARY KEY,
+    title TEXT,
+    link TEXT,
+    tags TEXT,
+    is_answered INTEGER,
+    view_count INTEGER,
+    favorite_count INTEGER,
+    up_vote_count INTEGER,
+    accepted_answer_id INTEGER,
+    answer_count INTEGER,
+    score INTEGER,
+    creation_date INTEGER,
+    last_activity_date INTEGER
+);
+CREATE INDEX IF NOT EXISTS questions_creation_date ON questions (creation_date);
+CREATE INDEX IF NOT EXISTS questions_last_activity_date
+    ON questions (last_activity_date);
+CREATE TABLE IF NOT EXISTS question_tags (
+    tag TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, question_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS question_tags_question_id ON question_tags (question_id);
+CREATE TABLE IF NOT EXISTS tag_postings (
+    tag TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    ids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirty_tags (
+    tag TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    site TEXT NOT NULL,
+    tagset TEXT NOT NULL,
+    high_water_mark INTEGER NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (site, tagset)
+);
+CREATE TABLE IF NOT EXISTS answers (
+    answer_id INTEGER PRIMARY KEY,
+    question_id INTEGER NOT NULL,
+    is_accepted INTEGER,
+    score INTEGER,
+    creation_date INTEGER,
+    last_activity_date INTEGER,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS answers_question_id ON answers (question_id);
+CREATE TABLE IF NOT EXISTS comments (
+    comment_id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL,
+    score INTEGER,
+    creation_date INTEGER,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_post_id ON comments (post_id);
+CREATE TABLE IF NOT EXISTS answer_counts (
+    question_id INTEGER PRIMARY KEY,
+    answer_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS import_jobs (
+    job_id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    cursor INTEGER,
+    quota_used INTEGER NOT NULL,
+    items INTEGER NOT NULL,
+    done INTEGER NOT NULL
+);
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def upsert_question_sql(fields: frozenset[str] | None = None) -> str:
+    """Builds the upsert of a question row, given the question `fields` the filter of
+    the items includes.
+
+    The API leaves out the fields which are null, such as the `accepted_answer_id` of
+    a question whose accepted answer was withdrawn : a field the filter includes but
+    the item lacks is therefore overwritten with NULL. A field the filter excludes
+    keeps its stored value instead. If `fields` is None, the filter is unknown, and
+    every missing field keeps its stored value.
+    """
+    return (
+        f"INSERT INTO questions ({', '.join(QUESTION_COLUMNS)})"
+        f" VALUES ({', '.join('?' for _ in QUESTION_COLUMNS)})"
+        " ON CONFLICT (question_id) DO UPDATE SET "
+        + ", ".join(
+            (
+                f"{column} = excluded.{column}"
+                if fields is not None and column in fields
+                else f"{column} = COALESCE(excluded.{column}, questions.{column})"
+            )
+            for column in QUESTION_COLUMNS[1:]
+        )
+    )
+
+
+# The maximum number of host parameters of a SQLite statement is 999 in old versions.
+MAX_SQL_PARAMS = 900
+
+
+def encode_ids(ids: Iterable[int]) -> bytes:
+    """Compresses a sorted list of question IDs into a posting list : the gaps
+    between consecutive IDs, as little-endian 64 bits integers, deflated. Gaps are
+    small and their high bytes are zeros, so they compress well."""
+    ids = list(ids)
+    gaps = array("Q", (b - a for a, b in zip(itertools.chain((0,), ids), ids)))
+    if sys.byteorder == "big":
+        gaps.byteswap()
+    return zlib.compress(gaps.tobytes())
+
+
+def decode_ids(blob: bytes) -> list[int]:
+    """Decompresses a posting list built by `encode_ids()`.
+
+    Returns
+    -------
+        the sorted question IDs.
+    """
+    gaps = array("Q")
+    gaps.frombytes(zlib.decompress(blob))
+    if sys.byteorder == "big":
+        gaps.byteswap()
+    return list(itertools.accumulate(gaps))
+
+
+def site_db_path(path: str, site: str) -> str:
+    """Builds the path of the partition of a store holding the questions of `site`,
+    by inserting the site name before the extension : `./so_importer.db` becomes
+    `./so_importer.superuser.db` for superuser. The default site is stored at `path`
+    itself."""
+    if site == DEFAULT_SITE:
+        return path
+    partition = pathlib.Path(path)
+    return str(partition.with_name(f"{partition.stem}.{site}{partition.suffix}"))
+
+
+@dataclass(frozen=True)
+class ImportCheckpoint:
+    """The progress of an import job, as of its last committed page.
+
+    Attributes
+    ----------
+        job_id: the ID of the job, derived from its query.
+
+        query: the `questions` parameters of the job, as JSON, without the page.
+
+        page: the last page committed to the store.
+
+        cursor: the value of the sort field of the last question committed, eg its
+        `creation_date` when sorting by creation.
+
+        quota_used: the number of API calls made by the job so far.
+
+        items: the number of questions committed by the job so far.
+
+        done: whether the job fetched its last page.
+    """
+
+    job_id: str
+    query: str
+    page: int
+    cursor: int | None
+    quota_used: int
+    items: int
+    done: bool = False
+
+
+def question_row(item: dict | Question) -> tuple:
+    """Converts a question item, as returned by the API, or a `Question` record, into
+    a `questions` row."""
+    if isinstance(item, Question):
+        return (
+            item.question_id,
+            item.title,
+            item.link,
+            ";".join(item.tags) if item.tags is not None else None,
+            int(item.is_answered) if item.is_answered is not None else None,
+            item.view_count,
+            item.favorite_count,
+            item.up_vote_count,
+            item.accepted_answer_id,
+            item.answer_count,
+            item.score,
+            item.creation_date,
+            item.last_activity_date,
+        )
+    tags = item.get("tags")
+    is_answered = item.get("is_answered")
+    return (
+        item["question_id"],
+        item.get("title"),
+        item.get("link"),
+        ";".join(tags) if tags is not None else None,
+        int(is_answered) if is_answered is not None else None,
+        item.get("view_count"),
+        item.get("favorite_count"),
+        item.get("up_vote_count"),
+        item.get("accepted_answer_id"),
+        item.get("answer_count"),
+        item.get("score"),
+        item.get("creation_date"),
+        item.get("last_activity_date"),
+    )
+
+
+def record_from_row(row: sqlite3.Row) -> Question:
+    """Converts a `questions` row into a `Question` record."""
+    tags = row["tags"]
+    is_answered = row["is_answered"]
+    return Question(
+        row["question_id"],
+        row["title"],
+        row["link"],
+        tuple(tags.split(";")) if tags else (() if tags is not None else None),
+        bool(is_answered) if is_answered is not None else None,
+        row["view_count"],
+        row["favorite_count"],
+        row["up_vote_count"],
+        row["accepted_answer_id"],
+        row["answer_count"],
+        row["score"],
+        row["creation_date"],
+        row["last_activity_date"],
+    )
+
+
+def post_row(item: dict, columns: tuple[str, ...]) -> tuple:
+    """Converts an answer or comment item, as returned by the API, into a row with
+    `columns`."""
+    return tuple(
+        int(value) if isinstance(value, bool) else value
+        for value in (item.get(column) for column in columns)
+    )
+
+
+def post_from_row(row: sqlite3.Row) -> dict:
+    """Converts an `answers` or `comments` row back into an item, as returned by the
+    API. Fields which were never stored are left out."""
+    item = {column: row[column] for column in row.keys() if row[column] is not None}
+    if "is_accepted" in item:
+        item["is_accepted"] = bool(item["is_accepted"])
+    return item
+
+
+def question_from_row(row: sqlite3.Row) -> dict:
+    """Converts a `questions` row back into a question item, as returned by the API.
+    Fields which were never stored are left out."""
+    item = {
+        column: row[column] for column in QUESTION_COLUMNS if row[column] is not None
+    }
+    if "tags" in item:
+        item["tags"] = item["tags"].split(";") if item["tags"] else []
+    if "is_answered" in item:
+        item["is_answered"] = bool(item["is_answered"])
+    return item
+
+
+class QuestionStore:
+    """A SQLite database of questions, keyed on `question_id`.
+
+    Questions are written with upserts, so importing the same question twice updates
+    it instead of duplicating it. Each call to `upsert_questions()` is one
+    transaction. The store can be used as a context manager, which closes the
+    database on exit.
+
+    The store also maintains an inverted index of the tags : for each tag, the
+    compressed sorted list of the IDs of the questions tagged with it, see
+    `tags.evaluate_tag_expression()`. Upserts only mark the tags they change as
+    dirty, and the posting list of a dirty tag is rebuilt from `question_tags` when
+    it is next read, so that writing a batch doesn't cost the size of its tags.
+
+    Parameters
+    ----------
+        path: the path of the SQLite database file. Created if it doesn't exist.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self._migrate_sync_state()
+        self.connection.executescript(SCHEMA)
+        if self._tag_index_is_stale():
+            self.rebuild_tag_index()
+
+    def _migrate_sync_state(self):
+        """Adds the site to the key of the high-water marks of stores created before
+        the marks were kept per site. Their marks are those of the default site.
+
+        The tag sets of stores created before the complete syncs were recorded are
+        not known to be complete."""
+        columns = {
+            row[1] for row in self.connection.execute("PRAGMA table_info(sync_state)")
+        }
+        if not columns:
+            return
+        if "site" in columns:
+            if "complete" not in columns:
+                with self.connection:
+                    self.connection.execute(
+                        "ALTER TABLE sync_state"
+                        " ADD COLUMN complete INTEGER NOT NULL DEFAULT 0"
+                    )
+            return
+        with self.connection:
+            self.connection.execute("ALTER TABLE sync_state RENAME TO sync_state_old")
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(
+                "INSERT INTO sync_state (site, tagset, high_water_mark)"
+                " SELECT ?, tagset, high_water_mark FROM sync_state_old",
+                (DEFAULT_SITE,),
+            )
+            self.connection.execute("DROP TABLE sync_state_old")
+
+    def upsert_questions(
+        self,
+        items: Iterable[dict | Question],
+        checkpoint: ImportCheckpoint | None = None,
+        fields: Iterable[str] | None = None,
+    ) -> int:
+        """Inserts or updates a batch of question items or `Question` records, in a
+        single transaction. If a `checkpoint` is provided, it is saved in the same
+        transaction, so that it never gets ahead of, or behind, the stored questions.
+
+        `fields` are the question fields the filter of the items includes, see
+        `filters.question_filter_fields()` : those missing from an item are null, and
+        stored as such. The other fields keep their stored value. If None is
+        provided, every missing field keeps its stored value.
+
+        Returns
+        -------
+            the number of questions written.
+        """
+        rows = [question_row(item) for item in items]
+        if not rows:
+            if checkpoint is not None:
+                with self.connection:
+                    self._save_checkpoint(checkpoint)
+            return 0
+        # Column 3 holds the joined tags, None when the item didn't include them.
+        retagged = [(row[0],) for row in rows if row[3] is not None]
+        tagged = [(tag, row[0]) for row in rows if row[3] for tag in row[3].split(";")]
+        with self.connection:
+            self.connection.executemany(
+                upsert_question_sql(frozenset(fields) if fields is not None else None),
+                rows,
+            )
+            untagged = self._tags_of([question_id for question_id, in retagged])
+            self.connection.executemany(
+                "DELETE FROM question_tags WHERE question_id = ?", retagged
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO question_tags (tag, question_id) VALUES (?, ?)",
+                tagged,
+            )
+            self._mark_dirty_tags(untagged, tagged)
+            if checkpoint is not None:
+                self._save_checkpoint(checkpoint)
+        return len(rows)
+
+    def _tags_of(self, question_ids: list[int]) -> list[tuple[str, int]]:
+        """Returns the stored `(tag, question_id)` pairs of some questions."""
+        pairs = []
+        for start in range(0, len(question_ids), MAX_SQL_PARAMS):
+            chunk = question_ids[start : start + MAX_SQL_PARAMS]
+            pairs += self.connection.execute(
+                "SELECT tag, question_id FROM question_tags WHERE question_id IN"
+                f" ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+        return pairs
+
+    def _mark_dirty_tags(
+        self, removed: Iterable[tuple[str, int]], added: Iterable[tuple[str, int]]
+    ):
+        """Marks the tags which questions lost or gained as dirty, inside the
+        caller's transaction."""
+        changes: dict[str, tuple[set, set]] = collections.defaultdict(
+            lambda: (set(), set())
+        )
+        for tag, question_id in removed:
+            changes[tag][0].add(question_id)
+        for tag, question_id in added:
+            changes[tag][1].add(question_id)
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO dirty_tags (tag) VALUES (?)",
+            [(tag,) for tag, (old, new) in changes.items() if old != new],
+        )
+
+    def _refresh_postings(self, tags: Iterable[str]):
+        """Rebuilds the posting lists of those of `tags` which are dirty, from
+        `question_tags`."""
+        dirty = [
+            tag
+            for tag in tags
+            if self.connection.execute(
+                "SELECT 1 FROM dirty_tags WHERE tag = ?", (tag,)
+            ).fetchone()
+        ]
+        if not dirty:
+            return
+        with self.connection:
+            for tag in dirty:
+                ids = [
+                    row[0]
+                    for row in self.connection.execute(
+                        "SELECT question_id FROM question_tags WHERE tag = ?"
+                        " ORDER BY question_id",
+                        (tag,),
+                    )
+                ]
+                if ids:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO tag_postings (tag, size, ids)"
+                        " VALUES (?, ?, ?)",
+                        (tag, len(ids), encode_ids(ids)),
+                    )
+                else:
+                    self.connection.execute(
+                        "DELETE FROM tag_postings WHERE tag = ?", (tag,)
+                    )
+                self.connection.execute("DELETE FROM dirty_tags WHERE tag = ?", (tag,))
+
+    def _tag_index_is_stale(self) -> bool:
+        """Tells whether tags were stored before the tag index existed."""
+        return (
+            self.connection.execute("SELECT 1 FROM tag_postings LIMIT 1").fetchone()
+            is None
+            and self.connection.execute("SELECT 1 FROM dirty_tags LIMIT 1").fetchone()
+            is None
+            and self.connection.execute(
+                "SELECT 1 FROM question_tags LIMIT 1"
+            ).fetchone()
+            is not None
+        )
+
+    def rebuild_tag_index(self):
+        """Rebuilds the posting lists of all the tags from the stored tags."""
+        so_logger.info("Rebuilding the tag index of %s.", self.path)
+        with self.connection:
+            self.connection.execute("DELETE FROM tag_postings")
+            self.connection.execute("DELETE FROM dirty_tags")
+            rows = self.connection.execute(
+                "SELECT tag, question_id FROM question_tags ORDER BY tag, question_id"
+            )
+            for tag, pairs in itertools.groupby(rows, key=lambda row: row[0]):
+                ids = [question_id for _, question_id in pairs]
+                self.connection.execute(
+                    "INSERT INTO tag_postings (tag, size, ids) VALUES (?, ?, ?)",
+                    (tag, len(ids), encode_ids(ids)),
+                )
+
+    def get_tag_postings(self, tag: str) -> list[int]:
+        """Returns the sorted IDs of the stored questions tagged with `tag`."""
+        self._refresh_postings([tag])
+        row = self.connection.execute(
+            "SELECT ids FROM tag_postings WHERE tag = ?", (tag,)
+        ).fetchone()
+        return decode_ids(row[0]) if row is not None else []
+
+    def get_tag_counts(self, tags: Iterable[str]) -> dict[str, int]:
+        """Returns the number of stored questions tagged with each of `tags`."""
+        counts = dict.fromkeys(tags, 0)
+        self._refresh_postings(counts)
+        for tag in counts:
+            row = self.connection.execute(
+                "SELECT size FROM tag_postings WHERE tag = ?", (tag,)
+            ).fetchone()
+            counts[tag] = row[0] if row is not None else 0
+        return counts
+
+    def question_ids(self) -> list[int]:
+        """Returns the sorted IDs of all the stored questions."""
+        return [
+            row[0]
+            for row in self.connection.execute(
+                "SELECT question_id FROM questions ORDER BY question_id"
+            )
+        ]
+
+    def get_questions(self, question_ids: Iterable[int]) -> Iterator[dict]:
+        """Retrieves stored questions, in the order of `question_ids`. Questions
+        which aren't stored are skipped."""
+        question_ids = list(question_ids)
+        for start in range(0, len(question_ids), MAX_SQL_PARAMS):
+            chunk = question_ids[start : start + MAX_SQL_PARAMS]
+            rows = {
+                row["question_id"]: row
+                for row in self.connection.execute(
+                    "SELECT * FROM questions WHERE question_id IN"
+                    f" ({', '.join('?' for _ in chunk)})",
+                    chunk,
+                )
+            }
+            for question_id in chunk:
+                if question_id in rows:
+                    yield question_from_row(rows[question_id])
+
+    def write_pages(
+        self, pages: Iterable[dict], fields: Iterable[str] | None = None
+    ) -> int:
+        """Writes the items of each page of an API response, one transaction per page.
+        `fields` are the question fields of the filter, as in `upsert_questions()`.
+
+        Returns
+        -------
+            the number of questions written.
+        """
+        total = 0
+        for page in pages:
+            total += self.upsert_questions(page.get("items", []), fields=fields)
+        so_logger.debug("Wrote %s questions to %s.", total, self.path)
+        return total
+
+    def get_question(self, question_id: int) -> dict | None:
+        """Retrieves a stored question, or None if it isn't stored."""
+        row = self.connection.execute(
+            "SELECT * FROM questions WHERE question_id = ?", (question_id,)
+        ).fetchone()
+        return question_from_row(row) if row is not None else None
+
+    def iter_questions(
+        self, tag: str | None = None, records: bool = False
+    ) -> Iterator[dict | Question]:
+        """Iterates over the stored questions, by creation date, optionally only
+        those tagged with `tag`. If `records` is True, the questions are yielded as
+        `Question` records instead of dicts."""
+        if tag is None:
+            cursor = self.connection.execute(
+                "SELECT * FROM questions ORDER BY creation_date"
+            )
+        else:
+            cursor = self.connection.execute(
+                "SELECT questions.* FROM questions JOIN question_tags"
+                " USING (question_id) WHERE tag = ? ORDER BY creation_date",
+                (tag,),
+            )
+        convert = record_from_row if records else question_from_row
+        for row in cursor:
+            yield convert(row)
+
+    def get_high_water_mark(self, tagset: str, site: str = DEFAULT_SITE) -> int | None:
+        """Returns the latest `last_activity_date` synced for a tag set of `site`, if
+        any."""
+        row = self.connection.execute(
+            "SELECT high_water_mark FROM sync_state WHERE site = ? AND tagset = ?",
+            (site, tagset),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def set_high_water_mark(
+        self,
+        tagset: str,
+        high_water_mark: int,
+        site: str = DEFAULT_SITE,
+        complete: bool = False,
+    ):
+        """Records the latest `last_activity_date` synced for a tag set of `site`.
+        The mark never moves backwards.
+
+        `complete` tells whether the sync started from the beginning, rather than
+        from a `since` date, so that the store holds every question of the tag set.
+        A tag set stays complete once it is."""
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO sync_state (site, tagset, high_water_mark, complete)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (site, tagset) DO UPDATE SET high_water_mark ="
+                " MAX(high_water_mark, excluded.high_water_mark), complete ="
+                " MAX(complete, excluded.complete)",
+                (site, tagset, high_water_mark, int(complete)),
+            )
+
+    def _in_chunks(self, sql: str, ids: list[int]):
+        """Runs a statement with an `IN ({ids})` clause, over chunks of `ids` small
+        enough for SQLite, inside the caller's transaction."""
+        for start in range(0, len(ids), MAX_SQL_PARAMS):
+            chunk = ids[start : start + MAX_SQL_PARAMS]
+            self.connection.execute(
+                sql.replace("{ids}", ", ".join("?" for _ in chunk)), chunk
+            )
+
+    def get_answer_counts(self, question_ids: Iterable[int]) -> dict[int, int]:
+        """Returns the `answer_count` of questions when their answers were last
+        stored. Questions whose answers were never stored are left out."""
+        question_ids = list(question_ids)
+        counts = {}
+        for start in range(0, len(question_ids), MAX_SQL_PARAMS):
+            chunk = question_ids[start : start + MAX_SQL_PARAMS]
+            counts.update(
+                self.connection.execute(
+                    "SELECT question_id, answer_count FROM answer_counts WHERE"
+                    f" question_id IN ({', '.join('?' for _ in chunk)})",
+                    chunk,
+                ).fetchall()
+            )
+        return counts
+
+    def replace_answers(
+        self,
+        question_ids: Iterable[int],
+        items: Iterable[dict],
+        answer_counts: dict[int, int],
+    ) -> int:
+        """Replaces all the answers of some questions, in a single transaction.
+        Answers which are no longer returned, because they were deleted, are removed
+        with their comments.
+
+        Parameters
+        ----------
+            question_ids: the questions whose answers are replaced.
+
+            items: the answer items, as returned by the API.
+
+            answer_counts: the `answer_count` of each question, recorded so that
+            questions without new answers can be skipped next time.
+
+        Returns
+        -------
+            the number of answers written.
+        """
+        question_ids = list(question_ids)
+        rows = [post_row(item, ANSWER_COLUMNS) for item in items]
+        with self.connection:
+            self._in_chunks(
+                "DELETE FROM comments WHERE post_id IN (SELECT answer_id FROM answers"
+                " WHERE question_id IN ({ids}))",
+                question_ids,
+            )
+            self._in_chunks(
+                "DELETE FROM answers WHERE question_id IN ({ids})", question_ids
+            )
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO answers ({', '.join(ANSWER_COLUMNS)})"
+                f" VALUES ({', '.join('?' for _ in ANSWER_COLUMNS)})",
+                rows,
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO answer_counts (question_id, answer_count)"
+                " VALUES (?, ?)",
+                [
+                    (question_id, answer_counts[question_id])
+                    for question_id in question_ids
+                    if question_id in answer_counts
+                ],
+            )
+        return len(rows)
+
+    def replace_comments(self, post_ids: Iterable[int], items: Iterable[dict]) -> int:
+        """Replaces all the comments of some posts, in a single transaction.
+
+        Returns
+        -------
+            the number of comments written.
+        """
+        rows = [post_row(item, COMMENT_COLUMNS) for item in items]
+        with self.connection:
+            self._in_chunks(
+                "DELETE FROM comments WHERE post_id IN ({ids})", list(post_ids)
+            )
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO comments ({', '.join(COMMENT_COLUMNS)})"
+                f" VALUES ({', '.join('?' for _ in COMMENT_COLUMNS)})",
+                rows,
+            )
+        return len(rows)
+
+    def get_answers(self, question_id: int) -> list[dict]:
+        """Retrieves the stored answers of a question, oldest first."""
+        return [
+            post_from_row(row)
+            for row in self.connection.execute(
+                "SELECT * FROM answers WHERE question_id = ?"
+                " ORDER BY creation_date, answer_id",
+                (question_id,),
+            )
+        ]
+
+    def get_comments(self, post_id: int) -> list[dict]:
+        """Retrieves the stored comments of a post, oldest first."""
+        return [
+            post_from_row(row)
+            for row in self.connection.execute(
+                "SELECT * FROM comments WHERE post_id = ?"
+                " ORDER BY creation_date, comment_id",
+                (post_id,),
+            )
+        ]
+
+    def synced_tagsets(
+        self, site: str = DEFAULT_SITE, complete: bool = False
+    ) -> set[str]:
+        """Returns the tag sets of `site` synced at least once, see
+        `sync.sync_questions()`. If `complete` is True, only those synced from the
+        beginning, whose questions are all stored, are returned."""
+        return {
+            row[0]
+            for row in self.connection.execute(
+                "SELECT tagset FROM sync_state WHERE site = ? AND complete >= ?",
+                (site, int(complete)),
+            )
+        }
+
+    def get_checkpoint(self, job_id: str) -> ImportCheckpoint | None:
+        """Returns the last checkpoint of an import job, if any."""
+        row = self.connection.execute(
+            "SELECT job_id, query, page, cursor, quota_used, items, done"
+            " FROM import_jobs WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return ImportCheckpoint(*row[:-1], done=bool(row["done"]))
+
+    def _save_checkpoint(self, checkpoint: ImportCheckpoint):
+        """Saves a checkpoint, inside the caller's transaction."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO import_jobs (job_id, query, page, cursor,"
+            " quota_used, items, done) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                checkpoint.job_id,
+                checkpoint.query,
+                checkpoint.page,
+                checkpoint.cursor,
+                checkpoint.quota_used,
+                checkpoint.items,
+                int(checkpoint.done),
+            ),
+        )
+
+    def count(self) -> int:
+        """Returns the number of stored questions."""
+        return self.connection.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def close(self):
+        """Closes the database."""
+        self.connection.close()
+
+    def __enter__(self) -> "QuestionStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,151 @@
+"""Incremental synchronisation of the question store with the API.
+
+Each tag set of each site keeps a high-water mark: the latest `last_activity_date`
+stored for it. A sync only asks the API for questions active since that mark, sorted
+by activity, and upserts them. Questions changed in the meantime are therefore
+re-fetched, and everything else is left untouched.
+
+The sync pages by cursor rather than by page number : after each page, it queries
+again from the latest activity date fetched, skipping the questions of that second
+already fetched. A question which gets new activity during the sync then moves
+ahead of the cursor, instead of shifting the pages still to fetch.
+"""
+
+import logging
+import time
+
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.filters import question_filter_fields
+from stack_overflow_importer.progress import ProgressReporter
+from stack_overflow_importer.questions import (
+    DEFAULT_SITE,
+    Order,
+    QuestionSortMethod,
+    Timestampable,
+    extract_timestamp,
+    iter_question_pages,
+)
+from stack_overflow_importer.store import QuestionStore
+
+
+so_logger = logging.getLogger("so_importer")
+
+
+def normalize_tagset(tagged: str | None) -> str:
+    """Builds the key of a tag set, independent of the tags order and case.
+
+    For example, `Python;pandas` and `pandas;python` both become `pandas;python`, and
+    no tags at all becomes an empty string.
+    """
+    if not tagged:
+        return ""
+    return ";".join(sorted({tag.strip().lower() for tag in tagged.split(";")} - {""}))
+
+
+def sync_questions(
+    store: QuestionStore,
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,  # pylint: disable=redefined-builtin
+    tagged: str | None = None,
+    since: Timestampable | None = None,
+    client: ApiClient | None = None,
+    site: str = DEFAULT_SITE,
+    progress: ProgressReporter | None = None,
+) -> int:
+    """Fetches the questions active since the last sync of a tag set, and upserts
+    them into `store`.
+
+    Parameters
+    ----------
+        store: the store to update, which also keeps the high-water marks.
+
+        key, access_token, filter, tagged: as in `get_questions()`. The filter must
+        include `question.last_activity_date`.
+
+        since: Optional, where to start from when the tag set was never synced. If
+        None is provided, the first sync fetches all the questions of the tag set,
+        and the store is then known to hold all of them, see `tags.is_synced()`.
+
+        client: Optional, an `ApiClient` to reuse pooled connections.
+
+        site: Optional, the API name of the Stack Exchange site to sync. Question IDs
+        are only unique within a site : use one store per site, see
+        `store.site_db_path()`.
+
+    Returns
+    -------
+        the number of questions upserted.
+    """
+    tagset = normalize_tagset(tagged)
+    high_water_mark = store.get_high_water_mark(tagset, site)
+    complete = high_water_mark is None and since is None
+    if high_water_mark is None and since is not None:
+        high_water_mark = extract_timestamp("since", since)
+    so_logger.info(
+        "Syncing questions tagged '%s' active since %s.", tagset, high_water_mark
+    )
+
+    fields = question_filter_fields(filter)
+    if progress is not None:
+        progress.set_target(int(time.time()))
+        progress.advance(high_water_mark)
+    total = 0
+    mark, page = high_water_mark, 1
+    boundary: set[int] = set()
+    while True:
+        response = next(
+            iter_question_pages(
+                key,
+                access_token,
+                filter,
+                order=Order.ASC,
+                min=mark,
+                sort=QuestionSortMethod.ACTIVITY,
+                tagged=tagged,
+                client=client,
+                page=page,
+                site=site,
+            ),
+            None,
+        )
+        if response is None:
+            break
+        items = response.get("items", [])
+        total += store.upsert_questions(
+            [
+                item
+                for item in items
+                if item.get("last_activity_date") != mark
+                or item.get("question_id") not in boundary
+            ],
+            fields=fields,
+        )
+        activity = [
+            item["last_activity_date"]
+            for item in items
+            if item.get("last_activity_date") is not None
+        ]
+        if activity:
+            store.set_high_water_mark(tagset, max(activity), site, complete)
+            if progress is not None:
+                progress.advance(max(activity))
+        elif items:
+            so_logger.warning(
+                "The questions have no 'last_activity_date': make sure the filter"
+                " includes it, or the next sync will start over."
+            )
+        if not response.get("has_more"):
+            break
+        # Move the cursor, or page through the questions active in the same second.
+        if activity and max(activity) != mark:
+            mark, page, boundary = max(activity), 1, set()
+        else:
+            page += 1
+        boundary |= {
+            item.get("question_id")
+            for item in items
+            if item.get("last_activity_date") == mark
+        }
+    so_logger.info("Synced %s questions tagged '%s'.", total, tagset)
+    return total
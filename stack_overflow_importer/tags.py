@@ -0,0 +1,319 @@
+"""Boolean tag queries, answered from the local tag index or planned as API calls.
+
+The `tagged` parameter of the API only matches questions having all of the given
+tags. Tag expressions add OR, NOT and parentheses, for example
+`python and (pandas or polars) and not r`. Tags joined by `;`, as in `tagged`, are
+ANDed : `python;pandas or r` means `(python and pandas) or r`.
+
+An expression is answered from the inverted tag index of a `QuestionStore` when the
+store holds all the questions it can match, that is when the tag sets it needs were
+synced. Otherwise, the expression is rewritten as an OR of ANDs, and each AND of
+tags becomes one `tagged` API call. Calls covered by another one, because they
+require more tags, are dropped, the results of the remaining calls are deduplicated,
+and filtered locally for the NOTs the API can't express.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+import itertools
+import logging
+import re
+
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.questions import DEFAULT_SITE, iter_questions
+from stack_overflow_importer.store import QuestionStore
+
+so_logger = logging.getLogger("so_importer")
+
+MAX_TAGGED = 5
+"""The maximum number of tags of the `tagged` parameter."""
+
+_TOKEN = re.compile(r"\(|\)|[^\s()]+")
+
+
+@dataclass(frozen=True)
+class Tag:
+    """Matches the questions tagged with `name`."""
+
+    name: str
+
+
+@dataclass(frozen=True)
+class And:
+    """Matches the questions matching all of `operands`."""
+
+    operands: tuple
+
+
+@dataclass(frozen=True)
+class Or:
+    """Matches the questions matching any of `operands`."""
+
+    operands: tuple
+
+
+@dataclass(frozen=True)
+class Not:
+    """Matches the questions not matching `operand`."""
+
+    operand: object
+
+
+TagExpression = Tag | And | Or | Not
+
+
+def parse_tag_expression(expression: str) -> TagExpression:
+    """Parses a tag expression. `not` binds tighter than `and`, which binds tighter
+    than `or`. Keywords are case insensitive, and tags are lowercased.
+
+    Raises
+    ------
+        ValueError if the expression is empty or malformed.
+    """
+    tokens = _TOKEN.findall(expression)
+    parsed, position = _parse_or(tokens, 0, expression)
+    if position != len(tokens):
+        raise ValueError(
+            f"Unexpected '{tokens[position]}' in the tag expression '{expression}'."
+        )
+    return parsed
+
+
+def _parse_or(tokens: list[str], position: int, expression: str) -> tuple:
+    """Parses `and_expression (or and_expression)*`."""
+    operands = []
+    while True:
+        operand, position = _parse_and(tokens, position, expression)
+        operands.append(operand)
+        if position < len(tokens) and tokens[position].lower() == "or":
+            position += 1
+            continue
+        return (operands[0] if len(operands) == 1 else Or(tuple(operands))), position
+
+
+def _parse_and(tokens: list[str], position: int, expression: str) -> tuple:
+    """Parses `unary (and unary)*`."""
+    operands = []
+    while True:
+        operand, position = _parse_unary(tokens, position, expression)
+        operands.append(operand)
+        if position < len(tokens) and tokens[position].lower() == "and":
+            position += 1
+            continue
+        return (operands[0] if len(operands) == 1 else And(tuple(operands))), position
+
+
+def _parse_unary(tokens: list[str], position: int, expression: str) -> tuple:
+    """Parses `not unary`, `( or_expression )`, or tags."""
+    if position >= len(tokens):
+        raise ValueError(f"The tag expression '{expression}' is incomplete.")
+    token = tokens[position]
+    if token.lower() == "not":
+        operand, position = _parse_unary(tokens, position + 1, expression)
+        return Not(operand), position
+    if token == "(":
+        operand, position = _parse_or(tokens, position + 1, expression)
+        if position >= len(tokens) or tokens[position] != ")":
+            raise ValueError(f"Missing ')' in the tag expression '{expression}'.")
+        return operand, position + 1
+    if token == ")" or token.lower() in ("and", "or"):
+        raise ValueError(f"Unexpected '{token}' in the tag expression '{expression}'.")
+    tags = [Tag(tag.lower()) for tag in token.split(";") if tag]
+    if not tags:
+        raise ValueError(f"Unexpected '{token}' in the tag expression '{expression}'.")
+    return (tags[0] if len(tags) == 1 else And(tuple(tags))), position + 1
+
+
+def matches(expression: TagExpression, tags: Iterable[str]) -> bool:
+    """Tells whether a question with `tags` matches `expression`."""
+    tags = tags if isinstance(tags, (set, frozenset)) else set(tags)
+    if isinstance(expression, Tag):
+        return expression.name in tags
+    if isinstance(expression, And):
+        return all(matches(operand, tags) for operand in expression.operands)
+    if isinstance(expression, Or):
+        return any(matches(operand, tags) for operand in expression.operands)
+    return not matches(expression.operand, tags)
+
+
+def evaluate_tag_expression(
+    expression: TagExpression, store: QuestionStore
+) -> list[int]:
+    """Finds the stored questions matching `expression`, from the tag index of
+    `store`.
+
+    Returns
+    -------
+        the sorted IDs of the matching questions.
+    """
+    return sorted(_evaluate(expression, store))
+
+
+def _evaluate(expression: TagExpression, store: QuestionStore) -> set[int]:
+    """Evaluates an expression into a set of question IDs."""
+    if isinstance(expression, Tag):
+        return set(store.get_tag_postings(expression.name))
+    if isinstance(expression, Or):
+        return set().union(
+            *(_evaluate(operand, store) for operand in expression.operands)
+        )
+    if isinstance(expression, Not):
+        return set(store.question_ids()) - _evaluate(expression.operand, store)
+    # Intersects the positive operands first, smallest tags first, so that the
+    # result shrinks early, then subtracts the negated ones instead of complementing
+    # them.
+    negated = [op.operand for op in expression.operands if isinstance(op, Not)]
+    positive = [op for op in expression.operands if not isinstance(op, Not)]
+    counts = store.get_tag_counts(op.name for op in positive if isinstance(op, Tag))
+    positive.sort(key=lambda op: counts.get(op.name, 0) if isinstance(op, Tag) else 0)
+    ids = _evaluate(positive[0], store) if positive else set(store.question_ids())
+    for operand in positive[1:]:
+        if not ids:
+            return ids
+        ids &= _evaluate(operand, store)
+    for operand in negated:
+        if not ids:
+            return ids
+        ids -= _evaluate(operand, store)
+    return ids
+
+
+def conjunctions(expression: TagExpression) -> list[tuple[frozenset, frozenset]]:
+    """Rewrites an expression as an OR of ANDs, pushing the NOTs down to the tags.
+
+    Returns
+    -------
+        the ANDs, as pairs of required tags and excluded tags. Contradictory ANDs,
+        requiring and excluding the same tag, are left out.
+    """
+    return [
+        (required, excluded)
+        for required, excluded in _conjunctions(expression, False)
+        if not required & excluded
+    ]
+
+
+def _conjunctions(expression: TagExpression, negate: bool) -> list[tuple]:
+    """Rewrites an expression, or its negation, as an OR of ANDs."""
+    if isinstance(expression, Tag):
+        name = frozenset((expression.name,))
+        return [(frozenset(), name)] if negate else [(name, frozenset())]
+    if isinstance(expression, Not):
+        return _conjunctions(expression.operand, not negate)
+    # By De Morgan's laws, a negated AND is an OR of negations, and vice versa.
+    if isinstance(expression, Or) != negate:
+        return [
+            conjunction
+            for operand in expression.operands
+            for conjunction in _conjunctions(operand, negate)
+        ]
+    return [
+        (
+            frozenset().union(*(required for required, _ in product)),
+            frozenset().union(*(excluded for _, excluded in product)),
+        )
+        for product in itertools.product(
+            *(_conjunctions(operand, negate) for operand in expression.operands)
+        )
+    ]
+
+
+def plan_tag_queries(expression: TagExpression) -> list[str]:
+    """Plans the fewest `tagged` API calls returning all the questions matching
+    `expression`.
+
+    Each AND of the expression needs the questions having all of its required tags.
+    A call for a subset of these tags returns them too : ANDs requiring a superset
+    of the tags of another AND are dropped. Calls are limited to `MAX_TAGGED` tags,
+    the extra ones being filtered locally.
+
+    Returns
+    -------
+        the `tagged` parameters of the calls, as sorted `;` separated tags. An empty
+        string is a call for all the questions.
+    """
+    tagsets = {
+        frozenset(sorted(required)[:MAX_TAGGED])
+        for required, _ in conjunctions(expression)
+    }
+    minimal = [
+        tagset for tagset in tagsets if not any(other < tagset for other in tagsets)
+    ]
+    return sorted(";".join(sorted(tagset)) for tagset in minimal)
+
+
+def is_synced(store: QuestionStore, tagged: str, site: str = DEFAULT_SITE) -> bool:
+    """Tells whether `store` holds all the questions of `site` having the tags of
+    `tagged`, because a subset of these tags was synced from the beginning. A tag set
+    whose first sync started from a `since` date misses the older questions."""
+    tags = set(tagged.split(";")) - {""}
+    return any(
+        set(tagset.split(";")) - {""} <= tags
+        for tagset in store.synced_tagsets(site, complete=True)
+    )
+
+
+def search_questions(
+    expression: str,
+    store: QuestionStore | None = None,
+    key: str | None = None,
+    access_token: str | None = None,
+    filter: str | None = None,  # pylint: disable=redefined-builtin
+    client: ApiClient | None = None,
+    site: str = DEFAULT_SITE,
+) -> Iterator[dict]:
+    """Iterates over the questions matching a tag expression, each once.
+
+    Parameters
+    ----------
+        expression: the tag expression, see `parse_tag_expression()`.
+
+        store: Optional, a store to answer from. The stored questions matching the
+        expression are read from its tag index, and only the tag sets the store
+        didn't sync completely, see `is_synced()`, are fetched from the API.
+
+        key, access_token, filter: as in `get_questions()`. The filter must include
+        `question.tags`.
+
+        client: Optional, an `ApiClient` to reuse pooled connections.
+
+        site: Optional, the API name of the Stack Exchange site to query.
+
+    Returns
+    -------
+        the stored questions first, then the fetched ones.
+    """
+    parsed = parse_tag_expression(expression)
+    calls = plan_tag_queries(parsed)
+    seen: set[int] = set()
+    if store is not None:
+        ids = evaluate_tag_expression(parsed, store)
+        seen.update(ids)
+        yield from store.get_questions(ids)
+        calls = [tagged for tagged in calls if not is_synced(store, tagged, site)]
+    so_logger.info(
+        "Fetching the questions matching '%s' in %s calls : %s.",
+        expression,
+        len(calls),
+        calls,
+    )
+    for tagged in calls:
+        for item in iter_questions(
+            key,
+            access_token,
+            filter,
+            tagged=tagged or None,
+            client=client,
+            site=site,
+        ):
+            if item["question_id"] in seen:
+                continue
+            if "tags" not in item:
+                so_logger.warning(
+                    "Question %s has no 'tags': make sure the filter includes them.",
+                    item["question_id"],
+                )
+                continue
+            if matches(parsed, item["tags"]):
+                seen.add(item["question_id"])
+                yield item
@@ -0,0 +1,30 @@
+"""Fixtures shared by the tests of the stack_overflow_importer package."""
+
+import pytest
+
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.scheduler import RequestScheduler
+from stack_overflow_importer.store import QuestionStore
+
+
+@pytest.fixture()
+def store(tmp_path):
+    """Fixture to return a fresh store for each test."""
+    with QuestionStore(str(tmp_path / "test.db")) as question_store:
+        yield question_store
+
+
+@pytest.fixture()
+def make_client():
+    """Fixture to return a function building a client for a
+    `FakeStackExchangeServer`, with a scheduler of its own. Keyword arguments are
+    passed on to `ApiClient`."""
+
+    def make(server, **kwargs) -> ApiClient:
+        return ApiClient(
+            base_site=server.base_site,
+            scheduler=RequestScheduler(rate=1000, burst=100),
+            **kwargs,
+        )
+
+    return make
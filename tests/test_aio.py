@@ -0,0 +1,295 @@
+"""Tests for the stack_overflow_importer/aio.py module, against a local fake server."""
+
+import asyncio
+import json
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+# pylint: disable=wrong-import-position
+from aiohttp import web
+from aiohttp.test_utils import TestServer, unused_port
+
+from stack_overflow_importer.aio import (
+    AsyncApiClient,
+    async_get_questions,
+    async_query_method,
+)
+from stack_overflow_importer.questions import build_questions_params
+from stack_overflow_importer.retry import RetryPolicy
+from stack_overflow_importer.scheduler import QuotaExhaustedError, RequestScheduler
+
+
+def build_app(received, outcomes=()):
+    """Builds a fake API answering `questions` and `info` calls, and `flaky` calls
+    with each of `outcomes`, as `(status, body, content_type)`, in turn. It records
+    the query strings it receives."""
+    remaining = list(outcomes)
+
+    async def questions(request):
+        received.append(dict(request.query))
+        return web.json_response(
+            {
+                "items": [{"question_id": 1, "title": "foo"}],
+                "has_more": False,
+                "quota_max": 300,
+                "quota_remaining": 0,
+            }
+        )
+
+    async def info(request):
+        received.append(dict(request.query))
+        return web.json_response({"items": [{"api_revision": "test"}]})
+
+    async def flaky(request):
+        received.append(dict(request.query))
+        status, body, content_type = remaining.pop(0)
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        return web.Response(status=status, text=body, content_type=content_type)
+
+    app = web.Application()
+    app.router.add_get("/2.3/questions", questions)
+    app.router.add_get("/2.3/info", info)
+    app.router.add_get("/2.3/flaky", flaky)
+    return app
+
+
+def run_with_server(test, outcomes=()):
+    """Runs the `test(base_site, received)` coroutine against a fresh fake server."""
+    received = []
+
+    async def runner():
+        async with TestServer(build_app(received, outcomes)) as server:
+            base_site = str(server.make_url("")).rstrip("/")
+            return await test(base_site, received)
+
+    return asyncio.run(runner())
+
+
+def test_query_method():
+    """It returns the API JSON response."""
+
+    async def test(base_site, received):
+        async with AsyncApiClient(
+            base_site=base_site, scheduler=RequestScheduler()
+        ) as client:
+            response = await async_query_method(
+                "info", "key", "token", {"site": "stackoverflow"}, client
+            )
+        assert response == {"items": [{"api_revision": "test"}]}
+        assert received == [
+            {"site": "stackoverflow", "key": "key", "access_token": "token"}
+        ]
+
+    run_with_server(test)
+
+
+@pytest.mark.parametrize(
+    "method, params",
+    [
+        (None, {"site": "stackoverflow"}),
+        ("info", {}),
+    ],
+)
+def test_query_method_invalid_input(method, params, capsys):
+    """It returns None, like the sync version, on a missing method or params."""
+    assert asyncio.run(async_query_method(method, None, None, params)) is None
+    assert "Please provide" in capsys.readouterr().out
+
+
+def test_get_questions_builds_same_params():
+    """It sends the same query string as the sync get_questions()."""
+
+    async def test(base_site, received):
+        async with AsyncApiClient(
+            base_site=base_site, scheduler=RequestScheduler()
+        ) as client:
+            response = await async_get_questions(
+                filter="f",
+                page=2,
+                pagesize=50,
+                fromdate="2022-01-01",
+                tagged="python",
+                client=client,
+            )
+        assert response["items"] == [{"question_id": 1, "title": "foo"}]
+        assert received == [
+            build_questions_params(
+                filter="f",
+                page=2,
+                pagesize=50,
+                fromdate="2022-01-01",
+                order=None,
+                sort=None,
+                tagged="python",
+            )
+        ]
+
+    run_with_server(test)
+
+
+def test_concurrent_calls_share_scheduler():
+    """Many calls can be in flight on one client, sharing its scheduler."""
+
+    async def test(base_site, received):
+        scheduler = RequestScheduler(rate=1000, burst=100)
+        async with AsyncApiClient(base_site=base_site, scheduler=scheduler) as client:
+            responses = await asyncio.gather(
+                *(
+                    async_get_questions(page=page, client=client)
+                    for page in range(1, 21)
+                )
+            )
+        assert len(responses) == 20
+        assert len(received) == 20
+        assert scheduler.quota_remaining == 0
+        with pytest.raises(QuotaExhaustedError):
+            await scheduler.acquire_async("questions")
+
+    run_with_server(test)
+
+
+def test_own_retry_policy():
+    """Each client has its own retry policy, and so its own retry budget."""
+    assert AsyncApiClient().retry is not AsyncApiClient().retry
+
+
+def error(error_id, name, message="An error."):
+    """Builds an API error response."""
+    return {"error_id": error_id, "error_name": name, "error_message": message}
+
+
+class TestQueryMethodRetries:
+    """Tests for the retries of aio.async_query_method(), which match those of
+    base.query_method()."""
+
+    @staticmethod
+    def make_client(base_site, delays, **policy):
+        """Builds a client recording the delays it sleeps in `delays`."""
+
+        async def sleep(delay):
+            delays.append(delay)
+
+        return AsyncApiClient(
+            base_site=base_site,
+            scheduler=RequestScheduler(rate=1000, burst=100),
+            retry=RetryPolicy(jitter=lambda: 1, async_sleep=sleep, **policy),
+        )
+
+    def test_transient_errors(self):
+        """GIVEN transient failures, then a success
+        SHOULD retry until the success, backing off"""
+        delays = []
+
+        async def test(base_site, received):
+            async with self.make_client(base_site, delays) as client:
+                result = await async_query_method(
+                    "flaky", None, None, {"site": "so"}, client
+                )
+            assert result == {"items": [1]}
+            assert len(received) == 3
+
+        run_with_server(
+            test,
+            [
+                (503, "<html></html>", "text/html"),
+                (400, error(502, "throttle_violation"), "application/json"),
+                (200, {"items": [1]}, "application/json"),
+            ],
+        )
+        assert delays == [1, 2]
+
+    def test_fatal_error(self):
+        """GIVEN a fatal error, or an error page
+        SHOULD return them as error responses, without retrying"""
+        delays = []
+
+        async def test(base_site, received):
+            async with self.make_client(base_site, delays) as client:
+                results = [
+                    await async_query_method(
+                        "flaky", None, None, {"site": "so"}, client
+                    )
+                    for _ in range(2)
+                ]
+            assert results[0]["error_name"] == "bad_parameter"
+            assert results[1]["error_name"] == "http_error"
+            assert results[1]["error_id"] == 404
+
+        run_with_server(
+            test,
+            [
+                (400, error(400, "bad_parameter"), "application/json"),
+                (404, "<html>Not found</html>", "text/html"),
+            ],
+        )
+        assert not delays
+
+    def test_exhausted_error(self):
+        """GIVEN an error outlasting the attempts
+        SHOULD return the last error"""
+        delays = []
+
+        async def test(base_site, received):
+            async with self.make_client(base_site, delays, max_attempts=2) as client:
+                result = await async_query_method(
+                    "flaky", None, None, {"site": "so"}, client
+                )
+            assert result["error_name"] == "internal_error"
+
+        run_with_server(
+            test, [(500, error(500, "internal_error"), "application/json")] * 2
+        )
+        assert delays == [1]
+
+    def test_exhausted_exception(self):
+        """GIVEN a connection failure outlasting the attempts
+        SHOULD raise it, and record every attempt on the scheduler"""
+        delays = []
+        base_site = f"http://127.0.0.1:{unused_port()}"
+
+        async def test():
+            async with self.make_client(base_site, delays, max_attempts=3) as client:
+                with pytest.raises(aiohttp.ClientError):
+                    await async_query_method("info", None, None, {"site": "so"}, client)
+                return client.scheduler
+
+        scheduler = asyncio.run(test())
+        assert delays == [1, 2]
+        assert scheduler._in_flight == 0  # pylint: disable=protected-access
+
+    def test_metrics(self):
+        """GIVEN a client with a hook
+        SHOULD pass it the metrics of every attempt"""
+        delays = []
+        records = []
+
+        async def test(base_site, received):
+            client = self.make_client(base_site, delays)
+            client.hooks.append(records.append)
+            async with client:
+                await async_query_method("flaky", None, None, {"site": "so"}, client)
+
+        run_with_server(
+            test,
+            [
+                (503, "<html></html>", "text/html"),
+                (200, {"items": [1, 2], "quota_remaining": 9}, "application/json"),
+            ],
+        )
+        failed, succeeded = records
+        assert (failed.method, failed.attempt, failed.status) == ("flaky", 1, 503)
+        assert (failed.error, failed.retry_in) == ("http_error", 1)
+        assert (succeeded.attempt, succeeded.status, succeeded.retry_in) == (
+            2,
+            200,
+            None,
+        )
+        assert (succeeded.items, succeeded.quota_remaining) == (2, 9)
+        assert succeeded.bytes_received == len(
+            b'{"items": [1, 2], "quota_remaining": 9}'
+        )
+        assert 0 <= succeeded.ttfb <= succeeded.total
+        assert succeeded.decode > 0
+        assert succeeded.queue_wait == 0
@@ -0,0 +1,112 @@
+"""Tests for the stack_overflow_importer/answers.py module."""
+
+import pytest
+
+from stack_overflow_importer.answers import import_answers, outdated_answer_counts
+from stack_overflow_importer.fake_server import FakeStackExchangeServer
+from stack_overflow_importer.models import Question
+
+# 250 questions, question n having n % 3 answers, and answer 10n + k having k
+# comments.
+QUESTIONS = [
+    {"question_id": question_id, "answer_count": question_id % 3}
+    for question_id in range(1, 251)
+]
+ANSWERS = [
+    {
+        "answer_id": 10 * question["question_id"] + k,
+        "question_id": question["question_id"],
+        "is_accepted": k == 1,
+        "score": k,
+    }
+    for question in QUESTIONS
+    for k in range(1, question["answer_count"] + 1)
+]
+COMMENTS = [
+    {"comment_id": 100 * answer["answer_id"] + k, "post_id": answer["answer_id"]}
+    for answer in ANSWERS
+    for k in range(1, answer["score"] + 1)
+]
+
+
+@pytest.fixture()
+def server():
+    """Fixture to return a fake API serving QUESTIONS, ANSWERS and COMMENTS."""
+    with FakeStackExchangeServer(QUESTIONS, ANSWERS, COMMENTS) as fake_server:
+        yield fake_server
+
+
+class TestImportAnswers:
+    """Tests for answers.import_answers()."""
+
+    def test_import(self, store, server, make_client):
+        """GIVEN crawled questions
+        SHOULD store their answers and comments, 100 IDs per call"""
+        with make_client(server) as client:
+            counts = import_answers(store, QUESTIONS, client=client, max_workers=3)
+        assert counts == (len(ANSWERS), len(COMMENTS))
+        assert [answer["answer_id"] for answer in store.get_answers(5)] == [51, 52]
+        assert store.get_answers(5)[0]["is_accepted"] is True
+        assert [comment["comment_id"] for comment in store.get_comments(52)] == [
+            5201,
+            5202,
+        ]
+        # 167 questions with answers in 2 batches, the first with 150 answers over 2
+        # pages, and 250 answers in 3 batches, with more than a page of comments each
+        assert server.requests["questions/{ids}/answers"] == 3
+        assert server.requests["answers/{ids}/comments"] >= 3
+
+    def test_skips_unchanged(self, store, server, make_client):
+        """GIVEN questions whose answer count didn't change since the last run
+        SHOULD only fetch the answers of the others"""
+        with make_client(server) as client:
+            import_answers(store, QUESTIONS, client=client)
+            server.requests.clear()
+            changed = [Question(question_id=2, answer_count=3)]
+            unchanged = [Question(question_id=5, answer_count=2)]
+            counts = import_answers(store, changed + unchanged, client=client)
+        assert counts == (2, 3)
+        assert server.requests["questions/{ids}/answers"] == 1
+        assert [answer["answer_id"] for answer in store.get_answers(2)] == [21, 22]
+
+    def test_deleted_answers(self, store, server, make_client):
+        """GIVEN questions which lost answers
+        SHOULD remove them, and their comments"""
+        with make_client(server) as client:
+            import_answers(store, QUESTIONS[:5], client=client)
+            server.answers = [
+                answer for answer in server.answers if answer["answer_id"] != 52
+            ]
+            server.requests.clear()
+            import_answers(
+                store,
+                [
+                    {"question_id": 5, "answer_count": 1},
+                    {"question_id": 4, "answer_count": 0},
+                ],
+                client=client,
+            )
+        assert [answer["answer_id"] for answer in store.get_answers(5)] == [51]
+        assert store.get_comments(52) == []
+        assert store.get_answers(4) == []
+        assert server.requests["questions/{ids}/answers"] == 1
+
+    def test_without_comments(self, store, server, make_client):
+        """GIVEN comments=False
+        SHOULD only fetch the answers"""
+        with make_client(server) as client:
+            counts = import_answers(store, QUESTIONS, client=client, comments=False)
+        assert counts == (len(ANSWERS), 0)
+        assert server.requests["answers/{ids}/comments"] == 0
+
+
+def test_outdated_answer_counts(store):
+    """GIVEN questions with unchanged, changed and unknown answer counts
+    SHOULD only keep the changed and unknown ones"""
+    store.replace_answers([1, 2], [], {1: 0, 2: 0})
+    questions = [
+        {"question_id": 1, "answer_count": 0},
+        {"question_id": 2, "answer_count": 1},
+        {"question_id": 3},
+    ]
+    assert outdated_answer_counts(store, questions) == {2: 1, 3: None}
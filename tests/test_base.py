@@ -1,10 +1,12 @@
 """Tests for the base.py module"""
 
+import json
+
 import pytest
 
 import stack_overflow_importer.base
 from stack_overflow_importer.auth import retrieve_key, retrieve_token
-from stack_overflow_importer.base import query_method
+from stack_overflow_importer.base import ApiClient, query_method
 
 
 @pytest.mark.live
@@ -23,6 +25,14 @@ def test_query_method_live_call():
 class MockResponse:
     """A mock response to be returned by requests.get."""
 
+    status_code = 200
+    ok = True
+
+    @property
+    def content(self) -> bytes:
+        """Mock raw body, as sent by the API."""
+        return json.dumps(self.json()).encode("utf-8")
+
     @staticmethod
     def json():
         """Mock JSON response for the info method"""
@@ -63,3 +73,73 @@ def test_query_method(monkeypatch):
     items = response.get("items")
     assert items is not None
     assert "api_revision" in items[0].keys()
+
+
+class TestApiClient:
+    """Tests for base.ApiClient."""
+
+    def test_pool_configuration(self):
+        """It mounts a pooled adapter sized as requested."""
+        client = ApiClient(pool_connections=2, pool_maxsize=16)
+        adapter = client.session.get_adapter("https://api.stackexchange.com")
+        # pylint: disable=protected-access
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == 16
+        client.close()
+
+    def test_own_retry_policy(self):
+        """Each client has its own retry policy, and so its own retry budget."""
+        with ApiClient() as client, ApiClient() as other:
+            assert client.retry is not other.retry
+
+    def test_default_headers(self):
+        """It negotiates gzip and keep-alive by default."""
+        with ApiClient() as client:
+            assert "gzip" in client.session.headers["Accept-Encoding"]
+            assert client.session.headers["Connection"] == "keep-alive"
+
+    def test_disabled_headers(self):
+        """It can opt out of gzip and keep-alive."""
+        with ApiClient(keep_alive=False, gzip=False) as client:
+            assert client.session.headers["Accept-Encoding"] == "identity"
+            assert client.session.headers["Connection"] == "close"
+
+    def test_context_manager_closes_session(self, monkeypatch):
+        """It closes the pooled session when leaving the context."""
+        closed = []
+        with ApiClient() as client:
+            monkeypatch.setattr(client.session, "close", lambda: closed.append(True))
+        assert closed == [True]
+
+    def test_url(self):
+        """It builds the method URL from the base site and API version."""
+        client = ApiClient(base_site="http://localhost:8080")
+        assert client.url("questions") == "http://localhost:8080/2.3/questions"
+        client.close()
+
+    def test_query_method_uses_client_session(self, monkeypatch):
+        """It sends the call through the client's session, not requests.get."""
+        calls = []
+
+        # pylint: disable=unused-argument
+        def mock_session_get(url, params=None, headers=None, timeout=None):
+            calls.append((url, params))
+            return MockResponse()
+
+        def fail_get(*args, **kwargs):
+            raise AssertionError("requests.get should not be called")
+
+        monkeypatch.setattr(stack_overflow_importer.base.requests, "get", fail_get)
+        with ApiClient() as client:
+            monkeypatch.setattr(client.session, "get", mock_session_get)
+            response = query_method(
+                "info", "key", None, {"site": "stackoverflow"}, client
+            )
+        assert response is not None
+        assert "items" in response.keys()
+        assert calls == [
+            (
+                "https://api.stackexchange.com/2.3/info",
+                {"site": "stackoverflow", "key": "key"},
+            )
+        ]
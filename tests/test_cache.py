@@ -0,0 +1,196 @@
+"""Tests for the stack_overflow_importer/cache.py module."""
+
+import json
+
+import pytest
+
+from stack_overflow_importer.base import ApiClient, query_method
+from stack_overflow_importer.cache import CacheMissError, ResponseCache, cache_key
+from stack_overflow_importer.scheduler import RequestScheduler
+
+
+class FakeClock:
+    """A manual wall clock."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    """A minimal stand-in for requests.Response."""
+
+    def __init__(self, payload=None, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self.content = json.dumps(payload).encode("utf-8") if payload else b""
+
+    def json(self):
+        """Returns the payload."""
+        return self.payload
+
+
+@pytest.fixture()
+def clock():
+    """Fixture to return a fresh FakeClock for each test."""
+    return FakeClock()
+
+
+@pytest.fixture()
+def cache(tmp_path, clock):
+    """Fixture to return a fresh cache for each test."""
+    response_cache = ResponseCache(
+        str(tmp_path / "cache.db"), default_ttl=60, max_entries=3, clock=clock
+    )
+    yield response_cache
+    response_cache.close()
+
+
+class TestCacheKey:
+    """Tests for cache.cache_key()."""
+
+    def test_ignores_credentials(self):
+        """The credentials are not part of the key."""
+        assert cache_key("questions", {"site": "so", "key": "a"}) == cache_key(
+            "questions", {"site": "so", "access_token": "b"}
+        )
+
+    def test_ignores_order_and_types(self):
+        """The parameters are normalized."""
+        assert cache_key("questions", {"page": 1, "site": "so"}) == cache_key(
+            "questions", {"site": "so", "page": "1"}
+        )
+
+    def test_different_calls(self):
+        """Different methods or parameters have different keys."""
+        assert cache_key("questions", {"page": 1}) != cache_key("answers", {"page": 1})
+        assert cache_key("questions", {"page": 1}) != cache_key(
+            "questions", {"page": 2}
+        )
+
+
+class TestResponseCache:
+    """Tests for cache.ResponseCache."""
+
+    def test_miss(self, cache):
+        """It returns None for calls never cached."""
+        assert cache.get("questions", {"page": 1}) is None
+
+    def test_ttl(self, cache, clock):
+        """Entries are fresh for the TTL, then stale."""
+        cache.put("questions", {"page": 1}, b'{"items": []}', etag='"v1"')
+        entry = cache.get("questions", {"page": 1})
+        assert entry.fresh
+        assert entry.body == b'{"items": []}'
+        clock.now += 61
+        entry = cache.get("questions", {"page": 1})
+        assert not entry.fresh
+        assert entry.conditional_headers() == {"If-None-Match": '"v1"'}
+        cache.refresh("questions", {"page": 1})
+        assert cache.get("questions", {"page": 1}).fresh
+
+    def test_ttl_per_method(self, tmp_path, clock):
+        """Methods can have their own TTL, or not be cached at all."""
+        cache = ResponseCache(
+            str(tmp_path / "cache.db"),
+            default_ttl=60,
+            ttls={"questions/{ids}/answers": 600, "info": 0},
+            clock=clock,
+        )
+        cache.put("questions/1;2/answers", {}, b"{}")
+        cache.put("info", {}, b"{}")
+        clock.now += 100
+        assert cache.get("questions/1;2/answers", {}).fresh
+        assert cache.get("info", {}) is None
+        cache.close()
+
+    def test_lru_eviction(self, cache, clock):
+        """It evicts the least recently used entries beyond max_entries."""
+        for page in range(3):
+            clock.now += 1
+            cache.put("questions", {"page": page}, b"{}")
+        clock.now += 1
+        cache.get("questions", {"page": 0})
+        clock.now += 1
+        cache.put("questions", {"page": 3}, b"{}")
+        assert len(cache) == 3
+        assert cache.get("questions", {"page": 1}) is None
+        assert cache.get("questions", {"page": 0}) is not None
+
+    def test_clear(self, cache):
+        """It removes everything."""
+        cache.put("questions", {}, b"{}")
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestQueryMethodWithCache:
+    """Tests for base.query_method() with a cached client."""
+
+    @pytest.fixture()
+    def calls(self, monkeypatch, cache):
+        """Patches the client session, returning the list of calls and the queue of
+        responses to send."""
+        calls = []
+        responses = []
+        client = ApiClient(
+            scheduler=RequestScheduler(rate=1000, burst=100), cache=cache
+        )
+
+        # pylint: disable=unused-argument
+        def mock_get(url, params=None, headers=None, timeout=None):
+            calls.append(headers)
+            return responses.pop(0)
+
+        monkeypatch.setattr(client.session, "get", mock_get)
+        yield client, calls, responses
+        client.close()
+
+    def test_serves_fresh_responses(self, calls):
+        """A repeated call is served from the cache, whatever the credentials."""
+        client, requests_sent, responses = calls
+        responses.append(FakeResponse({"items": [1]}))
+        first = query_method("questions", "key1", None, {"site": "so"}, client)
+        second = query_method("questions", "key2", "token", {"site": "so"}, client)
+        assert first == second == {"items": [1]}
+        assert len(requests_sent) == 1
+
+    def test_revalidates_stale_responses(self, calls, clock):
+        """A stale entry is revalidated, and reused on 304 Not Modified."""
+        client, requests_sent, responses = calls
+        responses.append(FakeResponse({"items": [1]}, headers={"ETag": '"v1"'}))
+        query_method("questions", None, None, {"site": "so"}, client)
+        clock.now += 120
+        responses.append(FakeResponse(status_code=304))
+        assert query_method("questions", None, None, {"site": "so"}, client) == {
+            "items": [1]
+        }
+        assert requests_sent[1] == {"If-None-Match": '"v1"'}
+        assert client.cache.get("questions", {"site": "so"}).fresh
+
+    def test_doesnt_cache_errors(self, calls):
+        """API errors are not cached."""
+        client, requests_sent, responses = calls
+        responses.append(FakeResponse({"error_id": 502}, status_code=400))
+        responses.append(FakeResponse({"items": []}))
+        query_method("questions", None, None, {"site": "so"}, client)
+        query_method("questions", None, None, {"site": "so"}, client)
+        assert len(requests_sent) == 2
+
+    def test_offline(self, calls, clock):
+        """Offline, stale entries are served and misses raise."""
+        client, requests_sent, responses = calls
+        responses.append(FakeResponse({"items": [1]}))
+        query_method("questions", None, None, {"site": "so"}, client)
+        client.cache.offline = True
+        clock.now += 10_000
+        assert query_method("questions", None, None, {"site": "so"}, client) == {
+            "items": [1]
+        }
+        with pytest.raises(CacheMissError):
+            query_method("questions", None, None, {"site": "other"}, client)
+        assert len(requests_sent) == 1
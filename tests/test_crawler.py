@@ -0,0 +1,174 @@
+"""Tests for the stack_overflow_importer/crawler.py module."""
+
+import io
+import threading
+
+import pytest
+
+import stack_overflow_importer.crawler
+from stack_overflow_importer.crawler import Shard, crawl_questions, fetch_shard
+from stack_overflow_importer.progress import ProgressReporter
+
+
+class FakeQuestionsApi:
+    """Serves `get_questions` calls from an in-memory list of questions, one per
+    `step` seconds, honouring fromdate/todate and paging."""
+
+    def __init__(self, count, start=1_000_000, step=10):
+        self.questions = [
+            {"question_id": i, "creation_date": start + i * step} for i in range(count)
+        ]
+        self.calls = []
+        self.lock = threading.Lock()
+
+    # pylint: disable=unused-argument, too-many-arguments, redefined-builtin
+    def __call__(
+        self,
+        key=None,
+        access_token=None,
+        filter=None,
+        page=1,
+        pagesize=30,
+        fromdate=None,
+        todate=None,
+        order=None,
+        min=None,
+        max=None,
+        sort=None,
+        tagged=None,
+        client=None,
+        site=None,
+    ):
+        with self.lock:
+            self.calls.append((fromdate, todate, page))
+        matching = [
+            q for q in self.questions if fromdate <= q["creation_date"] <= todate
+        ]
+        start = (page - 1) * pagesize
+        return {
+            "items": matching[start : start + pagesize],
+            "has_more": start + pagesize < len(matching),
+            "quota_remaining": 9999,
+        }
+
+
+class TestShard:
+    """Tests for crawler.Shard."""
+
+    @pytest.mark.parametrize("parts", [1, 2, 3, 7])
+    def test_split_covers_range(self, parts):
+        """It splits into contiguous, non overlapping shards covering the range."""
+        shard = Shard(100, 1099)
+        shards = shard.split(parts)
+        assert len(shards) == parts
+        assert shards[0].fromdate == 100
+        assert shards[-1].todate == 1099
+        for left, right in zip(shards, shards[1:]):
+            assert right.fromdate == left.todate + 1
+
+    def test_split_tiny_range(self):
+        """It never produces empty shards."""
+        assert Shard(5, 6).split(10) == [Shard(5, 5), Shard(6, 6)]
+        assert Shard(5, 5).split(3) == [Shard(5, 5)]
+
+
+class TestFetchShard:
+    """Tests for crawler.fetch_shard()."""
+
+    def test_small_shard(self, monkeypatch):
+        """It pages through a shard that fits within max_pages."""
+        api = FakeQuestionsApi(250)
+        monkeypatch.setattr(stack_overflow_importer.crawler, "get_questions", api)
+        result = fetch_shard(Shard(0, 10_000_000), max_pages=5)
+        assert len(result.items) == 250
+        assert result.pages == 3
+        assert not result.remainder
+
+    def test_large_shard_is_split(self, monkeypatch):
+        """It splits the rest of a shard that exceeds max_pages."""
+        api = FakeQuestionsApi(1000)
+        monkeypatch.setattr(stack_overflow_importer.crawler, "get_questions", api)
+        shard = Shard(1_000_000, 1_010_000)
+        result = fetch_shard(shard, max_pages=2)
+        # The question of the boundary second is left to the rest of the shard
+        assert len(result.items) == 199
+        assert len(result.remainder) == 2
+        assert result.remainder[0].fromdate == 1_000_000 + 199 * 10
+        assert result.items[-1]["creation_date"] < result.remainder[0].fromdate
+        assert result.remainder[-1].todate == shard.todate
+
+    def test_error(self, monkeypatch):
+        """It raises when the API returns an error."""
+        monkeypatch.setattr(
+            stack_overflow_importer.crawler,
+            "get_questions",
+            lambda *a, **k: {"error_id": 400, "error_message": "bad parameter"},
+        )
+        with pytest.raises(RuntimeError, match="bad parameter"):
+            fetch_shard(Shard(0, 10))
+
+
+class TestCrawlQuestions:
+    """Tests for crawler.crawl_questions()."""
+
+    @pytest.mark.parametrize("max_workers, max_pages", [(1, 100), (4, 1), (8, 2)])
+    def test_fetches_everything_once(self, monkeypatch, max_workers, max_pages):
+        """It yields every question in the window exactly once."""
+        api = FakeQuestionsApi(2000)
+        monkeypatch.setattr(stack_overflow_importer.crawler, "get_questions", api)
+        items = list(
+            crawl_questions(
+                1_000_000,
+                1_000_000 + 2000 * 10,
+                max_workers=max_workers,
+                max_pages=max_pages,
+            )
+        )
+        ids = [item["question_id"] for item in items]
+        assert len(ids) == len(set(ids))
+        assert set(ids) == set(range(2000))
+
+    def test_several_questions_per_second(self, monkeypatch):
+        """It yields every question once when the shards are split within a second
+        holding several questions."""
+        api = FakeQuestionsApi(0)
+        api.questions = [
+            {"question_id": i, "creation_date": 1_000_000 + i // 7} for i in range(2000)
+        ]
+        monkeypatch.setattr(stack_overflow_importer.crawler, "get_questions", api)
+        items = list(
+            crawl_questions(
+                1_000_000, 1_000_300, max_workers=3, max_pages=1, min_span=1
+            )
+        )
+        ids = [item["question_id"] for item in items]
+        assert sorted(ids) == list(range(2000))
+
+    def test_splits_busy_shards(self, monkeypatch):
+        """It submits more shards than initially planned when shards are busy."""
+        api = FakeQuestionsApi(2000)
+        monkeypatch.setattr(stack_overflow_importer.crawler, "get_questions", api)
+        list(crawl_questions(1_000_000, 1_020_000, max_workers=2, max_pages=1))
+        windows = {(fromdate, todate) for fromdate, todate, _ in api.calls}
+        assert len(windows) > 2
+
+    def test_reports_covered_window(self, monkeypatch):
+        """It reports the seconds covered by the shards, split or not, up to the
+        whole window."""
+        api = FakeQuestionsApi(2000)
+        monkeypatch.setattr(stack_overflow_importer.crawler, "get_questions", api)
+        progress = ProgressReporter(io.StringIO(), interactive=False)
+        covered = []
+        for _ in crawl_questions(
+            1_000_000, 1_020_000, max_workers=2, max_pages=1, progress=progress
+        ):
+            covered.append(progress.cursor)
+        assert progress.target == 20_001
+        assert covered == sorted(covered) and 0 < covered[0] < 20_001
+        assert progress.cursor == 20_001
+        assert progress.done == 1
+
+    def test_invalid_window(self):
+        """It rejects a window ending before it starts."""
+        with pytest.raises(ValueError, match="is before the 'fromdate'"):
+            list(crawl_questions(2000, 1000))
@@ -0,0 +1,43 @@
+"""Tests for the stack_overflow_importer/decoding.py module."""
+
+import json
+import pathlib
+
+import pytest
+
+from stack_overflow_importer.decoding import DECODERS, decode_json, get_decoder
+
+PAGE = (pathlib.Path(__file__).parent / "data" / "questions_page.json").read_bytes()
+
+
+@pytest.mark.parametrize("name", sorted(DECODERS))
+def test_decoders_agree(name):
+    """Every decoder produces the same result as the standard library."""
+    assert DECODERS[name](PAGE) == json.loads(PAGE.decode("utf-8"))
+
+
+@pytest.mark.parametrize("name", sorted(DECODERS))
+def test_decoders_raise_value_error(name):
+    """Every decoder raises a ValueError on invalid JSON."""
+    with pytest.raises(ValueError):
+        DECODERS[name](b"<html>502 Bad Gateway</html>")
+
+
+def test_default_decoder():
+    """The default decoder is the fastest one available."""
+    assert get_decoder() is decode_json
+    if "orjson" in DECODERS:
+        assert decode_json is DECODERS["orjson"]
+    else:
+        assert decode_json is json.loads
+
+
+def test_named_decoder():
+    """It returns the requested decoder."""
+    assert get_decoder("json") is json.loads
+
+
+def test_unknown_decoder():
+    """It rejects unknown decoders."""
+    with pytest.raises(ValueError, match="The decoder 'nope' is not available"):
+        get_decoder("nope")
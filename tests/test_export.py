@@ -0,0 +1,130 @@
+"""Tests for the stack_overflow_importer/export.py module."""
+
+from datetime import datetime, timezone
+import io
+import json
+
+import pytest
+
+from stack_overflow_importer.export import write_ndjson, write_parquet
+
+
+class CountingStream(io.StringIO):
+    """A text stream counting its flushes."""
+
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+
+def make_pages(count, per_page):
+    """Builds `count` pages of `per_page` question items."""
+    return [
+        {
+            "items": [
+                {"question_id": page * per_page + i, "title": "Été", "tags": ["a"]}
+                for i in range(per_page)
+            ]
+        }
+        for page in range(count)
+    ]
+
+
+class TestWriteNdjson:
+    """Tests for export.write_ndjson()."""
+
+    def test_one_compact_item_per_line(self):
+        """It writes each item as a compact JSON document on its own line."""
+        stream = io.StringIO()
+        assert write_ndjson(make_pages(2, 3), stream) == 6
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 6
+        assert lines[0] == '{"question_id":0,"title":"Été","tags":["a"]}'
+        assert [json.loads(line)["question_id"] for line in lines] == list(range(6))
+
+    def test_streams_pages(self):
+        """It consumes the pages one at a time, writing each as it arrives."""
+        stream = io.StringIO()
+
+        def pages():
+            for page in make_pages(3, 2):
+                yield page
+                assert stream.getvalue().count("\n") % 2 == 0
+
+        assert write_ndjson(pages(), stream) == 6
+
+    def test_periodic_flushes(self):
+        """It flushes every `flush_every` pages, and at the end."""
+        stream = CountingStream()
+        write_ndjson(make_pages(4, 1), stream, flush_every=2)
+        assert stream.flushes == 3
+
+    def test_empty(self):
+        """It writes nothing for empty pages."""
+        stream = io.StringIO()
+        assert write_ndjson([{"items": []}, {}], stream) == 0
+        assert stream.getvalue() == ""
+
+
+@pytest.fixture()
+def parquet():
+    """Fixture returning pyarrow.parquet, skipping the test if it isn't installed."""
+    return pytest.importorskip("pyarrow.parquet")
+
+
+class TestWriteParquet:
+    """Tests for export.write_parquet() and export.ParquetQuestionWriter."""
+
+    def test_typed_columns(self, tmp_path, parquet):
+        """It writes tags as a list column, and dates as UTC timestamps."""
+        pyarrow = pytest.importorskip("pyarrow")
+        path = str(tmp_path / "questions.parquet")
+        pages = [
+            {
+                "items": [
+                    {
+                        "question_id": 1,
+                        "title": "foo",
+                        "tags": ["python", "pandas"],
+                        "is_answered": True,
+                        "score": 3,
+                        "creation_date": 1640995200,
+                    },
+                    {"question_id": 2, "tags": []},
+                ]
+            }
+        ]
+        assert write_parquet(pages, path) == 2
+        table = parquet.read_table(path)
+        tags_type = table.schema.field("tags").type
+        assert pyarrow.types.is_list(tags_type)
+        assert pyarrow.types.is_string(tags_type.value_type)
+        date_type = table.schema.field("creation_date").type
+        assert pyarrow.types.is_timestamp(date_type)
+        assert date_type.tz == "UTC"
+        rows = table.to_pylist()
+        assert rows[0]["tags"] == ["python", "pandas"]
+        assert rows[0]["creation_date"] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert rows[0]["is_answered"] is True
+        assert rows[1]["title"] is None
+
+    def test_row_groups(self, tmp_path, parquet):
+        """It buffers pages into row groups of row_group_size rows."""
+        path = str(tmp_path / "questions.parquet")
+        assert write_parquet(make_pages(5, 10), path, row_group_size=20) == 50
+        metadata = parquet.ParquetFile(path).metadata
+        assert metadata.num_rows == 50
+        assert [
+            metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)
+        ] == [20, 20, 10]
+
+    def test_predicate_pushdown(self, tmp_path, parquet):
+        """The output can be filtered on read."""
+        path = str(tmp_path / "questions.parquet")
+        write_parquet(make_pages(3, 10), path, row_group_size=10)
+        table = parquet.read_table(path, filters=[("question_id", ">=", 25)])
+        assert table.column("question_id").to_pylist() == list(range(25, 30))
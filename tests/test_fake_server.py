@@ -0,0 +1,203 @@
+"""Tests for the stack_overflow_importer/fake_server.py module."""
+
+import json
+import pathlib
+import time
+
+import pytest
+
+from stack_overflow_importer.base import query_method
+from stack_overflow_importer.crawler import crawl_questions
+from stack_overflow_importer.fake_server import FakeStackExchangeServer
+from stack_overflow_importer.filters import create_filter, get_filter_id
+from stack_overflow_importer.questions import get_questions, iter_questions
+
+RECORDED_PAGE = pathlib.Path(__file__).parent / "data" / "questions_page.json"
+
+
+def make_questions(count, start=1_000_000, step=10):
+    """Builds `count` questions, created one every `step` seconds."""
+    return [
+        {
+            "question_id": i,
+            "creation_date": start + i * step,
+            "last_activity_date": start + i * step + 5,
+            "score": i % 7,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+class TestQuestions:
+    """Tests for the `questions` methods of FakeStackExchangeServer."""
+
+    def test_replays_recordings(self, make_client):
+        """GIVEN a recorded page
+        SHOULD serve all its items, over as many pages as needed"""
+        expected = json.loads(RECORDED_PAGE.read_bytes())["items"]
+        with FakeStackExchangeServer.from_recordings([RECORDED_PAGE]) as server:
+            with make_client(server) as client:
+                items = list(iter_questions(client=client, pagesize=30))
+        assert sorted(item["question_id"] for item in items) == sorted(
+            item["question_id"] for item in expected
+        )
+        assert server.requests["questions"] == 4
+
+    def test_has_more(self, make_client):
+        """GIVEN more items than a page holds
+        SHOULD flag every page but the last with has_more"""
+        with FakeStackExchangeServer(make_questions(25)) as server:
+            with make_client(server) as client:
+                first = get_questions(page=1, pagesize=20, client=client)
+                last = get_questions(page=2, pagesize=20, client=client)
+        assert (len(first["items"]), first["has_more"]) == (20, True)
+        assert (len(last["items"]), last["has_more"]) == (5, False)
+
+    def test_date_bounds_and_order(self, make_client):
+        """GIVEN fromdate, todate and an ascending creation sort
+        SHOULD only serve the questions created in the range, oldest first"""
+        with FakeStackExchangeServer(make_questions(50)) as server:
+            with make_client(server) as client:
+                response = get_questions(
+                    fromdate=1_000_100,
+                    todate=1_000_200,
+                    sort="creation",
+                    order="asc",
+                    client=client,
+                )
+        assert [item["question_id"] for item in response["items"]] == list(
+            range(10, 21)
+        )
+
+    def test_min_bounds_sort_field(self, make_client):
+        """GIVEN min with the activity sort
+        SHOULD bound the last activity date"""
+        with FakeStackExchangeServer(make_questions(10)) as server:
+            with make_client(server) as client:
+                response = get_questions(min=1_000_085, sort="activity", client=client)
+        assert [item["question_id"] for item in response["items"]] == [10, 9, 8]
+
+    def test_questions_by_ids(self, make_client):
+        """GIVEN a list of IDs
+        SHOULD serve the matching questions only"""
+        with FakeStackExchangeServer(make_questions(10)) as server:
+            with make_client(server) as client:
+                response = query_method(
+                    "questions/3;5;42", None, None, {"site": "so"}, client
+                )
+        assert [item["question_id"] for item in response["items"]] == [3, 5]
+
+    def test_crawl(self, make_client):
+        """GIVEN a concurrent crawl
+        SHOULD retrieve every question exactly once"""
+        with FakeStackExchangeServer(make_questions(300)) as server:
+            with make_client(server) as client:
+                items = list(
+                    crawl_questions(1_000_000, 1_003_010, client=client, shards=4)
+                )
+        assert sorted(item["question_id"] for item in items) == list(range(1, 301))
+
+
+class TestFilters:
+    """Tests for the `filters/create` method of FakeStackExchangeServer."""
+
+    def test_recorded_filter(self, make_client):
+        """GIVEN a recorded filter
+        SHOULD replay it"""
+        recorded = {"items": [{"filter": "!recorded", "filter_type": "safe"}]}
+        with FakeStackExchangeServer(filters={"question.title": recorded}) as server:
+            with make_client(server) as client:
+                response = create_filter(
+                    None, None, "none", "question.title", client=client
+                )
+        assert get_filter_id(response) == "!recorded"
+
+    def test_made_up_filter(self, make_client):
+        """GIVEN an unknown filter
+        SHOULD make up a stable ID"""
+        with FakeStackExchangeServer() as server:
+            with make_client(server) as client:
+                first = create_filter(
+                    None, None, "none", "question.body", client=client
+                )
+                second = create_filter(
+                    None, None, "none", "question.body", client=client
+                )
+        assert get_filter_id(first).startswith("!fake")
+        assert get_filter_id(first) == get_filter_id(second)
+
+
+class TestThrottling:
+    """Tests for the quota, backoff and throttle modelling of
+    FakeStackExchangeServer."""
+
+    def test_quota_counters(self, make_client):
+        """GIVEN a few calls
+        SHOULD count them down from quota_max"""
+        with FakeStackExchangeServer(make_questions(5), quota_max=50) as server:
+            with make_client(server) as client:
+                get_questions(client=client)
+                response = get_questions(client=client)
+        assert (response["quota_max"], response["quota_remaining"]) == (50, 48)
+        assert client.scheduler.quota_remaining == 48
+
+    def test_quota_exhausted(self, make_client):
+        """GIVEN a spent quota
+        SHOULD answer with a throttle violation"""
+        with FakeStackExchangeServer(make_questions(5), quota_max=1) as server:
+            with make_client(server) as client:
+                get_questions(client=client)
+                response = client.get("questions", {"site": "so"})
+        assert response.status_code == 502
+        assert response.json()["error_name"] == "throttle_violation"
+        assert server.throttled == 1
+
+    def test_backoff(self, make_client):
+        """GIVEN a backoff every other call
+        SHOULD send it, and throttle calls ignoring it"""
+        with FakeStackExchangeServer(backoff=5, backoff_every=2) as server:
+            with make_client(server) as client:
+                first = client.get("questions", {"site": "so"}).json()
+                second = client.get("questions", {"site": "so"}).json()
+                third = client.get("questions", {"site": "so"}).json()
+        assert "backoff" not in first
+        assert second["backoff"] == 5
+        assert third["error_id"] == 502
+
+    def test_max_rate(self, make_client):
+        """GIVEN more calls in a second than allowed
+        SHOULD throttle the excess ones"""
+        with FakeStackExchangeServer(max_rate=3, throttle_status=400) as server:
+            with make_client(server) as client:
+                statuses = [
+                    client.get("questions", {"site": "so"}).status_code
+                    for _ in range(5)
+                ]
+        assert statuses == [200, 200, 200, 400, 400]
+
+    def test_latency(self, make_client):
+        """GIVEN some latency
+        SHOULD delay the responses"""
+        with FakeStackExchangeServer(latency=0.05) as server:
+            with make_client(server) as client:
+                start = time.perf_counter()
+                client.get("questions", {"site": "so"})
+        assert time.perf_counter() - start >= 0.05
+
+    def test_gzip(self, make_client):
+        """GIVEN a client accepting gzip
+        SHOULD compress the responses"""
+        with FakeStackExchangeServer(make_questions(5)) as server:
+            with make_client(server) as client:
+                response = client.get("questions", {"site": "so"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert len(response.json()["items"]) == 5
+
+    @pytest.mark.parametrize("path", ["/2.3/answers", "/2.2/questions", "/"])
+    def test_unknown_method(self, path):
+        """GIVEN an unknown method
+        SHOULD answer 404"""
+        server = FakeStackExchangeServer()
+        status, body = server.handle(path, {})
+        server.stop()
+        assert (status, body["error_name"]) == (404, "no_method")
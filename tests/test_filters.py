@@ -0,0 +1,159 @@
+"""Tests for the stack_overflow_importer/filters.py module."""
+
+import json
+import threading
+
+import pytest
+
+import stack_overflow_importer.filters
+from stack_overflow_importer.filters import (
+    DEFAULT_FILTER_QUESTION_FIELDS,
+    INCLUDE_DEFAULT,
+    INCLUDE_QUESTION,
+    FilterRegistry,
+    filter_spec_hash,
+    get_filter_id,
+    included_fields,
+    question_filter_fields,
+)
+
+
+def test_get_filter_id():
+    """It extracts the filter ID from a filters/create response."""
+    assert get_filter_id({"items": [{"filter": "!abc"}]}) == "!abc"
+    assert get_filter_id(None) is None
+
+
+def test_included_fields():
+    """It keeps the fields of one kind of items, without their prefix."""
+    assert included_fields("question.title;.items;answer.body;question.tags") == {
+        "title",
+        "tags",
+    }
+    assert included_fields(".items;answer.body;", "answer") == {"body"}
+
+
+class TestQuestionFilterFields:
+    """Tests for filters.question_filter_fields()."""
+
+    def test_default_filter(self):
+        """The API default filter has known fields."""
+        assert question_filter_fields(None) == DEFAULT_FILTER_QUESTION_FIELDS
+
+    def test_question_filter(self, tmp_path, create_calls):
+        """The cached question filter includes the INCLUDE_QUESTION fields."""
+        registry = FilterRegistry(str(tmp_path / "filters.json"))
+        filter_id = registry.get_or_create(
+            "key", "token", "default", INCLUDE_DEFAULT + INCLUDE_QUESTION
+        )
+        fields = question_filter_fields(filter_id, registry)
+        assert {"accepted_answer_id", "favorite_count", "up_vote_count"} <= fields
+
+    def test_unknown_filter(self, tmp_path):
+        """The fields of other filters are unknown."""
+        registry = FilterRegistry(str(tmp_path / "filters.json"))
+        assert question_filter_fields("!custom", registry) is None
+
+
+class TestFilterSpecHash:
+    """Tests for filters.filter_spec_hash()."""
+
+    def test_field_order_doesnt_matter(self):
+        """Equivalent specifications share the same hash."""
+        assert filter_spec_hash("default", "a;b;", "c") == filter_spec_hash(
+            "default", "b;a;a", "c;"
+        )
+
+    @pytest.mark.parametrize(
+        "other",
+        [
+            ("none", "a;b", "c", False),
+            ("default", "a", "c", False),
+            ("default", "a;b", None, False),
+            ("default", "a;b", "c", True),
+        ],
+    )
+    def test_different_specs(self, other):
+        """Different specifications have different hashes."""
+        assert filter_spec_hash("default", "a;b", "c", False) != filter_spec_hash(
+            *other
+        )
+
+
+@pytest.fixture()
+def create_calls(monkeypatch):
+    """Fixture mocking filters.create_filter, returning the list of its calls."""
+    calls = []
+
+    # pylint: disable=unused-argument
+    def mock_create_filter(key, access_token, base, include, exclude, unsafe, client):
+        calls.append((base, include, exclude, unsafe))
+        return {"items": [{"filter": f"!filter{len(calls)}"}]}
+
+    monkeypatch.setattr(
+        stack_overflow_importer.filters, "create_filter", mock_create_filter
+    )
+    return calls
+
+
+class TestFilterRegistry:
+    """Tests for filters.FilterRegistry."""
+
+    def test_creates_once(self, tmp_path, create_calls):
+        """It only calls filters/create the first time a spec is requested."""
+        registry = FilterRegistry(str(tmp_path / "filters.json"))
+        assert registry.get("default", "a;b") is None
+        assert registry.get_or_create("key", "token", "default", "a;b") == "!filter1"
+        assert registry.get_or_create("key", "token", "default", "b;a") == "!filter1"
+        assert registry.get("default", "a;b") == "!filter1"
+        assert len(create_calls) == 1
+
+    def test_shared_across_instances(self, tmp_path, create_calls):
+        """The cache persists on disk, for other runs and workers."""
+        path = str(tmp_path / "filters.json")
+        FilterRegistry(path).get_or_create("key", "token", "default", "a")
+        assert FilterRegistry(path).get_or_create("key", "token", "default", "a") == (
+            "!filter1"
+        )
+        FilterRegistry(path).get_or_create("key", "token", "default", "b")
+        assert len(create_calls) == 2
+        with open(path, encoding="utf-8") as cache_file:
+            assert len(json.load(cache_file)) == 2
+
+    def test_concurrent_workers(self, tmp_path, create_calls):
+        """Threads sharing a registry create the filter only once."""
+        registry = FilterRegistry(str(tmp_path / "filters.json"))
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    registry.get_or_create("key", "token", "default", "a")
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == ["!filter1"] * 8
+        assert len(create_calls) == 1
+
+    def test_creation_failure(self, tmp_path, monkeypatch, caplog):
+        """It returns None, and caches nothing, if the filter can't be created."""
+        monkeypatch.setattr(
+            stack_overflow_importer.filters,
+            "create_filter",
+            lambda *args: {"error_id": 400, "error_message": "bad field"},
+        )
+        registry = FilterRegistry(str(tmp_path / "filters.json"))
+        assert registry.get_or_create("key", "token", "default", "nope") is None
+        assert "bad field" in caplog.text
+        assert registry.get("default", "nope") is None
+
+    def test_unreadable_cache(self, tmp_path, create_calls):
+        """It ignores a corrupted cache file."""
+        path = tmp_path / "filters.json"
+        path.write_text("not json")
+        registry = FilterRegistry(str(path))
+        assert registry.get_or_create("key", "token", "default", "a") == "!filter1"
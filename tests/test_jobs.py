@@ -0,0 +1,174 @@
+"""Tests for the stack_overflow_importer/jobs.py module."""
+
+import logging
+
+import pytest
+
+from stack_overflow_importer.fake_server import FakeStackExchangeServer
+from stack_overflow_importer.jobs import cursor_target, import_job_id, run_import_job
+from stack_overflow_importer.progress import ProgressReporter
+from stack_overflow_importer.questions import QuestionQuery
+from stack_overflow_importer.retry import RetryPolicy
+from stack_overflow_importer.scheduler import QuotaExhaustedError
+
+QUESTIONS = [
+    {"question_id": i, "creation_date": 1_000_000 + i, "last_activity_date": i}
+    for i in range(1, 26)
+]
+
+QUERY = QuestionQuery.parse(pagesize=10, sort="creation", order="asc")
+
+
+@pytest.fixture()
+def server():
+    """Fixture to return a running fake API serving `QUESTIONS`."""
+    with FakeStackExchangeServer(QUESTIONS) as fake_server:
+        yield fake_server
+
+
+def test_import_job_id():
+    """GIVEN the same query on different pages
+    SHOULD identify the same job"""
+    assert import_job_id(QUERY) == import_job_id(QUERY.with_page(3))
+    assert import_job_id(QUERY) != import_job_id(QuestionQuery.parse(pagesize=10))
+
+
+def test_cursor_target():
+    """GIVEN queries bound in the direction of their order, or not
+    SHOULD estimate the cursor value they stop at"""
+    assert cursor_target(QuestionQuery.parse(sort="votes", max=50)) is None
+    assert cursor_target(QuestionQuery.parse(sort="votes", min=5)) == 5
+    assert cursor_target(QuestionQuery.parse(sort="creation", fromdate=10)) == 10
+    assert cursor_target(QUERY.with_page(1)) > 1_000_000
+    assert (
+        cursor_target(QuestionQuery.parse(sort="creation", order="asc", todate=20))
+        == 20
+    )
+
+
+class TestRunImportJob:
+    """Tests for jobs.run_import_job()."""
+
+    def test_complete_run(self, store, server, make_client):
+        """GIVEN a fresh job
+        SHOULD import every page, and checkpoint the job as done"""
+        with make_client(server) as client:
+            checkpoint = run_import_job(store, QUERY, client=client)
+        assert store.count() == 25
+        assert (checkpoint.page, checkpoint.items, checkpoint.quota_used) == (3, 25, 3)
+        assert checkpoint.cursor == 1_000_025
+        assert checkpoint.done
+        assert store.get_checkpoint(checkpoint.job_id) == checkpoint
+
+    def test_resume_after_failure(self, store, server, make_client):
+        """GIVEN a job interrupted by an exception
+        SHOULD resume after the last committed page, without fetching it again"""
+        server.quota_remaining = 2
+        with make_client(server) as client:
+            with pytest.raises(QuotaExhaustedError):
+                run_import_job(store, QUERY, client=client)
+        checkpoint = store.get_checkpoint(import_job_id(QUERY))
+        assert (checkpoint.page, checkpoint.done, store.count()) == (2, False, 20)
+
+        server.quota_remaining = 100
+        with make_client(server) as client:
+            checkpoint = run_import_job(store, QUERY, client=client, resume=True)
+        assert (checkpoint.page, checkpoint.items, checkpoint.done) == (3, 25, True)
+        assert checkpoint.quota_used == 3
+        assert store.count() == 25
+        assert server.requests["questions"] == 3
+
+    def test_resume_after_api_error(self, store, server, make_client):
+        """GIVEN a job stopped by an API error
+        SHOULD resume from the page which failed"""
+        server.max_rate = 2
+        with make_client(server, retry=RetryPolicy(max_attempts=1)) as client:
+            checkpoint = run_import_job(store, QUERY, client=client)
+            assert (checkpoint.page, checkpoint.done) == (2, False)
+            server.max_rate = None
+            checkpoint = run_import_job(store, QUERY, client=client, resume=True)
+        assert (checkpoint.page, checkpoint.items, checkpoint.done) == (3, 25, True)
+
+    def test_resume_after_new_activity(self, store, make_client):
+        """GIVEN a job sorted by activity, interrupted, and questions which got new
+        activity before it resumes
+        SHOULD resume from its cursor, without fetching or skipping the questions
+        which didn't move"""
+        questions = [dict(item) for item in QUESTIONS]
+        query = QuestionQuery.parse(pagesize=10)
+        with FakeStackExchangeServer(questions) as activity_server:
+            with make_client(activity_server) as client:
+                first = run_import_job(store, query, client=client, max_pages=1)
+                assert (first.cursor, store.count()) == (16, 10)
+                questions[4]["last_activity_date"] = 100
+                activity_server.questions.append(
+                    {"question_id": 26, "creation_date": 1, "last_activity_date": 50}
+                )
+                checkpoint = run_import_job(store, query, client=client, resume=True)
+        assert checkpoint.done
+        assert checkpoint.items == store.count() == 24
+        assert not list(store.get_questions([5]))
+
+    def test_resume_unbounded_sort(self, store, server, make_client):
+        """GIVEN a job sorted by a method without bounds
+        SHOULD resume from its next page"""
+        query = QuestionQuery.parse(pagesize=10, sort="hot")
+        with make_client(server) as client:
+            run_import_job(store, query, client=client, max_pages=1)
+            checkpoint = run_import_job(store, query, client=client, resume=True)
+        assert (checkpoint.page, checkpoint.items) == (3, 25)
+
+    def test_resume_completed_job(self, store, server, make_client):
+        """GIVEN a completed job
+        SHOULD not fetch anything"""
+        with make_client(server) as client:
+            run_import_job(store, QUERY, client=client)
+            run_import_job(store, QUERY, client=client, resume=True)
+        assert server.requests["questions"] == 3
+
+    def test_without_resume_starts_over(self, store, server, make_client):
+        """GIVEN a checkpointed job run again without resume
+        SHOULD start from the page of the query"""
+        with make_client(server) as client:
+            run_import_job(store, QUERY, client=client, max_pages=1)
+            checkpoint = run_import_job(store, QUERY, client=client, max_pages=1)
+        assert (checkpoint.page, checkpoint.items) == (1, 10)
+
+    def test_max_pages(self, store, server, make_client):
+        """GIVEN a page budget
+        SHOULD stop there, and let a resumed run continue"""
+        with make_client(server) as client:
+            first = run_import_job(store, QUERY, client=client, max_pages=2)
+            second = run_import_job(store, QUERY, client=client, resume=True)
+        assert (first.page, first.done) == (2, False)
+        assert (second.page, second.items, second.done) == (3, 25, True)
+        assert server.requests["questions"] == 3
+
+    def test_resume_without_checkpoint(self, store, server, caplog, make_client):
+        """GIVEN no checkpoint
+        SHOULD start afresh"""
+        caplog.set_level(logging.INFO, logger="so_importer")
+        with make_client(server) as client:
+            checkpoint = run_import_job(store, QUERY, client=client, resume=True)
+        assert checkpoint.items == 25
+        assert "starting afresh" in caplog.text
+
+    def test_progress(self, store, server, make_client):
+        """GIVEN a progress reporter
+        SHOULD report the cursor of every committed page"""
+        progress = ProgressReporter(interactive=False)
+        with make_client(server, hooks=[progress]) as client:
+            run_import_job(store, QUERY, client=client, progress=progress)
+        assert (progress.pages, progress.items) == (3, 25)
+        assert (progress.origin, progress.cursor) == (1_000_010, 1_000_025)
+        assert progress.target > 1_000_025
+        assert progress.date_cursor
+
+    def test_progress_score_cursor(self, store, server, make_client):
+        """GIVEN a progress reporter and a job sorted by votes
+        SHOULD show its cursor as a score, not a date"""
+        progress = ProgressReporter(interactive=False)
+        query = QuestionQuery.parse(pagesize=10, sort="votes", order="asc")
+        with make_client(server) as client:
+            run_import_job(store, query, client=client, progress=progress)
+        assert not progress.date_cursor
@@ -0,0 +1,197 @@
+"""Tests for the stack_overflow_importer/metrics.py module."""
+
+import time
+
+import pytest
+
+import stack_overflow_importer.metrics
+from stack_overflow_importer.base import ApiClient, query_method
+from stack_overflow_importer.cache import ResponseCache
+from stack_overflow_importer.fake_server import FakeStackExchangeServer
+from stack_overflow_importer.metrics import (
+    CallMetrics,
+    Histogram,
+    MetricsRecorder,
+    OpenTelemetryHook,
+)
+from stack_overflow_importer.retry import RetryPolicy
+from stack_overflow_importer.scheduler import RequestScheduler
+
+QUESTIONS = [{"question_id": i, "creation_date": i} for i in range(1, 8)]
+
+
+class TestHistogram:
+    """Tests for metrics.Histogram."""
+
+    def test_empty(self):
+        """It reports 0 when it holds no values."""
+        histogram = Histogram((1, 2))
+        assert (histogram.mean, histogram.quantile(0.5)) == (0, 0)
+
+    def test_quantiles(self):
+        """It estimates the quantiles from the buckets, capped by the maximum."""
+        histogram = Histogram((1, 2, 4, 8))
+        for value in (0.5, 1.5, 1.5, 3, 7):
+            histogram.record(value)
+        assert histogram.count == 5
+        assert histogram.mean == pytest.approx(2.7)
+        assert histogram.quantile(0.5) == 2
+        assert histogram.quantile(0.95) == 7
+        assert (histogram.min, histogram.max) == (0.5, 7)
+
+    def test_overflow(self):
+        """It keeps the values above the last bound."""
+        histogram = Histogram((1,))
+        histogram.record(10)
+        assert histogram.quantile(0.99) == 10
+
+
+class TestQueryMethodHooks:
+    """Tests for the metrics emitted by base.query_method()."""
+
+    def test_call(self, make_client):
+        """GIVEN calls on a pooled client
+        SHOULD time the connection of the first call only, and report the body"""
+        calls = []
+        with FakeStackExchangeServer(QUESTIONS, quota_max=100) as server:
+            with make_client(server, hooks=[calls.append]) as client:
+                for _ in range(2):
+                    query_method("questions", None, None, {"site": "so"}, client)
+        first, second = calls
+        assert (first.method, first.status, first.attempt) == ("questions", 200, 1)
+        assert first.connect is not None and first.tls is None
+        assert second.connect is None
+        assert first.ttfb <= first.total
+        assert first.bytes_received > 0
+        assert (first.items, first.quota_remaining) == (7, 99)
+        assert second.quota_remaining == 98
+        assert first.error is None and first.retry_in is None
+
+    def test_retry(self, make_client):
+        """GIVEN a throttled call
+        SHOULD report the error, and the delay before the retry"""
+        calls = []
+        with FakeStackExchangeServer(max_rate=1) as server:
+            with make_client(
+                server,
+                retry=RetryPolicy(max_attempts=2, sleep=lambda delay: None),
+                hooks=[calls.append],
+            ) as client:
+                query_method("questions", None, None, {"site": "so"}, client)
+                query_method("questions", None, None, {"site": "so"}, client)
+        assert [call.attempt for call in calls] == [1, 1, 2]
+        assert calls[1].error == "throttle_violation"
+        assert calls[1].retry_in is not None
+        assert calls[2].error == "throttle_violation"
+        assert calls[2].retry_in is None
+
+    def test_cache_hit(self, tmp_path, make_client):
+        """GIVEN a call served from the cache
+        SHOULD report it as cached, without a status"""
+        calls = []
+        with FakeStackExchangeServer(QUESTIONS) as server:
+            with make_client(
+                server,
+                cache=ResponseCache(str(tmp_path / "cache.db")),
+                hooks=[calls.append],
+            ) as client:
+                for _ in range(2):
+                    query_method("questions", None, None, {"site": "so"}, client)
+                client.cache.close()
+        assert [(call.cached, call.status) for call in calls] == [
+            (False, 200),
+            (True, None),
+        ]
+        assert calls[1].items == 7
+
+    def test_failing_hook(self, caplog):
+        """GIVEN a hook raising an exception
+        SHOULD log it, and still return the response"""
+
+        def failing_hook(metrics):
+            raise RuntimeError("boom")
+
+        with FakeStackExchangeServer(QUESTIONS) as server:
+            with ApiClient(
+                base_site=server.base_site,
+                scheduler=RequestScheduler(rate=1000, burst=100),
+                hooks=[failing_hook],
+            ) as client:
+                response = query_method("questions", None, None, {"site": "so"}, client)
+        assert len(response["items"]) == 7
+        assert "metrics hook" in caplog.text
+
+
+class TestMetricsRecorder:
+    """Tests for metrics.MetricsRecorder."""
+
+    def test_summary(self):
+        """It aggregates the calls, and renders them as a table."""
+        recorder = MetricsRecorder()
+        now = time.time()
+        recorder(CallMetrics("questions", now, status=200, total=0.2, items=30))
+        recorder(
+            CallMetrics(
+                "questions",
+                now,
+                status=502,
+                total=0.1,
+                error="throttle_violation",
+                retry_in=1.5,
+                backoff=10,
+                quota_remaining=42,
+            )
+        )
+        recorder(CallMetrics("questions", now, cached=True, total=0.001))
+        assert (recorder.calls, recorder.cached, recorder.errors) == (3, 1, 1)
+        assert recorder.histograms["total"].count == 2
+        summary = recorder.summary()
+        assert "API calls: 3 (1 from the cache), 1 errors, 1 retries" in summary
+        assert "quota remaining: 42" in summary
+        assert "total (ms)" in summary
+        assert "connect" not in summary
+
+
+class TestOpenTelemetryHook:
+    """Tests for metrics.OpenTelemetryHook."""
+
+    def test_not_installed(self, monkeypatch):
+        """GIVEN opentelemetry-api isn't installed
+        SHOULD raise an ImportError"""
+        monkeypatch.setattr(stack_overflow_importer.metrics, "trace", None)
+        with pytest.raises(ImportError, match="tracing"):
+            OpenTelemetryHook()
+
+    def test_span(self):
+        """GIVEN a call
+        SHOULD record a span spanning it"""
+        pytest.importorskip("opentelemetry")
+        spans = []
+
+        class FakeSpan:
+            """Records the span ending."""
+
+            def __init__(self, name, **kwargs):
+                self.name = name
+                self.kwargs = kwargs
+
+            def set_status(self, status):
+                self.kwargs["status"] = status
+
+            def end(self, end_time):
+                self.kwargs["end_time"] = end_time
+                spans.append(self)
+
+        class FakeTracer:
+            """Creates FakeSpans."""
+
+            def start_span(self, name, **kwargs):
+                return FakeSpan(name, **kwargs)
+
+        OpenTelemetryHook(FakeTracer())(
+            CallMetrics("questions", 100.0, status=200, total=0.5, items=3)
+        )
+        (span,) = spans
+        assert span.name == "GET questions"
+        assert span.kwargs["attributes"]["stackexchange.items"] == 3
+        assert span.kwargs["end_time"] - span.kwargs["start_time"] == 500_000_000
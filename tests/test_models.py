@@ -0,0 +1,63 @@
+"""Tests for the stack_overflow_importer/models.py module."""
+
+import pytest
+
+from stack_overflow_importer.models import QUESTION_FIELDS, Question
+
+ITEM = {
+    "question_id": 42,
+    "title": "How to foo?",
+    "link": "https://stackoverflow.com/q/42",
+    "tags": ["python", "pandas"],
+    "is_answered": True,
+    "view_count": 10,
+    "favorite_count": 0,
+    "up_vote_count": 3,
+    "accepted_answer_id": 43,
+    "answer_count": 2,
+    "score": 3,
+    "creation_date": 1640995200,
+    "last_activity_date": 1641995200,
+}
+
+
+class TestQuestion:
+    """Tests for models.Question."""
+
+    def test_from_api(self):
+        """It copies every field of the API item."""
+        question = Question.from_api(ITEM)
+        assert question.question_id == 42
+        assert question.tags == ("python", "pandas")
+        assert question.last_activity_date == 1641995200
+
+    def test_round_trip(self):
+        """It converts back into the same API item."""
+        assert Question.from_api(ITEM).to_dict() == ITEM
+
+    def test_missing_fields(self):
+        """Fields missing from the item are None, and left out of to_dict()."""
+        question = Question.from_api({"question_id": 1, "score": 0, "extra": "x"})
+        assert question.title is None
+        assert question.tags is None
+        assert question.to_dict() == {"question_id": 1, "score": 0}
+
+    def test_slots(self):
+        """It has no per-instance dict."""
+        question = Question.from_api(ITEM)
+        assert not hasattr(question, "__dict__")
+        with pytest.raises(AttributeError):
+            question.unknown = 1  # pylint: disable=assigning-non-slot
+
+    def test_tags_are_interned(self):
+        """The same tag is shared across questions."""
+        first = Question.from_api({"question_id": 1, "tags": ["".join(["py", "thon"])]})
+        second = Question.from_api(
+            {"question_id": 2, "tags": ["".join(["pyt", "hon"])]}
+        )
+        assert first.tags[0] is second.tags[0]
+
+    def test_fields(self):
+        """The fields match the API names."""
+        assert QUESTION_FIELDS[0] == "question_id"
+        assert set(QUESTION_FIELDS) == set(ITEM)
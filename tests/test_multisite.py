@@ -0,0 +1,129 @@
+"""Tests for the stack_overflow_importer/multisite.py module."""
+
+import io
+
+import pytest
+
+from stack_overflow_importer.base import ApiClient
+from stack_overflow_importer.fake_server import FakeStackExchangeServer
+from stack_overflow_importer.multisite import import_sites, parse_sites
+from stack_overflow_importer.progress import ProgressReporter
+from stack_overflow_importer.scheduler import RequestScheduler
+from stack_overflow_importer.store import QuestionStore, site_db_path
+
+QUESTIONS = [
+    {"question_id": i, "creation_date": 1_000_000 + i * 10} for i in range(1, 251)
+]
+
+
+@pytest.mark.parametrize(
+    "sites, expected",
+    [
+        ("superuser", ["superuser"]),
+        ("superuser;ServerFault", ["superuser", "serverfault"]),
+        ("superuser, serverfault;", ["superuser", "serverfault"]),
+        (["superuser", "superuser", "askubuntu"], ["superuser", "askubuntu"]),
+    ],
+)
+def test_parse_sites(sites, expected):
+    """GIVEN a list of sites
+    SHOULD give the distinct site names, in order"""
+    assert parse_sites(sites) == expected
+
+
+@pytest.mark.parametrize("sites", ["", ";", []])
+def test_parse_no_sites(sites):
+    """GIVEN no site
+    SHOULD raise a ValueError"""
+    with pytest.raises(ValueError):
+        parse_sites(sites)
+
+
+def test_site_db_path():
+    """It inserts the site name before the extension, except for the default site."""
+    assert site_db_path("data/so_importer.db", "superuser") == (
+        "data/so_importer.superuser.db"
+    )
+    assert site_db_path("data/so_importer.db", "stackoverflow") == (
+        "data/so_importer.db"
+    )
+
+
+class TestImportSites:
+    """Tests for multisite.import_sites()."""
+
+    def test_import(self, tmp_path):
+        """GIVEN several sites
+        SHOULD crawl each of them into its own partition, with one shared scheduler"""
+        scheduler = RequestScheduler(rate=1000, burst=100)
+        db_path = str(tmp_path / "so.db")
+        with FakeStackExchangeServer(QUESTIONS, quota_max=500) as server:
+            with ApiClient(base_site=server.base_site, scheduler=scheduler) as client:
+                counts = import_sites(
+                    "superuser;serverfault",
+                    1_000_000,
+                    1_002_600,
+                    client=client,
+                    db_path=db_path,
+                    batch_size=100,
+                )
+        assert counts == {"superuser": 250, "serverfault": 250}
+        for site in ("superuser", "serverfault"):
+            with QuestionStore(site_db_path(db_path, site)) as store:
+                assert store.count() == 250
+        assert set(server.sites) == {"superuser", "serverfault"}
+        assert scheduler.quota_remaining == 500 - server.request_count
+
+    def test_progress(self, tmp_path):
+        """GIVEN a ProgressReporter
+        SHOULD report the progress of all the sites against their whole windows"""
+        progress = ProgressReporter(io.StringIO(), interactive=False)
+        with FakeStackExchangeServer(QUESTIONS) as server:
+            with ApiClient(base_site=server.base_site) as client:
+                import_sites(
+                    "superuser;serverfault",
+                    1_000_000,
+                    1_002_600,
+                    client=client,
+                    db_path=str(tmp_path / "so.db"),
+                    progress=progress,
+                )
+        assert progress.target == progress.cursor == 2 * 2601
+        assert progress.remaining == 0
+
+    def test_import_answers(self, tmp_path):
+        """GIVEN answers=True
+        SHOULD also store the answers of the crawled questions"""
+        answers = [
+            {"answer_id": 10 * item["question_id"], "question_id": item["question_id"]}
+            for item in QUESTIONS[:3]
+        ]
+        questions = [dict(item, answer_count=1) for item in QUESTIONS[:3]]
+        db_path = str(tmp_path / "so.db")
+        with FakeStackExchangeServer(questions, answers) as server:
+            with ApiClient(
+                base_site=server.base_site,
+                scheduler=RequestScheduler(rate=1000, burst=100),
+            ) as client:
+                import_sites(
+                    "superuser", 1, client=client, db_path=db_path, answers=True
+                )
+        with QuestionStore(site_db_path(db_path, "superuser")) as store:
+            assert store.get_answers(questions[0]["question_id"]) == [answers[0]]
+        assert server.requests["questions/{ids}/answers"] == 1
+
+    def test_failed_site(self, tmp_path, monkeypatch, caplog):
+        """GIVEN a site whose crawl fails
+        SHOULD log it, and still import the others"""
+
+        def mock_crawl_site(site, *args, **kwargs):
+            if site == "broken":
+                raise RuntimeError("boom")
+            return 1
+
+        monkeypatch.setattr(
+            "stack_overflow_importer.multisite.crawl_site", mock_crawl_site
+        )
+        counts = import_sites("superuser;broken", 1, 2, db_path=str(tmp_path / "so.db"))
+        assert counts == {"superuser": 1}
+        assert "The import of broken failed" in caplog.text
@@ -0,0 +1,145 @@
+"""Tests for the stack_overflow_importer/progress.py module."""
+
+import io
+import logging
+
+import pytest
+
+from stack_overflow_importer.metrics import CallMetrics
+from stack_overflow_importer.progress import (
+    ProgressReporter,
+    format_cursor,
+    format_duration,
+)
+
+
+class FakeClock:
+    """A clock which only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def page(items=100, quota_remaining=None, error=None):
+    """Builds the metrics of a page call."""
+    return CallMetrics(
+        "questions",
+        0.0,
+        status=200,
+        items=items,
+        quota_remaining=quota_remaining,
+        error=error,
+    )
+
+
+@pytest.mark.parametrize(
+    "seconds, expected", [(0, "0:00:00"), (59.9, "0:00:59"), (3725, "1:02:05")]
+)
+def test_format_duration(seconds, expected):
+    """It formats durations as h:mm:ss."""
+    assert format_duration(seconds) == expected
+
+
+def test_format_cursor():
+    """It formats timestamps as UTC dates, and other cursors as they are."""
+    assert format_cursor(1_654_041_600) == "2022-06-01 00:00"
+    assert format_cursor(42, date_cursor=False) == "42"
+    assert format_cursor(None) == "-"
+
+
+class TestProgressReporter:
+    """Tests for progress.ProgressReporter."""
+
+    def test_counts_pages(self):
+        """It counts the pages, items and quota of the calls, but not the errors."""
+        reporter = ProgressReporter(io.StringIO(), interactive=False)
+        reporter(page(100, quota_remaining=9000))
+        reporter(page(30, quota_remaining=8999))
+        reporter(page(None, error="throttle_violation"))
+        assert (reporter.pages, reporter.items) == (2, 130)
+        assert reporter.quota_remaining == 8999
+
+    def test_rate_and_eta(self):
+        """It computes the throughput over its window, and the time remaining from
+        the cursor."""
+        clock = FakeClock()
+        reporter = ProgressReporter(
+            io.StringIO(), interactive=False, window=10, clock=clock
+        )
+        reporter.set_target(2000)
+        reporter.advance(1000)
+        clock.now += 20
+        reporter(page(100))
+        reporter.advance(1250)
+        clock.now += 5
+        reporter(page(100))
+        # 200 items since the last sample older than the window, and a quarter of
+        # the way in 25 seconds
+        assert reporter.rate == pytest.approx(200 / 25)
+        assert reporter.remaining == pytest.approx(75)
+        assert "ETA 0:01:15" in reporter.status()
+
+    def test_covered_amounts(self):
+        """It adds up the amounts covered by independent parts, and estimates the
+        time remaining from their sum."""
+        clock = FakeClock()
+        reporter = ProgressReporter(
+            io.StringIO(), interactive=False, date_cursor=False, clock=clock
+        )
+        reporter.extend_target(600)
+        reporter.extend_target(400)
+        clock.now += 30
+        reporter.advance_by(150)
+        reporter.advance_by(100)
+        assert reporter.done == pytest.approx(0.25)
+        assert reporter.remaining == pytest.approx(90)
+        assert "cursor 250 (25%) | ETA 0:01:30" in reporter.status()
+
+    def test_unknown_eta(self):
+        """It doesn't estimate the time remaining without a target."""
+        reporter = ProgressReporter(io.StringIO(), interactive=False)
+        reporter.advance(1000)
+        assert reporter.remaining is None
+        assert "ETA ?" in reporter.status()
+
+    def test_interactive(self):
+        """On a terminal, it refreshes a single line, at most every
+        refresh_interval."""
+        clock = FakeClock()
+        stream = io.StringIO()
+        reporter = ProgressReporter(
+            stream, interactive=True, refresh_interval=1, clock=clock
+        )
+        reporter(page(10))
+        reporter(page(10))
+        clock.now += 1
+        reporter(page(10))
+        reporter.close()
+        output = stream.getvalue()
+        assert output.count("\r") == 3
+        assert output.endswith("\n") and output.count("\n") == 1
+        assert "items" in output and "30" in output
+
+    def test_logs(self, caplog):
+        """Otherwise, it logs the progress every log_interval."""
+        caplog.set_level(logging.INFO, logger="so_importer")
+        clock = FakeClock()
+        stream = io.StringIO()
+        reporter = ProgressReporter(stream, log_interval=30, clock=clock)
+        reporter(page(10))
+        clock.now += 10
+        reporter(page(10))
+        clock.now += 30
+        reporter(page(10))
+        assert stream.getvalue() == ""
+        assert [
+            record.getMessage()
+            for record in caplog.records
+            if record.getMessage().startswith("Progress")
+        ] == [
+            "Progress: pages 1 | items 10 (0.0/s) | cursor - | ETA ? | quota ?",
+            "Progress: pages 3 | items 30 (0.3/s) | cursor - | ETA ? | quota ?",
+        ]
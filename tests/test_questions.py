@@ -2,14 +2,21 @@
 
 from datetime import date, datetime, timezone
 import pytest
+import stack_overflow_importer.questions
+from stack_overflow_importer.fake_server import FakeStackExchangeServer
+from stack_overflow_importer.models import Question
 from stack_overflow_importer.questions import (
     Order,
+    QuestionQuery,
     QuestionSortMethod,
     build_questions_params,
+    chunk_ids,
     extract_int,
     extract_order,
     extract_sort,
     extract_timestamp,
+    get_questions_by_ids,
+    iter_questions,
 )
 
 
@@ -546,3 +553,238 @@ class TestBuildQuestionsParams:
     ):
         """Creates a valid set of params given various tagged values."""
         self.common_test(field, value, result, exception, exception_message)
+
+
+class TestQuestionQuery:
+    """Tests for questions.QuestionQuery."""
+
+    @pytest.mark.parametrize("sort", ["votes", "VOTES", QuestionSortMethod.VOTES])
+    def test_int_bounds(self, sort):
+        """GIVEN the votes sort
+        SHOULD keep min and max as ints"""
+        params = build_questions_params(sort=sort, min="5", max=10)
+        assert (params["min"], params["max"]) == ("5", "10")
+
+    def test_date_bounds(self):
+        """GIVEN an upper case date sort
+        SHOULD convert min and max into timestamps"""
+        query = QuestionQuery.parse(
+            sort="CREATION", min="2022-01-01", max=1_700_000_000
+        )
+        assert (query.sort, query.min, query.max) == (
+            "creation",
+            1_640_995_200,
+            1_700_000_000,
+        )
+
+    def test_ignored_bounds(self, caplog):
+        """GIVEN a sort without bounds
+        SHOULD drop min and max, and warn"""
+        query = QuestionQuery.parse(sort="hot", min=1, max=2)
+        assert query.min is None and query.max is None
+        assert "'min' parameter 1 was ignored" in caplog.text
+
+    def test_hashable(self):
+        """GIVEN equivalent inputs
+        SHOULD give equal queries, usable as dict keys"""
+        first = QuestionQuery.parse(fromdate="2022-01-01", order=Order.ASC)
+        second = QuestionQuery.parse(fromdate=1_640_995_200, order="ASC")
+        assert first == second
+        assert {first: "cached"}[second] == "cached"
+
+    def test_immutable(self):
+        """SHOULD refuse to be modified"""
+        query = QuestionQuery.parse()
+        with pytest.raises(AttributeError):
+            query.page = 2  # type: ignore[misc]
+
+    def test_with_page(self):
+        """SHOULD only change the page"""
+        query = QuestionQuery.parse(tagged="python", pagesize=100)
+        other = query.with_page(3)
+        assert (other.page, other.tagged, other.pagesize) == (3, "python", 100)
+        assert query.page == 1
+
+    def test_to_params(self):
+        """SHOULD build the same params as build_questions_params()"""
+        assert QuestionQuery.parse(filter="f", tagged="a;b").to_params() == (
+            build_questions_params(filter="f", tagged="a;b")
+        )
+
+
+def make_pages(pages):
+    """Builds a mock query_method returning each of `pages` in turn, and records the
+    params it was called with."""
+    calls = []
+
+    # pylint: disable=unused-argument
+    def mock_query_method(method, key, access_token, params, client=None):
+        calls.append(dict(params))
+        return pages[len(calls) - 1]
+
+    return mock_query_method, calls
+
+
+class TestIterQuestions:
+    """Tests for questions.iter_questions()."""
+
+    def test_follows_has_more(self, monkeypatch):
+        """It yields the items of every page until has_more is False."""
+        mock, calls = make_pages(
+            [
+                {"items": [{"question_id": 1}, {"question_id": 2}], "has_more": True},
+                {"items": [{"question_id": 3}], "has_more": True},
+                {"items": [{"question_id": 4}], "has_more": False},
+            ]
+        )
+        monkeypatch.setattr(stack_overflow_importer.questions, "query_method", mock)
+        items = list(iter_questions("key", "token", filter="f"))
+        assert [item["question_id"] for item in items] == [1, 2, 3, 4]
+        assert [call["page"] for call in calls] == ["1", "2", "3"]
+        assert all(call["pagesize"] == "100" for call in calls)
+
+    def test_is_lazy(self, monkeypatch):
+        """It only requests the next page once the current one is consumed."""
+        mock, calls = make_pages(
+            [
+                {"items": [{"question_id": 1}], "has_more": True},
+                {"items": [{"question_id": 2}], "has_more": False},
+            ]
+        )
+        monkeypatch.setattr(stack_overflow_importer.questions, "query_method", mock)
+        iterator = iter_questions()
+        assert next(iterator) == {"question_id": 1}
+        assert len(calls) == 1
+        assert next(iterator) == {"question_id": 2}
+        assert len(calls) == 2
+
+    def test_records(self, monkeypatch):
+        """It can yield Question records instead of dicts."""
+        mock, _ = make_pages(
+            [{"items": [{"question_id": 1, "tags": ["a"]}], "has_more": False}]
+        )
+        monkeypatch.setattr(stack_overflow_importer.questions, "query_method", mock)
+        assert list(iter_questions(records=True)) == [
+            Question(question_id=1, tags=("a",))
+        ]
+
+    def test_start_page(self, monkeypatch):
+        """It starts from the requested page."""
+        mock, calls = make_pages([{"items": [], "has_more": False}])
+        monkeypatch.setattr(stack_overflow_importer.questions, "query_method", mock)
+        assert not list(iter_questions(page=5, pagesize=10))
+        assert calls[0]["page"] == "5"
+        assert calls[0]["pagesize"] == "10"
+
+    def test_stops_on_error(self, monkeypatch, caplog):
+        """It stops and logs when the API returns an error."""
+        mock, _ = make_pages(
+            [
+                {"items": [{"question_id": 1}], "has_more": True},
+                {
+                    "error_id": 502,
+                    "error_message": "too many",
+                    "error_name": "throttle",
+                },
+            ]
+        )
+        monkeypatch.setattr(stack_overflow_importer.questions, "query_method", mock)
+        assert list(iter_questions()) == [{"question_id": 1}]
+        assert "too many" in caplog.text
+
+
+class TestSite:
+    """Tests for the `site` parameter of the questions queries."""
+
+    def test_default(self):
+        """SHOULD query Stack Overflow by default"""
+        assert build_questions_params()["site"] == "stackoverflow"
+
+    def test_site(self):
+        """GIVEN a site
+        SHOULD query it, normalized"""
+        assert build_questions_params(site=" SuperUser ")["site"] == "superuser"
+
+    @pytest.mark.parametrize("site", ["", "  "])
+    def test_empty_site(self, site):
+        """GIVEN an empty site
+        SHOULD raise a ValueError"""
+        with pytest.raises(ValueError):
+            build_questions_params(site=site)
+
+    def test_iter_questions(self, monkeypatch):
+        """GIVEN a site
+        SHOULD query every page on it"""
+        mock, calls = make_pages(
+            [{"items": [], "has_more": True}, {"items": [], "has_more": False}]
+        )
+        monkeypatch.setattr(stack_overflow_importer.questions, "query_method", mock)
+        list(iter_questions(site="serverfault"))
+        assert [call["site"] for call in calls] == ["serverfault", "serverfault"]
+
+
+class TestChunkIds:
+    """Tests for questions.chunk_ids()."""
+
+    def test_batches(self):
+        """GIVEN 250 IDs
+        SHOULD give batches of 100, 100 and 50, in order"""
+        batches = list(chunk_ids(range(1, 251)))
+        assert [len(batch) for batch in batches] == [100, 100, 50]
+        assert batches[0][0] == 1 and batches[-1][-1] == 250
+
+    def test_duplicates_and_str(self):
+        """GIVEN duplicated IDs, as ints or str
+        SHOULD keep the first occurrence only"""
+        assert list(chunk_ids(["3", 1, 3, "1", 2], size=2)) == [[3, 1], [2]]
+
+    @pytest.mark.parametrize("ids", [["abc"], [0], [-4]])
+    def test_invalid(self, ids):
+        """GIVEN an invalid ID
+        SHOULD raise a ValueError"""
+        with pytest.raises(ValueError):
+            list(chunk_ids(ids))
+
+    def test_lazy(self):
+        """SHOULD only read the IDs needed for the next batch"""
+        ids = iter(range(1, 1000))
+        next(chunk_ids(ids, size=10))
+        assert next(ids) == 11
+
+
+class TestGetQuestionsByIds:
+    """Tests for questions.get_questions_by_ids()."""
+
+    def test_batches(self, make_client):
+        """GIVEN 450 IDs, some of deleted questions
+        SHOULD fetch them in 5 calls, and yield the existing questions once"""
+        corpus = [{"question_id": i, "score": i} for i in range(1, 401)]
+        with FakeStackExchangeServer(corpus) as server:
+            with make_client(server) as client:
+                items = list(
+                    get_questions_by_ids(
+                        list(range(1, 451)) + [1, 2], client=client, site="superuser"
+                    )
+                )
+        assert sorted(item["question_id"] for item in items) == list(range(1, 401))
+        assert server.requests["questions/{ids}"] == 5
+        assert set(server.sites) == {"superuser"}
+
+    def test_records(self, make_client):
+        """GIVEN records=True
+        SHOULD yield Question records"""
+        with FakeStackExchangeServer([{"question_id": 7, "score": 3}]) as server:
+            with make_client(server) as client:
+                items = list(get_questions_by_ids([7], client=client, records=True))
+        assert items == [Question(question_id=7, score=3)]
+
+    def test_error(self, monkeypatch):
+        """GIVEN an API error
+        SHOULD raise a RuntimeError"""
+        monkeypatch.setattr(
+            stack_overflow_importer.questions,
+            "query_method",
+            lambda *args, **kwargs: {"error_id": 400, "error_message": "bad"},
+        )
+        with pytest.raises(RuntimeError, match="bad"):
+            list(get_questions_by_ids([1, 2, 3]))
@@ -0,0 +1,204 @@
+"""Tests for the stack_overflow_importer/retry.py module."""
+
+import json
+
+import pytest
+import requests
+
+from stack_overflow_importer.base import ApiClient, query_method
+from stack_overflow_importer.decoding import decode_json
+from stack_overflow_importer.retry import (
+    RetryPolicy,
+    decode_response,
+    is_retryable,
+)
+from stack_overflow_importer.scheduler import RequestScheduler
+
+
+class FakeResponse:
+    """A minimal stand-in for requests.Response."""
+
+    def __init__(self, body, status_code=200, content_type="application/json"):
+        self.content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.reason = "Reason"
+        self.headers = {"Content-Type": content_type}
+
+
+def error(error_id, name, message="An error."):
+    """Builds an API error response."""
+    return {"error_id": error_id, "error_name": name, "error_message": message}
+
+
+@pytest.mark.parametrize(
+    "status, result, expected",
+    [
+        (200, {"items": []}, False),
+        (400, error(502, "throttle_violation"), True),
+        (500, error(500, "internal_error"), True),
+        (503, error(503, "temporarily_unavailable"), True),
+        (400, error(400, "bad_parameter"), False),
+        (400, error(405, "key_required"), False),
+        (401, error(401, "access_token_required"), False),
+        (502, error(502, "http_error"), True),
+        (504, error(504, "http_error"), True),
+        (404, error(404, "http_error"), False),
+        (429, None, True),
+        (503, {}, True),
+    ],
+)
+def test_is_retryable(status, result, expected):
+    """GIVEN a status and a response
+    SHOULD tell whether the call is worth retrying"""
+    assert is_retryable(status, result) == expected
+
+
+class TestDecodeResponse:
+    """Tests for retry.decode_response()."""
+
+    def test_json(self):
+        """GIVEN a JSON body
+        SHOULD decode it"""
+        assert decode_response(FakeResponse({"items": []}), decode_json) == {
+            "items": []
+        }
+
+    def test_html(self):
+        """GIVEN an HTML error page
+        SHOULD turn it into an error response"""
+        response = FakeResponse(b"<html>Bad gateway</html>", 502, "text/html")
+        result = decode_response(response, decode_json)
+        assert (result["error_id"], result["error_name"]) == (502, "http_error")
+        assert "text/html" in result["error_message"]
+
+
+class TestRetryPolicy:
+    """Tests for retry.RetryPolicy."""
+
+    def test_capped_exponential_backoff(self):
+        """SHOULD double the delay after each attempt, up to max_delay"""
+        policy = RetryPolicy(
+            max_attempts=10, base_delay=1, max_delay=5, budget=None, jitter=lambda: 1
+        )
+        delays = [policy.next_delay(attempt) for attempt in range(1, 6)]
+        assert delays == [1, 2, 4, 5, 5]
+
+    def test_jitter(self):
+        """SHOULD scale the delay by the jitter"""
+        policy = RetryPolicy(base_delay=4, jitter=lambda: 0.25)
+        assert policy.next_delay(2) == 2
+
+    def test_max_attempts(self):
+        """SHOULD stop retrying after max_attempts"""
+        policy = RetryPolicy(max_attempts=3)
+        assert policy.next_delay(2) is not None
+        assert policy.next_delay(3) is None
+
+    def test_budget(self):
+        """SHOULD stop retrying, across calls, once the budget is spent"""
+        policy = RetryPolicy(budget=2)
+        assert policy.next_delay(1) is not None
+        assert policy.next_delay(1) is not None
+        assert policy.next_delay(1) is None
+        assert policy.retries == 2
+
+    def test_budget_spent_logged_once(self, caplog):
+        """GIVEN a spent budget
+        SHOULD log it once, until the policy is reset"""
+        policy = RetryPolicy(budget=1)
+        policy.next_delay(1)
+        for _ in range(3):
+            assert policy.next_delay(1) is None
+        assert caplog.text.count("retry budget") == 1
+        policy.reset()
+        assert policy.retries == 0
+        assert policy.next_delay(1) is not None
+
+    def test_throttle_wait(self):
+        """GIVEN a throttle violation saying when to come back
+        SHOULD wait at least that long, unless it is beyond max_delay"""
+        policy = RetryPolicy(jitter=lambda: 0, max_delay=60)
+        soon = error(502, "throttle_violation", "more requests available in 7 seconds")
+        late = error(502, "throttle_violation", "more requests available in 80 seconds")
+        assert policy.next_delay(1, soon) == 7
+        assert policy.next_delay(1, late) is None
+
+    def test_invalid_attempts(self):
+        """SHOULD refuse less than one attempt"""
+        with pytest.raises(ValueError):
+            RetryPolicy(max_attempts=0)
+
+
+class TestQueryMethodRetries:
+    """Tests for the retries of base.query_method()."""
+
+    @staticmethod
+    def make_client(monkeypatch, outcomes, **policy):
+        """Builds a client whose session returns, or raises, each of `outcomes` in
+        turn, and returns it with the list of the delays slept."""
+        delays = []
+        client = ApiClient(
+            scheduler=RequestScheduler(rate=1000, burst=100),
+            retry=RetryPolicy(jitter=lambda: 1, sleep=delays.append, **policy),
+        )
+        remaining = list(outcomes)
+
+        # pylint: disable=unused-argument
+        def mock_get(*args, **kwargs):
+            outcome = remaining.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        monkeypatch.setattr(client.session, "get", mock_get)
+        return client, delays
+
+    def test_transient_errors(self, monkeypatch):
+        """GIVEN transient failures, then a success
+        SHOULD retry until the success, backing off"""
+        client, delays = self.make_client(
+            monkeypatch,
+            [
+                requests.ConnectionError("reset"),
+                FakeResponse(b"<html></html>", 503, "text/html"),
+                FakeResponse(error(502, "throttle_violation"), 400),
+                FakeResponse({"items": [1]}),
+            ],
+        )
+        assert query_method("info", None, None, {"site": "so"}, client) == {
+            "items": [1]
+        }
+        assert delays == [1, 2, 4]
+
+    def test_fatal_error(self, monkeypatch):
+        """GIVEN a fatal error
+        SHOULD return it without retrying"""
+        client, delays = self.make_client(
+            monkeypatch, [FakeResponse(error(400, "bad_parameter"), 400)]
+        )
+        result = query_method("info", None, None, {"site": "so"}, client)
+        assert result["error_name"] == "bad_parameter"
+        assert not delays
+
+    def test_exhausted_error(self, monkeypatch):
+        """GIVEN an error outlasting the attempts
+        SHOULD return the last error"""
+        client, delays = self.make_client(
+            monkeypatch,
+            [FakeResponse(error(500, "internal_error"), 500)] * 2,
+            max_attempts=2,
+        )
+        result = query_method("info", None, None, {"site": "so"}, client)
+        assert result["error_name"] == "internal_error"
+        assert delays == [1]
+
+    def test_exhausted_exception(self, monkeypatch):
+        """GIVEN a connection failure outlasting the attempts
+        SHOULD raise it, and record every attempt on the scheduler"""
+        client, _ = self.make_client(
+            monkeypatch, [requests.Timeout("slow")] * 3, max_attempts=3
+        )
+        with pytest.raises(requests.Timeout):
+            query_method("info", None, None, {"site": "so"}, client)
+        assert client.scheduler._in_flight == 0  # pylint: disable=protected-access
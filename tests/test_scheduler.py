@@ -0,0 +1,196 @@
+"""Tests for the stack_overflow_importer/scheduler.py module."""
+
+import json
+
+import pytest
+
+import stack_overflow_importer.base
+from stack_overflow_importer.base import ApiClient, query_method
+from stack_overflow_importer.scheduler import (
+    QuotaExhaustedError,
+    RequestScheduler,
+    TokenBucket,
+    normalize_method,
+)
+
+
+class FakeClock:
+    """A manual clock whose sleep advances the time instead of blocking."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Records the sleep and moves the clock forward."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture()
+def clock():
+    """Fixture to return a fresh FakeClock for each test."""
+    return FakeClock()
+
+
+@pytest.mark.parametrize(
+    "method, expected",
+    [
+        ("questions", "questions"),
+        ("filters/create", "filters/create"),
+        ("questions/1;2;3/answers", "questions/{ids}/answers"),
+        ("/answers/42/comments", "answers/{ids}/comments"),
+    ],
+)
+def test_normalize_method(method, expected):
+    """It replaces ID lists by a placeholder."""
+    assert normalize_method(method) == expected
+
+
+class TestTokenBucket:
+    """Tests for scheduler.TokenBucket."""
+
+    def test_spaces_requests(self, clock):
+        """It spaces requests evenly once the burst is spent."""
+        bucket = TokenBucket(rate=10, capacity=1, clock=clock, sleep=clock.sleep)
+        for _ in range(5):
+            bucket.acquire()
+        assert clock.sleeps == pytest.approx([0.1, 0.1, 0.1, 0.1])
+
+    def test_burst(self, clock):
+        """It allows `capacity` requests back to back."""
+        bucket = TokenBucket(rate=10, capacity=3, clock=clock, sleep=clock.sleep)
+        for _ in range(3):
+            assert bucket.acquire() == 0
+        assert bucket.acquire() == pytest.approx(0.1)
+
+    def test_refill(self, clock):
+        """It refills the bucket with time, up to its capacity."""
+        bucket = TokenBucket(rate=10, capacity=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        clock.now += 10
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == 0
+        assert bucket.acquire() > 0
+
+    @pytest.mark.parametrize("rate, capacity", [(0, 1), (-1, 1), (10, 0)])
+    def test_invalid(self, rate, capacity):
+        """It rejects invalid rates and capacities."""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=rate, capacity=capacity)
+
+
+class TestRequestScheduler:
+    """Tests for scheduler.RequestScheduler."""
+
+    def test_tracks_quota(self, clock):
+        """It records the quota reported by the responses."""
+        scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+        scheduler.acquire("questions")
+        scheduler.record("questions", {"quota_remaining": 42, "quota_max": 300})
+        assert scheduler.quota_remaining == 42
+        assert scheduler.quota_max == 300
+
+    def test_quota_out_of_order(self, clock):
+        """It ignores the quota of a response overtaken by a later call, but not the
+        daily reset."""
+        scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+        scheduler.acquire("questions")
+        scheduler.acquire("questions")
+        scheduler.record("questions", {"quota_remaining": 98})
+        scheduler.record("questions", {"quota_remaining": 99})
+        assert scheduler.quota_remaining == 98
+        scheduler.acquire("questions")
+        scheduler.record("questions", {"quota_remaining": 10_000})
+        assert scheduler.quota_remaining == 10_000
+
+    def test_stops_before_quota_runs_out(self, clock):
+        """It raises once only the reserved quota remains."""
+        scheduler = RequestScheduler(quota_reserve=5, clock=clock, sleep=clock.sleep)
+        scheduler.acquire("questions")
+        scheduler.record("questions", {"quota_remaining": 6})
+        scheduler.acquire("questions")
+        with pytest.raises(QuotaExhaustedError, match="6 requests remain"):
+            scheduler.acquire("questions")
+
+    def test_record_without_response_releases(self, clock):
+        """A failed call doesn't count as in flight anymore."""
+        scheduler = RequestScheduler(quota_reserve=0, clock=clock, sleep=clock.sleep)
+        scheduler.acquire("questions")
+        scheduler.record("questions", {"quota_remaining": 1})
+        scheduler.acquire("questions")
+        scheduler.record("questions", None)
+        scheduler.acquire("questions")
+
+    def test_honours_backoff(self, clock):
+        """It waits for the backoff before calling the same method again."""
+        scheduler = RequestScheduler(
+            rate=1000, burst=10, clock=clock, sleep=clock.sleep
+        )
+        scheduler.acquire("questions")
+        scheduler.record("questions", {"backoff": 10})
+        scheduler.acquire("filters/create")
+        assert clock.sleeps == []
+        scheduler.acquire("questions")
+        assert clock.sleeps[0] == pytest.approx(10)
+        assert scheduler.backoff_wait == pytest.approx(10)
+
+    def test_backoff_shared_by_vectorized_calls(self, clock):
+        """A backoff applies to the same method whatever the IDs."""
+        scheduler = RequestScheduler(
+            rate=1000, burst=10, clock=clock, sleep=clock.sleep
+        )
+        scheduler.acquire("questions/1;2/answers")
+        scheduler.record("questions/1;2/answers", {"backoff": 5})
+        scheduler.acquire("questions/3/answers")
+        assert clock.sleeps[0] == pytest.approx(5)
+
+
+class MockResponse:
+    """A mock response carrying the throttle fields."""
+
+    status_code = 200
+    ok = True
+
+    @property
+    def content(self) -> bytes:
+        """Mock raw body, as sent by the API."""
+        return json.dumps(self.json()).encode("utf-8")
+
+    @staticmethod
+    def json():
+        """Mock JSON response with a backoff."""
+        return {"items": [], "backoff": 2, "quota_remaining": 100, "quota_max": 300}
+
+
+def test_query_method_goes_through_scheduler(monkeypatch, clock):
+    """It acquires and records every call on the client scheduler."""
+    scheduler = RequestScheduler(rate=1000, burst=10, clock=clock, sleep=clock.sleep)
+    with ApiClient(scheduler=scheduler) as client:
+        # pylint: disable=unused-argument
+        monkeypatch.setattr(client.session, "get", lambda *a, **k: MockResponse())
+        query_method("questions", None, None, {"site": "stackoverflow"}, client)
+        query_method("questions", None, None, {"site": "stackoverflow"}, client)
+    assert scheduler.quota_remaining == 100
+    assert clock.sleeps[0] == pytest.approx(2)
+
+
+def test_query_method_releases_on_error(monkeypatch, clock):
+    """It records the call even when the request fails."""
+    scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+
+    # pylint: disable=unused-argument
+    def failing_get(*args, **kwargs):
+        raise ConnectionError("boom")
+
+    monkeypatch.setattr(stack_overflow_importer.base.requests, "get", failing_get)
+    with ApiClient(scheduler=scheduler) as client:
+        monkeypatch.setattr(client.session, "get", failing_get)
+        with pytest.raises(ConnectionError):
+            query_method("questions", None, None, {"site": "stackoverflow"}, client)
+    # pylint: disable=protected-access
+    assert scheduler._in_flight == 0
@@ -1,8 +1,28 @@
 """Test module for the script so_updater.py"""
 
+import os
+import pathlib
 import re
+import subprocess
+import sys
 import pytest
-from so_updater import build_args_parser, extract
+import so_updater
+import stack_overflow_importer.questions
+import stack_overflow_importer.sync
+from stack_overflow_importer.filters import QUESTION_TEST_FILTER_ID, FilterRegistry
+from stack_overflow_importer.metrics import MetricsRecorder
+from stack_overflow_importer.progress import ProgressReporter
+from stack_overflow_importer.store import QuestionStore
+from so_updater import (
+    build_args_parser,
+    build_client,
+    build_hooks,
+    extract,
+    fetch_question_pages,
+    import_questions,
+    resolve_question_filter,
+    write_output,
+)
 
 
 def valid_args_tester(args, expected) -> bool:
@@ -60,9 +80,12 @@ class TestBuildArgsParser:
         SHOULD fail and print that at least 1 argument is required"""
         assert wrong_args_tester(
             [],
-            r"^usage: \w*\.py\s\[-h\] \{check,auth,questions\}",
+            r"^usage: \w*\.py\s\[-h\] \[--metrics\] \[--no-progress\]"
+            r" \[--trace\]\s+"
+            r"\{check,auth,questions,sync,crawl\}",
             # error looks like :
-            # usage: so_updater.py [-h] {check,auth,questions} ...
+            # usage: so_updater.py [-h] [--metrics] [--no-progress] [--trace]
+            #                      {check,auth,questions,sync,crawl} ...
             # so_updater.py: error: the following arguments are required: action
             capsys,
         )
@@ -90,6 +113,10 @@ class TestBuildArgsParser:
                 ["questions"],
                 {"action": "questions"},
             ),
+            (
+                ["sync"],
+                {"action": "sync"},
+            ),
         ],
     )
     def test_valid_actions(self, args, expected):
@@ -104,13 +131,15 @@ class TestBuildArgsParser:
         SHOULD fail and prompt possible actions"""
         assert wrong_args_tester(
             ["WRONG"],
-            r"^usage: \w*\.py\s\[-h\]"
-            r" \{check,auth,questions\}[\s\S\w]*'WRONG'\s\(choose from 'check', 'auth',"
-            r" 'questions'\)",
+            r"^usage: \w*\.py\s\[-h\] \[--metrics\] \[--no-progress\]"
+            r" \[--trace\]\s+"
+            r"\{check,auth,questions,sync,crawl\}[\s\S\w]*'WRONG'\s"
+            r"\(choose from 'check', 'auth', 'questions', 'sync', 'crawl'\)",
             # error looks like :
-            # usage: so_updater.py [-h] {check,auth,questions} ...
+            # usage: so_updater.py [-h] [--metrics] [--no-progress] [--trace]
+            #                      {check,auth,questions,sync,crawl} ...
             # so_updater.py: error: argument action: invalid choice: 'WRONG'
-            #        (choose from 'check', 'auth', 'questions')
+            #        (choose from 'check', 'auth', 'questions', 'sync', 'crawl')
             capsys,
         )
 
@@ -162,6 +191,42 @@ class TestBuildArgsParserQuestions:
                 ["questions", "--tagged", "foo"],
                 {"action": "questions", "tagged": "foo"},
             ),
+            (
+                ["questions", "--site", "superuser"],
+                {"action": "questions", "site": "superuser"},
+            ),
+            (
+                ["questions", "--all"],
+                {"action": "questions", "all": True},
+            ),
+            (
+                ["questions", "--db", "foo.db"],
+                {"action": "questions", "db": "foo.db"},
+            ),
+            (
+                ["questions", "--cache", "cache.db"],
+                {"action": "questions", "cache": "cache.db"},
+            ),
+            (
+                ["questions", "--cache-ttl", "60"],
+                {"action": "questions", "cache_ttl": 60},
+            ),
+            (
+                ["questions", "--offline"],
+                {"action": "questions", "offline": True},
+            ),
+            (
+                ["questions", "--resume"],
+                {"action": "questions", "resume": True},
+            ),
+            (
+                ["questions", "--format", "ndjson"],
+                {"action": "questions", "format": "ndjson"},
+            ),
+            (
+                ["questions", "--output", "out.ndjson"],
+                {"action": "questions", "output": "out.ndjson"},
+            ),
         ],
     )
     def test_valid_questions_arguments(self, args, expected):
@@ -186,6 +251,101 @@ class TestBuildArgsParserQuestions:
         )
 
 
+class TestBuildArgsParserSync:
+    """Tests for so_updater.build_args_parser(), specifically
+    if the first action parameter is `sync`"""
+
+    @pytest.mark.parametrize(
+        "args, expected",
+        [
+            (
+                ["sync"],
+                {"action": "sync", "db": "./so_importer.db"},
+            ),
+            (
+                ["sync", "--db", "foo.db"],
+                {"action": "sync", "db": "foo.db"},
+            ),
+            (
+                ["sync", "--filter", "foo"],
+                {"action": "sync", "filter": "foo"},
+            ),
+            (
+                ["sync", "--tagged", "python;pandas"],
+                {"action": "sync", "tagged": "python;pandas"},
+            ),
+            (
+                ["sync", "--since", "2022-01-01"],
+                {"action": "sync", "since": "2022-01-01"},
+            ),
+            (
+                ["sync", "--site", "superuser"],
+                {"action": "sync", "site": "superuser"},
+            ),
+        ],
+    )
+    def test_valid_sync_arguments(self, args, expected):
+        """GIVEN the generated parser
+        GIVEN the 'sync' action parameter
+        GIVEN a valid sync argument
+        SHOULD recognize the parameter and produce a valid namespace"""
+        assert valid_args_tester(args, expected)
+
+
+class TestBuildArgsParserCrawl:
+    """Tests for so_updater.build_args_parser(), specifically
+    if the first action parameter is `crawl`"""
+
+    @pytest.mark.parametrize(
+        "args, expected",
+        [
+            (
+                ["crawl", "--fromdate", "2022-01-01"],
+                {
+                    "action": "crawl",
+                    "fromdate": "2022-01-01",
+                    "sites": "stackoverflow",
+                    "db": "./so_importer.db",
+                    "workers": 2,
+                    "answers": False,
+                },
+            ),
+            (
+                ["crawl", "--fromdate", "1", "--answers"],
+                {"action": "crawl", "answers": True},
+            ),
+            (
+                ["crawl", "--fromdate", "1", "--sites", "superuser;serverfault"],
+                {"action": "crawl", "sites": "superuser;serverfault"},
+            ),
+            (
+                ["crawl", "--fromdate", "1", "--todate", "2"],
+                {"action": "crawl", "todate": "2"},
+            ),
+            (
+                ["crawl", "--fromdate", "1", "--workers", "4"],
+                {"action": "crawl", "workers": 4},
+            ),
+        ],
+    )
+    def test_valid_crawl_arguments(self, args, expected):
+        """GIVEN the generated parser
+        GIVEN the 'crawl' action parameter
+        GIVEN a valid crawl argument
+        SHOULD recognize the parameter and produce a valid namespace"""
+        assert valid_args_tester(args, expected)
+
+    def test_fromdate_required(self, capsys):
+        """GIVEN the generated parser
+        GIVEN the `crawl` action without --fromdate
+        SHOULD fail"""
+        assert wrong_args_tester(
+            ["crawl"],
+            r"the following arguments are required: --fromdate",
+            capsys,
+        )
+
+
 class DummyObject:
     """Dummy class to test attribute extraction"""
 
@@ -257,3 +417,327 @@ class TestExtract:
         """
         result = extract(obj, "d", "DEFAULT")
         assert result == "DEFAULT"
+
+
+class TestFetchQuestionPages:
+    """Tests for so_updater.fetch_question_pages()"""
+
+    def test_single_page(self, monkeypatch):
+        """GIVEN the `questions` action without --all
+        SHOULD fetch only the requested page"""
+        calls = []
+
+        def mock_get_questions(*args, **kwargs):
+            calls.append(kwargs)
+            return {"items": [], "has_more": True}
+
+        monkeypatch.setattr(
+            stack_overflow_importer.questions, "get_questions", mock_get_questions
+        )
+        cmdline = build_args_parser().parse_args(
+            ["questions", "--filter", "f", "--page", "3"]
+        )
+        pages = list(fetch_question_pages(cmdline, "key", "token"))
+        assert len(pages) == 1
+        assert calls[0]["page"] == 3
+
+    def test_all_pages(self, monkeypatch):
+        """GIVEN the `questions` action with --all
+        SHOULD iterate over the pages"""
+        calls = []
+
+        def mock_iter_question_pages(*args, **kwargs):
+            calls.append(kwargs)
+            yield {"items": [], "has_more": True}
+            yield {"items": [], "has_more": False}
+
+        monkeypatch.setattr(
+            stack_overflow_importer.questions,
+            "iter_question_pages",
+            mock_iter_question_pages,
+        )
+        cmdline = build_args_parser().parse_args(
+            ["questions", "--filter", "f", "--all"]
+        )
+        pages = list(fetch_question_pages(cmdline, "key", "token"))
+        assert len(pages) == 2
+        assert calls[0]["pagesize"] == "100"
+
+
+class TestImportQuestions:
+    """Tests for so_updater.import_questions()"""
+
+    @staticmethod
+    def mock_api(monkeypatch, pages):
+        """Serves `pages` questions pages of one item each, and returns the list of
+        the pages requested."""
+        calls = []
+
+        # pylint: disable=unused-argument
+        def mock_query_method(method, key, access_token, params, client=None):
+            page = int(params["page"])
+            calls.append(page)
+            return {"items": [{"question_id": page}], "has_more": page < pages}
+
+        monkeypatch.setattr(
+            stack_overflow_importer.questions, "query_method", mock_query_method
+        )
+        return calls
+
+    def test_single_page(self, monkeypatch, tmp_path):
+        """GIVEN the `questions` action with --db and without --all
+        SHOULD import only the requested page"""
+        calls = self.mock_api(monkeypatch, 3)
+        cmdline = build_args_parser().parse_args(
+            [
+                "questions",
+                "--filter",
+                "f",
+                "--db",
+                str(tmp_path / "q.db"),
+                "--page",
+                "2",
+            ]
+        )
+        assert import_questions(cmdline, "key", "token") == 1
+        assert calls == [2]
+
+    def test_resume(self, monkeypatch, tmp_path):
+        """GIVEN a first page imported, then --all --resume
+        SHOULD import the remaining pages only"""
+        calls = self.mock_api(monkeypatch, 3)
+        args = ["questions", "--filter", "f", "--db", str(tmp_path / "q.db")]
+        parser = build_args_parser()
+        import_questions(parser.parse_args(args), "key", "token")
+        count = import_questions(
+            parser.parse_args(args + ["--all", "--resume"]), "key", "token"
+        )
+        assert count == 3
+        assert calls == [1, 2, 3]
+
+
+class TestWriteOutput:
+    """Tests for so_updater.write_output()"""
+
+    PAGES = [
+        {"items": [{"question_id": 1}, {"question_id": 2}], "has_more": True},
+        {"items": [{"question_id": 3}], "has_more": False},
+    ]
+
+    def test_json_stdout(self, capsys):
+        """GIVEN no --format and no --output
+        SHOULD print each page as indented JSON"""
+        cmdline = build_args_parser().parse_args(["questions"])
+        write_output(cmdline, self.PAGES)
+        assert '"has_more": true' in capsys.readouterr().out
+
+    def test_ndjson_file(self, tmp_path):
+        """GIVEN --format ndjson and --output
+        SHOULD write one question per line to the file"""
+        path = tmp_path / "out.ndjson"
+        cmdline = build_args_parser().parse_args(
+            ["questions", "--format", "ndjson", "--output", str(path)]
+        )
+        write_output(cmdline, iter(self.PAGES))
+        assert path.read_text(encoding="utf-8").splitlines() == [
+            '{"question_id":1}',
+            '{"question_id":2}',
+            '{"question_id":3}',
+        ]
+
+    def test_parquet_requires_output(self):
+        """GIVEN --format parquet without --output
+        SHOULD fail"""
+        cmdline = build_args_parser().parse_args(["questions", "--format", "parquet"])
+        with pytest.raises(ValueError, match="requires an --output"):
+            write_output(cmdline, self.PAGES)
+
+    def test_wrong_format(self, capsys):
+        """GIVEN an unknown --format
+        SHOULD fail"""
+        assert wrong_args_tester(
+            ["questions", "--format", "xml"], r"invalid choice: 'xml'", capsys
+        )
+
+
+class TestBuildClient:
+    """Tests for so_updater.build_client()"""
+
+    def test_no_cache(self):
+        """GIVEN no --cache argument
+        SHOULD build a client without cache"""
+        cmdline = build_args_parser().parse_args(["questions"])
+        with build_client(cmdline) as client:
+            assert client.cache is None
+
+    def test_cache(self, tmp_path):
+        """GIVEN --cache and --offline arguments
+        SHOULD build a client with an offline cache"""
+        cmdline = build_args_parser().parse_args(
+            ["questions", "--cache", str(tmp_path / "c.db"), "--offline"]
+        )
+        with build_client(cmdline) as client:
+            assert client.cache.offline
+            assert client.cache.default_ttl == 3600
+            client.cache.close()
+
+    def test_offline_without_cache(self):
+        """GIVEN --offline without --cache
+        SHOULD fail"""
+        cmdline = build_args_parser().parse_args(["questions", "--offline"])
+        with pytest.raises(ValueError, match="requires a --cache"):
+            build_client(cmdline)
+
+
+class TestBuildHooks:
+    """Tests for so_updater.build_hooks()"""
+
+    def test_no_hooks(self):
+        """GIVEN neither --metrics nor --trace
+        SHOULD build no hooks"""
+        assert build_hooks(build_args_parser().parse_args(["check"])) == []
+
+    def test_metrics(self):
+        """GIVEN --metrics
+        SHOULD build a MetricsRecorder"""
+        cmdline = build_args_parser().parse_args(["--metrics", "check"])
+        (hook,) = build_hooks(cmdline)
+        assert isinstance(hook, MetricsRecorder)
+
+    @pytest.mark.parametrize(
+        "args, date_cursor",
+        [(["sync"], True), (["crawl", "--fromdate", "1"], False)],
+    )
+    def test_progress(self, args, date_cursor):
+        """GIVEN an action calling the API
+        SHOULD build a ProgressReporter, whose cursor is a date except for crawls"""
+        cmdline = build_args_parser().parse_args(args)
+        (hook,) = build_hooks(cmdline)
+        assert isinstance(hook, ProgressReporter)
+        assert hook.date_cursor is date_cursor
+
+
+class TestResolveQuestionFilter:
+    """Tests for so_updater.resolve_question_filter()"""
+
+    def test_explicit_filter(self):
+        """GIVEN a --filter argument
+        SHOULD use it"""
+        cmdline = build_args_parser().parse_args(["questions", "--filter", "foo"])
+        assert resolve_question_filter(cmdline, "key", "token") == "foo"
+
+    def test_cached_filter(self, monkeypatch):
+        """GIVEN no --filter argument
+        SHOULD use the filter registry"""
+        monkeypatch.setattr(FilterRegistry, "get_or_create", lambda *a, **k: "cached")
+        cmdline = build_args_parser().parse_args(["questions"])
+        assert resolve_question_filter(cmdline, "key", "token") == "cached"
+
+    def test_fallback(self, monkeypatch):
+        """GIVEN no --filter argument
+        GIVEN the filter can't be created
+        SHOULD fall back to the test filter"""
+        monkeypatch.setattr(FilterRegistry, "get_or_create", lambda *a, **k: None)
+        cmdline = build_args_parser().parse_args(["questions"])
+        assert (
+            resolve_question_filter(cmdline, "key", "token") == QUESTION_TEST_FILTER_ID
+        )
+
+
+class TestMain:
+    """Tests for so_updater.main()"""
+
+    @staticmethod
+    def run(monkeypatch, *args):
+        """Runs the CLI with `args`, without setting up the logging."""
+        monkeypatch.setattr(sys, "argv", ["so_updater.py", "--no-progress", *args])
+        so_updater.main()
+
+    def test_sync_sites(self, monkeypatch, tmp_path):
+        """GIVEN syncs of two sites with the default --db
+        SHOULD keep their questions and high-water marks in a store per site"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(so_updater, "init_logging", lambda: None)
+        for variable in ("CLIENT_ID", "KEY", "TOKEN"):
+            monkeypatch.setenv(f"SO_IMPORTER_{variable}", "value")
+        activity = {"stackoverflow": 200, "superuser": 100}
+        calls = []
+
+        def mock_iter_question_pages(*args, site, min=None, **kwargs):
+            calls.append((site, min))
+            yield {
+                "items": [
+                    {
+                        "question_id": 1,
+                        "title": site,
+                        "last_activity_date": activity[site],
+                    }
+                ]
+            }
+
+        monkeypatch.setattr(
+            stack_overflow_importer.sync,
+            "iter_question_pages",
+            mock_iter_question_pages,
+        )
+        for site in ("stackoverflow", "superuser", "superuser"):
+            self.run(monkeypatch, "sync", "--filter", "f", "--site", site)
+        assert calls == [
+            ("stackoverflow", None),
+            ("superuser", None),
+            ("superuser", 100),
+        ]
+        for path, site in (
+            ("so_importer.db", "stackoverflow"),
+            ("so_importer.superuser.db", "superuser"),
+        ):
+            with QuestionStore(str(tmp_path / path)) as store:
+                assert [q["title"] for q in store.get_questions([1])] == [site]
+                assert store.get_high_water_mark("", site) == activity[site]
+
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+STARTUP_BUDGET_US = 150_000
+"""The maximum time to import so_updater, in microseconds, as reported by
+`-X importtime`."""
+
+HEAVY_MODULES = ("requests", "requests_oauthlib", "coloredlogs", "pyarrow", "asyncio")
+
+
+def run_python(tmp_path, *args) -> subprocess.CompletedProcess:
+    """Runs a Python process in `tmp_path`, with the repository on its path."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+
+
+class TestStartup:
+    """Tests for the import time of so_updater.py"""
+
+    def test_import_time(self, tmp_path):
+        """GIVEN an import of so_updater
+        SHOULD not import the modules of the commands, and stay within the budget"""
+        result = run_python(tmp_path, "-X", "importtime", "-c", "import so_updater")
+        timings = {}
+        for line in result.stderr.splitlines():
+            match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+            if match:
+                timings[match.group(2)] = int(match.group(1))
+        imported = {name.split(".")[0] for name in timings}
+        assert imported.isdisjoint(HEAVY_MODULES)
+        assert timings["so_updater"] < STARTUP_BUDGET_US
+
+    def test_help_does_not_log(self, tmp_path):
+        """GIVEN --help
+        SHOULD print the usage without creating the log file"""
+        result = run_python(tmp_path, str(ROOT / "so_updater.py"), "--help")
+        assert result.stdout.startswith("usage:")
+        assert not (tmp_path / "so_importer.log").exists()
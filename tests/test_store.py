@@ -0,0 +1,250 @@
+"""Tests for the stack_overflow_importer/store.py module."""
+
+import sqlite3
+
+import pytest
+
+from stack_overflow_importer.models import Question
+from stack_overflow_importer.store import (
+    ImportCheckpoint,
+    QuestionStore,
+    decode_ids,
+    encode_ids,
+)
+
+
+def make_question(question_id, **fields):
+    """Builds a question item, as returned by the API."""
+    item = {
+        "question_id": question_id,
+        "title": f"Question {question_id}",
+        "link": f"https://stackoverflow.com/q/{question_id}",
+        "tags": ["python", "pandas"],
+        "is_answered": False,
+        "view_count": 10,
+        "answer_count": 0,
+        "score": 1,
+        "creation_date": 1_600_000_000 + question_id,
+        "last_activity_date": 1_600_000_000 + question_id,
+    }
+    item.update(fields)
+    return item
+
+
+class TestQuestionStore:
+    """Tests for store.QuestionStore."""
+
+    def test_schema(self, store):
+        """It creates the table and its indexes."""
+        indexes = {
+            row[0]
+            for row in store.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+        assert {
+            "questions_creation_date",
+            "questions_last_activity_date",
+            "question_tags_question_id",
+        } <= indexes
+
+    def test_insert_and_get(self, store):
+        """It stores question items and gives them back."""
+        assert store.upsert_questions([make_question(1), make_question(2)]) == 2
+        assert store.count() == 2
+        assert store.get_question(1) == make_question(1)
+        assert store.get_question(3) is None
+
+    def test_upsert_updates(self, store):
+        """It updates a question written twice instead of duplicating it."""
+        store.upsert_questions([make_question(1)])
+        store.upsert_questions([make_question(1, score=42, tags=["rust"])])
+        assert store.count() == 1
+        question = store.get_question(1)
+        assert question["score"] == 42
+        assert question["tags"] == ["rust"]
+        assert not list(store.iter_questions(tag="python"))
+        assert [q["question_id"] for q in store.iter_questions(tag="rust")] == [1]
+
+    def test_partial_items_keep_stored_fields(self, store):
+        """Fields missing from an item keep their stored value."""
+        store.upsert_questions([make_question(1)])
+        store.upsert_questions([{"question_id": 1, "score": 7}])
+        question = store.get_question(1)
+        assert question["score"] == 7
+        assert question["title"] == "Question 1"
+        assert question["tags"] == ["python", "pandas"]
+
+    def test_missing_included_fields_are_null(self, store):
+        """Fields the filter includes but an item lacks, which the API leaves out
+        because they are null, are overwritten with NULL."""
+        store.upsert_questions([make_question(1, accepted_answer_id=5)])
+        store.upsert_questions(
+            [{"question_id": 1, "score": 7}],
+            fields={"question_id", "score", "accepted_answer_id"},
+        )
+        question = store.get_question(1)
+        assert "accepted_answer_id" not in question
+        assert question["score"] == 7
+        assert question["title"] == "Question 1"
+
+    def test_write_pages(self, store):
+        """It writes every page, and accepts generators."""
+        pages = (
+            {"items": [make_question(i) for i in range(start, start + 10)]}
+            for start in (0, 10, 20)
+        )
+        assert store.write_pages(pages) == 30
+        assert store.count() == 30
+
+    def test_iter_questions_sorted(self, store):
+        """It iterates over questions by creation date."""
+        store.upsert_questions([make_question(3), make_question(1), make_question(2)])
+        assert [q["question_id"] for q in store.iter_questions()] == [1, 2, 3]
+
+    def test_records(self, store):
+        """It accepts and returns Question records."""
+        store.upsert_questions([Question.from_api(make_question(1)), make_question(2)])
+        assert store.get_question(1) == make_question(1)
+        records = list(store.iter_questions(tag="pandas", records=True))
+        assert records == [
+            Question.from_api(make_question(1)),
+            Question.from_api(make_question(2)),
+        ]
+
+    def test_empty_batch(self, store):
+        """It accepts empty batches."""
+        assert store.upsert_questions([]) == 0
+
+    def test_persists(self, tmp_path):
+        """It keeps the questions across connections."""
+        path = str(tmp_path / "test.db")
+        with QuestionStore(path) as first:
+            first.upsert_questions([make_question(1)])
+        with QuestionStore(path) as second:
+            assert second.count() == 1
+
+    def test_checkpoint(self, store):
+        """It saves a checkpoint with its page, and gives it back."""
+        checkpoint = ImportCheckpoint("job", "{}", 2, 1_600_000_002, 2, 2)
+        store.upsert_questions([make_question(1), make_question(2)], checkpoint)
+        assert store.get_checkpoint("job") == checkpoint
+        assert store.get_checkpoint("other") is None
+
+    def test_checkpoint_empty_page(self, store):
+        """It saves the checkpoint of an empty page."""
+        checkpoint = ImportCheckpoint("job", "{}", 1, None, 1, 0, done=True)
+        store.upsert_questions([], checkpoint)
+        assert store.get_checkpoint("job").done
+
+    def test_checkpoint_rolled_back_with_page(self, store):
+        """It doesn't save the checkpoint if the page fails to be written."""
+        checkpoint = ImportCheckpoint("job", "{}", 1, None, 1, 1)
+        with pytest.raises(sqlite3.IntegrityError):
+            store.upsert_questions([make_question(1), {"question_id": "x"}], checkpoint)
+        assert store.get_checkpoint("job") is None
+        assert store.count() == 0
+
+    def test_sync_state_migration(self, tmp_path):
+        """GIVEN a store whose high-water marks aren't keyed on the site
+        SHOULD keep them as the marks of the default site"""
+        path = str(tmp_path / "old.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute(
+                "CREATE TABLE sync_state"
+                " (tagset TEXT PRIMARY KEY, high_water_mark INTEGER NOT NULL)"
+            )
+            connection.execute("INSERT INTO sync_state VALUES ('python', 100)")
+        connection.close()
+        with QuestionStore(path) as store:
+            assert store.get_high_water_mark("python") == 100
+            assert store.get_high_water_mark("python", "superuser") is None
+            store.set_high_water_mark("python", 50, "superuser")
+            assert store.synced_tagsets("superuser") == {"python"}
+            assert not store.synced_tagsets(complete=True)
+
+    def test_sync_state_complete_migration(self, tmp_path):
+        """GIVEN a store which doesn't record which tag sets are complete
+        SHOULD keep its marks, as not complete"""
+        path = str(tmp_path / "old.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute(
+                "CREATE TABLE sync_state (site TEXT NOT NULL, tagset TEXT NOT NULL,"
+                " high_water_mark INTEGER NOT NULL, PRIMARY KEY (site, tagset))"
+            )
+            connection.execute(
+                "INSERT INTO sync_state VALUES ('stackoverflow', 'python', 100)"
+            )
+        connection.close()
+        with QuestionStore(path) as store:
+            assert store.get_high_water_mark("python") == 100
+            assert store.synced_tagsets() == {"python"}
+            assert not store.synced_tagsets(complete=True)
+
+
+@pytest.mark.parametrize("ids", [[], [1], [3, 7, 8, 1_000_000, 2**40]])
+def test_posting_list_round_trip(ids):
+    """It decodes the posting lists it encodes."""
+    assert decode_ids(encode_ids(ids)) == ids
+
+
+class TestTagIndex:
+    """Tests for the tag index of store.QuestionStore."""
+
+    def test_maintained_on_upsert(self, store):
+        """It adds the questions to the posting lists of their tags."""
+        store.upsert_questions([make_question(3), make_question(1)])
+        store.upsert_questions([make_question(2, tags=["python"])])
+        assert store.get_tag_postings("python") == [1, 2, 3]
+        assert store.get_tag_postings("pandas") == [1, 3]
+        assert store.get_tag_counts(["python", "r"]) == {"python": 3, "r": 0}
+
+    def test_retagged(self, store):
+        """It moves retagged questions between posting lists, and drops the empty
+        ones."""
+        store.upsert_questions([make_question(1), make_question(2)])
+        store.upsert_questions([make_question(1, tags=["r"])])
+        assert store.get_tag_postings("python") == [2]
+        assert store.get_tag_postings("r") == [1]
+        store.upsert_questions([make_question(2, tags=[])])
+        assert store.get_tag_postings("python") == []
+        assert store.get_tag_counts(["python"]) == {"python": 0}
+
+    def test_untouched_when_tags_missing(self, store):
+        """It keeps the posting lists of questions updated without their tags."""
+        store.upsert_questions([make_question(1)])
+        item = make_question(1)
+        del item["tags"]
+        store.upsert_questions([item])
+        assert store.get_tag_postings("python") == [1]
+
+    def test_refreshed_on_read(self, store):
+        """It only marks the tags of upserted questions as dirty, and rebuilds their
+        posting lists when they are read."""
+        store.upsert_questions([make_question(1)])
+        assert store.get_tag_counts(["python", "pandas"]) == {"python": 1, "pandas": 1}
+        store.upsert_questions([make_question(2, tags=["python"])])
+        dirty = [
+            row[0] for row in store.connection.execute("SELECT tag FROM dirty_tags")
+        ]
+        assert dirty == ["python"]
+        assert store.get_tag_counts(["python"]) == {"python": 2}
+        assert not store.connection.execute("SELECT tag FROM dirty_tags").fetchall()
+
+    def test_rebuilt_for_older_stores(self, tmp_path):
+        """It builds the tag index of a store which tagged questions before the
+        index existed."""
+        path = str(tmp_path / "test.db")
+        with QuestionStore(path) as first:
+            first.upsert_questions([make_question(1), make_question(2)])
+            with first.connection:
+                first.connection.execute("DELETE FROM tag_postings")
+        with QuestionStore(path) as second:
+            assert second.get_tag_postings("pandas") == [1, 2]
+
+    def test_get_questions(self, store):
+        """It gives back stored questions in the requested order."""
+        store.upsert_questions([make_question(i) for i in range(1, 4)])
+        ids = [item["question_id"] for item in store.get_questions([3, 9, 1])]
+        assert ids == [3, 1]
+        assert store.question_ids() == [1, 2, 3]
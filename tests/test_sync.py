@@ -0,0 +1,149 @@
+"""Tests for the stack_overflow_importer/sync.py module."""
+
+import pytest
+
+import stack_overflow_importer.sync
+from stack_overflow_importer.sync import normalize_tagset, sync_questions
+
+
+class FakePages:
+    """Serves `iter_question_pages` calls from a list of questions, two per page,
+    honouring `min` on the last activity date and `page`, and records the calls."""
+
+    def __init__(self, questions):
+        self.questions = questions
+        self.calls = []
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append(kwargs)
+        low = kwargs.get("min")
+        items = [
+            q for q in self.questions if low is None or q["last_activity_date"] >= low
+        ]
+        items.sort(key=lambda q: q["last_activity_date"])
+        for start in range(2 * (kwargs.get("page", 1) - 1), len(items), 2):
+            yield {
+                "items": items[start : start + 2],
+                "has_more": start + 2 < len(items),
+            }
+
+
+@pytest.mark.parametrize(
+    "tagged, expected",
+    [
+        (None, ""),
+        ("", ""),
+        ("python", "python"),
+        ("Python;pandas", "pandas;python"),
+        ("pandas;python;", "pandas;python"),
+    ],
+)
+def test_normalize_tagset(tagged, expected):
+    """It builds the same key whatever the order and case of the tags."""
+    assert normalize_tagset(tagged) == expected
+
+
+class TestSyncQuestions:
+    """Tests for sync.sync_questions()."""
+
+    def test_first_sync(self, store, monkeypatch):
+        """It fetches everything and records the high-water mark."""
+        api = FakePages(
+            [{"question_id": i, "last_activity_date": 100 + i} for i in range(5)]
+        )
+        monkeypatch.setattr(stack_overflow_importer.sync, "iter_question_pages", api)
+        assert sync_questions(store, tagged="python") == 5
+        assert api.calls[0]["min"] is None
+        assert api.calls[0]["sort"] == "activity"
+        assert store.get_high_water_mark("python") == 104
+
+    def test_delta_sync(self, store, monkeypatch):
+        """It only fetches the questions active since the previous sync."""
+        questions = [
+            {"question_id": i, "last_activity_date": 100 + i} for i in range(5)
+        ]
+        api = FakePages(questions)
+        monkeypatch.setattr(stack_overflow_importer.sync, "iter_question_pages", api)
+        sync_questions(store, tagged="python")
+        first_calls = len(api.calls)
+        questions[1] = {"question_id": 1, "last_activity_date": 200, "score": 3}
+        assert sync_questions(store, tagged="Python") == 2
+        assert api.calls[first_calls]["min"] == 104
+        assert store.get_question(1)["score"] == 3
+        assert store.get_high_water_mark("python") == 200
+        assert store.count() == 5
+
+    def test_withdrawn_fields(self, store, monkeypatch):
+        """The fields the filter includes but the API leaves out, because they are
+        now null, are cleared."""
+        questions = [{"question_id": 1, "last_activity_date": 100}]
+        questions[0]["accepted_answer_id"] = 5
+        api = FakePages(questions)
+        monkeypatch.setattr(stack_overflow_importer.sync, "iter_question_pages", api)
+        sync_questions(store)
+        questions[0] = {"question_id": 1, "last_activity_date": 200}
+        sync_questions(store)
+        assert "accepted_answer_id" not in store.get_question(1)
+
+    def test_activity_during_sync(self, store, monkeypatch):
+        """GIVEN a question fetched earlier which gets new activity during the sync
+        SHOULD still fetch every question once, from the cursor"""
+        questions = [
+            {"question_id": i, "last_activity_date": 100 + i} for i in range(6)
+        ]
+        api = FakePages(questions)
+
+        def moving_api(*args, **kwargs):
+            if len(api.calls) == 1:
+                questions[0]["last_activity_date"] = 300
+            return api(*args, **kwargs)
+
+        monkeypatch.setattr(
+            stack_overflow_importer.sync, "iter_question_pages", moving_api
+        )
+        assert sync_questions(store) == 7
+        assert store.count() == 6
+        assert {call["page"] for call in api.calls} == {1}
+        assert store.get_question(0)["last_activity_date"] == 300
+        assert store.get_high_water_mark("") == 300
+
+    def test_same_activity_date(self, store, monkeypatch):
+        """GIVEN more questions active in the same second than a page holds
+        SHOULD page through them"""
+        api = FakePages(
+            [{"question_id": i, "last_activity_date": 100} for i in range(5)]
+        )
+        monkeypatch.setattr(stack_overflow_importer.sync, "iter_question_pages", api)
+        assert sync_questions(store) == 5
+        assert [(call["min"], call["page"]) for call in api.calls] == [
+            (None, 1),
+            (100, 1),
+            (100, 2),
+            (100, 3),
+        ]
+
+    def test_tagsets_are_independent(self, store, monkeypatch):
+        """Each tag set has its own high-water mark."""
+        api = FakePages([{"question_id": 1, "last_activity_date": 100}])
+        monkeypatch.setattr(stack_overflow_importer.sync, "iter_question_pages", api)
+        sync_questions(store, tagged="python")
+        sync_questions(store, tagged="rust", since="1970-01-01T00:00:50")
+        assert api.calls[1]["min"] == 50
+        assert store.get_high_water_mark("rust") == 100
+        assert store.synced_tagsets(complete=True) == {"python"}
+
+    def test_mark_never_moves_backwards(self, store):
+        """The high-water mark only increases."""
+        store.set_high_water_mark("", 100)
+        store.set_high_water_mark("", 50)
+        assert store.get_high_water_mark("") == 100
+        assert store.get_high_water_mark("never") is None
+
+    def test_marks_per_site(self, store, monkeypatch):
+        """It keeps the high-water marks of each site apart."""
+        api = FakePages([{"question_id": 1, "last_activity_date": 100}])
+        monkeypatch.setattr(stack_overflow_importer.sync, "iter_question_pages", api)
+        sync_questions(store, tagged="python")
+        sync_questions(store, tagged="python", site="superuser")
+        assert [call["min"] for call in api.calls] == [None, None]
+        assert store.get_high_water_mark("python", "superuser") == 100
@@ -0,0 +1,189 @@
+"""Tests for the stack_overflow_importer/tags.py module."""
+
+import pytest
+
+from stack_overflow_importer.fake_server import FakeStackExchangeServer
+from stack_overflow_importer.tags import (
+    And,
+    Not,
+    Or,
+    Tag,
+    evaluate_tag_expression,
+    is_synced,
+    matches,
+    parse_tag_expression,
+    plan_tag_queries,
+    search_questions,
+)
+
+QUESTION_TAGS = {
+    1: ["python"],
+    2: ["python", "pandas"],
+    3: ["python", "polars"],
+    4: ["r", "pandas"],
+    5: ["python", "pandas", "r"],
+    6: ["java"],
+}
+
+
+def make_questions():
+    """Builds questions tagged as in QUESTION_TAGS."""
+    return [
+        {"question_id": question_id, "tags": tags, "creation_date": question_id}
+        for question_id, tags in QUESTION_TAGS.items()
+    ]
+
+
+@pytest.fixture()
+def store(store):
+    """Fixture to return a store holding the questions of QUESTION_TAGS."""
+    store.upsert_questions(make_questions())
+    return store
+
+
+class TestParseTagExpression:
+    """Tests for tags.parse_tag_expression()."""
+
+    @pytest.mark.parametrize(
+        "expression, expected",
+        [
+            ("Python", Tag("python")),
+            ("python;pandas", And((Tag("python"), Tag("pandas")))),
+            (
+                "python and pandas or r",
+                Or((And((Tag("python"), Tag("pandas"))), Tag("r"))),
+            ),
+            (
+                "python AND (pandas OR r)",
+                And((Tag("python"), Or((Tag("pandas"), Tag("r"))))),
+            ),
+            ("not not c++", Not(Not(Tag("c++")))),
+            (
+                "c# and not .net",
+                And((Tag("c#"), Not(Tag(".net")))),
+            ),
+        ],
+    )
+    def test_valid(self, expression, expected):
+        """GIVEN a valid expression
+        SHOULD parse it, with not binding tighter than and, and and than or"""
+        assert parse_tag_expression(expression) == expected
+
+    @pytest.mark.parametrize(
+        "expression", ["", "python and", "(python or r", "python)", "or r", ";"]
+    )
+    def test_invalid(self, expression):
+        """GIVEN a malformed expression
+        SHOULD raise a ValueError"""
+        with pytest.raises(ValueError):
+            parse_tag_expression(expression)
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("python", [1, 2, 3, 5]),
+        ("python and pandas", [2, 5]),
+        ("pandas or polars", [2, 3, 4, 5]),
+        ("python and not pandas", [1, 3]),
+        ("not python", [4, 6]),
+        ("(pandas or polars) and not r", [2, 3]),
+        ("cobol", []),
+        ("cobol and python", []),
+    ],
+)
+class TestEvaluate:
+    """Tests for tags.evaluate_tag_expression() and tags.matches()."""
+
+    def test_index(self, store, expression, expected):
+        """GIVEN an expression
+        SHOULD find the matching stored questions from the tag index"""
+        assert evaluate_tag_expression(parse_tag_expression(expression), store) == (
+            expected
+        )
+
+    def test_matches(self, expression, expected):
+        """GIVEN an expression
+        SHOULD match the tags of the same questions"""
+        parsed = parse_tag_expression(expression)
+        assert [
+            question_id
+            for question_id, tags in QUESTION_TAGS.items()
+            if matches(parsed, tags)
+        ] == expected
+
+
+class TestPlanTagQueries:
+    """Tests for tags.plan_tag_queries()."""
+
+    @pytest.mark.parametrize(
+        "expression, expected",
+        [
+            ("python;pandas", ["pandas;python"]),
+            ("pandas or polars", ["pandas", "polars"]),
+            ("python or python and pandas", ["python"]),
+            ("python and (pandas or polars)", ["pandas;python", "polars;python"]),
+            ("python and not pandas", ["python"]),
+            ("not python", [""]),
+            ("r or not python", [""]),
+            ("python and not python or r", ["r"]),
+            ("not (python or r) or java", [""]),
+            ("a;b;c;d;e;f", ["a;b;c;d;e"]),
+        ],
+    )
+    def test_plan(self, expression, expected):
+        """GIVEN an expression
+        SHOULD plan the fewest AND-only calls covering it"""
+        assert plan_tag_queries(parse_tag_expression(expression)) == expected
+
+
+class TestSearchQuestions:
+    """Tests for tags.search_questions()."""
+
+    def test_from_api(self, make_client):
+        """GIVEN an OR query and no store
+        SHOULD fetch each tag set once, and yield each matching question once"""
+        with FakeStackExchangeServer(make_questions()) as server:
+            with make_client(server) as client:
+                items = list(
+                    search_questions("(pandas or r) and not polars", client=client)
+                )
+        assert sorted(item["question_id"] for item in items) == [2, 4, 5]
+        assert server.requests["questions"] == 2
+
+    def test_from_index(self, store):
+        """GIVEN a store which synced all the questions
+        SHOULD answer from the tag index, without calling the API"""
+        store.set_high_water_mark("", 1, complete=True)
+        items = list(search_questions("pandas or polars", store=store, client=None))
+        assert [item["question_id"] for item in items] == [2, 3, 4, 5]
+
+    def test_synced_other_site(self, store):
+        """GIVEN a store which only synced another site
+        SHOULD not consider the site synced"""
+        store.set_high_water_mark("", 1, "superuser", complete=True)
+        assert is_synced(store, "pandas", "superuser")
+        assert not is_synced(store, "pandas")
+
+    def test_synced_since(self, store):
+        """GIVEN a store which synced a tag set from a `since` date only
+        SHOULD not consider it synced, even once synced again"""
+        store.set_high_water_mark("pandas", 1)
+        store.set_high_water_mark("pandas", 2)
+        assert not is_synced(store, "pandas")
+        store.set_high_water_mark("pandas", 3, complete=True)
+        store.set_high_water_mark("pandas", 4)
+        assert is_synced(store, "pandas")
+
+    def test_partially_synced(self, store, make_client):
+        """GIVEN a store which only synced one of the tag sets
+        SHOULD only fetch the others, and deduplicate the questions"""
+        store.set_high_water_mark("pandas", 1, complete=True)
+        extra = {"question_id": 7, "tags": ["polars"], "creation_date": 7}
+        with FakeStackExchangeServer(make_questions() + [extra]) as server:
+            with make_client(server) as client:
+                items = list(
+                    search_questions("pandas or polars", store=store, client=client)
+                )
+        assert [item["question_id"] for item in items] == [2, 3, 4, 5, 7]
+        assert server.requests["questions"] == 1